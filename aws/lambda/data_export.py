@@ -1,3 +1,4 @@
+import base64
 import json
 import boto3
 import psycopg2
@@ -221,13 +222,19 @@ def export_health_data_only(connection, user_id: str) -> Dict[str, Any]:
     finally:
         cursor.close()
 
+def json_default(value: Any) -> str:
+    """Serialize values json can't handle; binary ciphertext columns become base64."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode('ascii')
+    return str(value)
+
 def create_export_package(export_data: Dict[str, Any], user_id: str, export_type: str) -> bytes:
     """Create a ZIP package with the exported data."""
     zip_buffer = io.BytesIO()
     
     with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
         # Add JSON data
-        zip_file.writestr('user_data.json', json.dumps(export_data, indent=2, default=str))
+        zip_file.writestr('user_data.json', json.dumps(export_data, indent=2, default=json_default))
         
         # Add CSV files for each data type
         for data_type, data in export_data.items():
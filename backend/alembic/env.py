@@ -10,8 +10,9 @@ from alembic import context
 config = context.config
 
 # Interpret the config file for Python logging.
-# This line sets up loggers basically.
-if config.config_file_name is not None:
+# This line sets up loggers basically. Skipped when the app runs migrations
+# in-process (app.db.init_db) so its logging configuration is kept.
+if config.config_file_name is not None and "connection" not in config.attributes:
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
@@ -67,6 +68,17 @@ def run_migrations_online() -> None:
     from sqlalchemy import create_engine
     import os
     
+    # Connection handed over by app.db.init_db at startup
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(
+            connection=connection, target_metadata=target_metadata
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+    
     # Use environment variable if set (for tunnel), otherwise use app settings
     database_url = os.getenv('DATABASE_URL', settings.DATABASE_URL)
     connectable = create_engine(database_url)
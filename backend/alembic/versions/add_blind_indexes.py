@@ -0,0 +1,85 @@
+"""Add blind index columns for encrypted phone and email lookups
+
+Revision ID: blind_index_001
+Revises: key_rotation_001
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'blind_index_001'
+down_revision = 'key_rotation_001'
+branch_labels = None
+depends_on = None
+
+# table -> ((index column, encrypted source column), ...)
+BLIND_INDEXES = {
+    'users': (('phone_index', 'phone'),),
+    'providers': (('email_index', 'email'), ('phone_index', 'phone')),
+    'caregivers': (('email_index', 'email'), ('phone_index', 'phone')),
+}
+BACKFILL_BATCH_SIZE = 500
+
+
+def _backfill(connection, table_name, pairs) -> None:
+    """Compute blind indexes for existing rows, in primary key order."""
+    from app.core.encryption import get_encryption
+    from app.models.user import normalize_email, normalize_phone
+
+    encryption = get_encryption()
+    normalizers = {'email': normalize_email, 'phone': normalize_phone}
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.Integer),
+        *(sa.column(name, sa.String) for pair in pairs for name in pair)
+    )
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(table.c.id, *(table.c[source] for _, source in pairs))
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            values = {}
+            for (index, source), encrypted in zip(pairs, row[1:]):
+                if encrypted is not None:
+                    plaintext = normalizers[source](encryption.decrypt(encrypted))
+                    values[index] = encryption.blind_index(plaintext, source)
+            if values:
+                connection.execute(sa.update(table).where(table.c.id == row[0]).values(values))
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """
+    Add HMAC blind index columns next to searchable encrypted columns.
+    providers and caregivers are only altered where those tables exist.
+    """
+    connection = op.get_bind()
+    existing = set(sa.inspect(connection).get_table_names())
+    for table_name, pairs in BLIND_INDEXES.items():
+        if table_name not in existing:
+            continue
+        with op.batch_alter_table(table_name) as batch_op:
+            for index, _ in pairs:
+                batch_op.add_column(sa.Column(index, sa.String(length=32), nullable=True))
+                batch_op.create_index(f'ix_{table_name}_{index}', [index], unique=False)
+        _backfill(connection, table_name, pairs)
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    existing = set(sa.inspect(connection).get_table_names())
+    for table_name, pairs in BLIND_INDEXES.items():
+        if table_name not in existing:
+            continue
+        with op.batch_alter_table(table_name) as batch_op:
+            for index, _ in pairs:
+                batch_op.drop_index(f'ix_{table_name}_{index}')
+                batch_op.drop_column(index)
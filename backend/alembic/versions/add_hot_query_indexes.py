@@ -0,0 +1,90 @@
+"""Add composite indexes for hot filter/sort queries
+
+Revision ID: hot_query_indexes_001
+Revises: binary_ciphertext_001
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'hot_query_indexes_001'
+down_revision = 'binary_ciphertext_001'
+branch_labels = None
+depends_on = None
+
+# index name -> (table, columns). audit_logs has two shapes depending on
+# which model created it, so only the variant whose columns exist is built.
+HOT_INDEXES = {
+    'ix_chat_messages_session_id_created_at': ('chat_messages', ('session_id', 'created_at')),
+    'ix_chat_sessions_user_id_last_activity': ('chat_sessions', ('user_id', 'last_activity')),
+    'ix_health_metrics_user_id_metric_type_recorded_at': ('health_metrics', ('user_id', 'metric_type', 'recorded_at')),
+    'ix_consultations_user_id_created_at': ('consultations', ('user_id', 'created_at')),
+    'ix_symptom_answers_session_id_created_at': ('symptom_answers', ('session_id', 'created_at')),
+    'ix_blog_posts_author_id_status_created_at': ('blog_posts', ('author_id', 'status', 'created_at')),
+    'ix_data_exports_user_id_status': ('data_exports', ('user_id', 'status')),
+    'ix_audit_logs_user_id_timestamp': ('audit_logs', ('user_id', 'timestamp')),
+    'ix_audit_logs_user_id_created_at': ('audit_logs', ('user_id', 'created_at')),
+}
+
+# Single-column indexes that become redundant prefixes of the composites above
+REDUNDANT_INDEXES = {
+    'ix_chat_messages_session_id': ('chat_messages', ('session_id',)),
+    'ix_chat_sessions_user_id': ('chat_sessions', ('user_id',)),
+}
+
+
+def _columns(inspector):
+    return {
+        table: {column['name'] for column in inspector.get_columns(table)}
+        for table in inspector.get_table_names()
+    }
+
+
+def _create_index(name, table, columns) -> None:
+    # On Postgres build without locking out writes to busy tables
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, list(columns), unique=False, postgresql_concurrently=True)
+    else:
+        op.create_index(name, table, list(columns), unique=False)
+
+
+def _drop_index(name, table) -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        op.drop_index(name, table_name=table)
+
+
+def upgrade() -> None:
+    """
+    Create composite indexes behind the hot filter/sort queries, on tables
+    that exist, then drop single-column indexes they make redundant.
+    """
+    inspector = sa.inspect(op.get_bind())
+    columns = _columns(inspector)
+    for name, (table, index_columns) in HOT_INDEXES.items():
+        if table in columns and set(index_columns) <= columns[table]:
+            existing = {index['name'] for index in inspector.get_indexes(table)}
+            if name not in existing:
+                _create_index(name, table, index_columns)
+
+    inspector = sa.inspect(op.get_bind())
+    for name, (table, _) in REDUNDANT_INDEXES.items():
+        if table in columns and name in {index['name'] for index in inspector.get_indexes(table)}:
+            _drop_index(name, table)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    columns = _columns(inspector)
+    for name, (table, index_columns) in REDUNDANT_INDEXES.items():
+        if table in columns and name not in {index['name'] for index in inspector.get_indexes(table)}:
+            _create_index(name, table, index_columns)
+
+    for name, (table, _) in HOT_INDEXES.items():
+        if table in columns and name in {index['name'] for index in inspector.get_indexes(table)}:
+            _drop_index(name, table)
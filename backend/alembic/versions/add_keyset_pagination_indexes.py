@@ -0,0 +1,99 @@
+"""Add (timestamp, id) indexes for keyset pagination
+
+Revision ID: keyset_pagination_001
+Revises: hot_query_indexes_001
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'keyset_pagination_001'
+down_revision = 'hot_query_indexes_001'
+branch_labels = None
+depends_on = None
+
+# index name -> (table, columns). Each ends in (sort timestamp, id) so the
+# cursor seek and the ORDER BY ... id tie-breaker are served by the index.
+KEYSET_INDEXES = {
+    'ix_chat_sessions_user_id_last_activity_id': ('chat_sessions', ('user_id', 'last_activity', 'id')),
+    'ix_health_metrics_user_id_recorded_at_id': ('health_metrics', ('user_id', 'recorded_at', 'id')),
+    'ix_health_metrics_user_id_metric_type_recorded_at_id': (
+        'health_metrics', ('user_id', 'metric_type', 'recorded_at', 'id')
+    ),
+    'ix_consultations_user_id_created_at_id': ('consultations', ('user_id', 'created_at', 'id')),
+    'ix_blog_posts_author_id_created_at_id': ('blog_posts', ('author_id', 'created_at', 'id')),
+    'ix_blog_posts_author_id_status_created_at_id': ('blog_posts', ('author_id', 'status', 'created_at', 'id')),
+    'ix_conversations_user_id_started_at_id': ('conversations', ('user_id', 'started_at', 'id')),
+    'ix_messages_conversation_id_created_at_id': ('messages', ('conversation_id', 'created_at', 'id')),
+    'ix_conversation_memory_user_id_created_at_id': ('conversation_memory', ('user_id', 'created_at', 'id')),
+    'ix_symptom_sessions_user_id_started_at_id': ('symptom_sessions', ('user_id', 'started_at', 'id')),
+}
+
+# hot_query_indexes_001 indexes superseded by the id-suffixed versions above
+SUPERSEDED_INDEXES = {
+    'ix_chat_sessions_user_id_last_activity': ('chat_sessions', ('user_id', 'last_activity')),
+    'ix_health_metrics_user_id_metric_type_recorded_at': ('health_metrics', ('user_id', 'metric_type', 'recorded_at')),
+    'ix_consultations_user_id_created_at': ('consultations', ('user_id', 'created_at')),
+    'ix_blog_posts_author_id_status_created_at': ('blog_posts', ('author_id', 'status', 'created_at')),
+}
+
+
+def _columns(inspector):
+    return {
+        table: {column['name'] for column in inspector.get_columns(table)}
+        for table in inspector.get_table_names()
+    }
+
+
+def _index_names(inspector, table):
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def _create_index(name, table, columns) -> None:
+    # On Postgres build without locking out writes to busy tables
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, list(columns), unique=False, postgresql_concurrently=True)
+    else:
+        op.create_index(name, table, list(columns), unique=False)
+
+
+def _drop_index(name, table) -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        op.drop_index(name, table_name=table)
+
+
+def upgrade() -> None:
+    """
+    Create the keyset pagination indexes on tables that exist, then drop
+    the indexes they supersede.
+    """
+    inspector = sa.inspect(op.get_bind())
+    columns = _columns(inspector)
+    for name, (table, index_columns) in KEYSET_INDEXES.items():
+        if table in columns and set(index_columns) <= columns[table]:
+            if name not in _index_names(inspector, table):
+                _create_index(name, table, index_columns)
+
+    inspector = sa.inspect(op.get_bind())
+    for name, (table, _) in SUPERSEDED_INDEXES.items():
+        if table in columns and name in _index_names(inspector, table):
+            _drop_index(name, table)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    columns = _columns(inspector)
+    for name, (table, index_columns) in SUPERSEDED_INDEXES.items():
+        if table in columns and set(index_columns) <= columns[table]:
+            if name not in _index_names(inspector, table):
+                _create_index(name, table, index_columns)
+
+    for name, (table, _) in KEYSET_INDEXES.items():
+        if table in columns and name in _index_names(inspector, table):
+            _drop_index(name, table)
@@ -0,0 +1,37 @@
+"""Add reencryption checkpoints and merge migration heads
+
+Revision ID: key_rotation_001
+Revises: hipaa_encrypt_001, 87551ba3, enhanced_chat_v2
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'key_rotation_001'
+down_revision = ('hipaa_encrypt_001', '87551ba3', 'enhanced_chat_v2')
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Track per-table progress of key rotation re-encryption."""
+    op.create_table('reencryption_checkpoints',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('table_name', sa.String(length=100), nullable=False),
+        sa.Column('target_key_id', sa.Integer(), nullable=False),
+        sa.Column('last_id', sa.String(length=100), nullable=True),
+        sa.Column('rows_scanned', sa.Integer(), nullable=True),
+        sa.Column('rows_reencrypted', sa.Integer(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('table_name')
+    )
+    op.create_index(op.f('ix_reencryption_checkpoints_id'), 'reencryption_checkpoints', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_reencryption_checkpoints_id'), table_name='reencryption_checkpoints')
+    op.drop_table('reencryption_checkpoints')
@@ -0,0 +1,88 @@
+"""Store long encrypted text as binary envelopes
+
+Revision ID: binary_ciphertext_001
+Revises: blind_index_001
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'binary_ciphertext_001'
+down_revision = 'blind_index_001'
+branch_labels = None
+depends_on = None
+
+# table -> columns moved from base64 String ciphertext to LargeBinary
+BINARY_COLUMNS = {
+    'chat_messages': ('content',),
+    'personalized_remedies': ('description', 'instructions'),
+}
+CONVERT_BATCH_SIZE = 500
+
+
+def _convert(connection, table_name, columns, source_type, target_type, convert) -> None:
+    """Rewrite every value of columns into a temporary "<column>_new" column, in primary key order."""
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.String),
+        *(sa.column(column, source_type) for column in columns),
+        *(sa.column(f'{column}_new', target_type) for column in columns)
+    )
+    last_id = ''
+    while True:
+        rows = connection.execute(
+            sa.select(table.c.id, *(table.c[column] for column in columns))
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(CONVERT_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            values = {
+                f'{column}_new': convert(value)
+                for column, value in zip(columns, row[1:])
+                if value is not None
+            }
+            if values:
+                connection.execute(sa.update(table).where(table.c.id == row[0]).values(values))
+        last_id = rows[-1][0]
+
+
+def _migrate(source_type, target_type, convert) -> None:
+    connection = op.get_bind()
+    existing = set(sa.inspect(connection).get_table_names())
+    for table_name, columns in BINARY_COLUMNS.items():
+        if table_name not in existing:
+            continue
+        with op.batch_alter_table(table_name) as batch_op:
+            for column in columns:
+                batch_op.add_column(sa.Column(f'{column}_new', target_type, nullable=True))
+        _convert(connection, table_name, columns, source_type, target_type, convert)
+        with op.batch_alter_table(table_name) as batch_op:
+            for column in columns:
+                batch_op.drop_column(column)
+                batch_op.alter_column(f'{column}_new', new_column_name=column)
+
+
+def upgrade() -> None:
+    """
+    Convert chat message and remedy text to raw binary envelopes, compressing
+    long values, in batches.
+    """
+    from app.core.encryption import get_encryption
+
+    encryption = get_encryption()
+    _migrate(
+        sa.String, sa.LargeBinary,
+        lambda value: encryption.encrypt_bytes(encryption.decrypt(value), compress=True)
+    )
+
+
+def downgrade() -> None:
+    from app.core.encryption import get_encryption
+
+    encryption = get_encryption()
+    _migrate(sa.LargeBinary, sa.String, lambda value: encryption.encrypt(encryption.decrypt(value)))
@@ -1,13 +1,18 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
-from app.api.api_v1.endpoints import auth, users, health, ai, payments, conversations, feedback, admin, enhanced_ai, content
+from app.api import deps
+from app.api.api_v1.endpoints import (
+    auth, users, health, ai, payments, conversations, feedback, admin, enhanced_ai, content, aws_native_chat,
+)
 
-api_router = APIRouter()
+# Every route is charged its declared cost (route_policy) against the caller's budget
+api_router = APIRouter(dependencies=[Depends(deps.enforce_rate_limit)])
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(health.router, prefix="/health", tags=["health"])
 api_router.include_router(ai.router, prefix="/ai", tags=["ai"])
 api_router.include_router(enhanced_ai.router, prefix="/enhanced-ai", tags=["enhanced-ai"])
+api_router.include_router(aws_native_chat.router, prefix="/aws-chat", tags=["aws-chat"])
 api_router.include_router(content.router, prefix="/content", tags=["content"])
 api_router.include_router(payments.router, prefix="/payments", tags=["payments"])
 api_router.include_router(conversations.router, prefix="/conversations", tags=["conversations"])
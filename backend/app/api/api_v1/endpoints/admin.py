@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import Any, Dict, List
-from datetime import datetime, timedelta
+from sqlalchemy import func, desc, text
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta, timezone
 
 from app.api import deps
+from app.core.config import settings
+from app.core.monitoring import health_monitor
+from app.db.pool import pool_stats
+from app.db.slow_queries import slow_queries, slow_query_summary
 from app.models.user import User, SubscriptionTier
 from app.models.health import Consultation, HealthMetric
 from app.models.conversations import Conversation
@@ -12,9 +16,16 @@ from app.models.conversations import Conversation
 router = APIRouter()
 
 
+def _naive_utc(value: datetime) -> datetime:
+    """Compare database timestamps against naive utcnow() values."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
 @router.get("/dashboard-stats")
 def get_dashboard_stats(
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     current_user: User = Depends(deps.get_current_active_user)
 ) -> Any:
     """
@@ -100,18 +111,21 @@ def get_user_analytics(
     Get detailed user analytics.
     """
     
-    # User registration over time (last 30 days)
+    # User registration over time (last 30 days), bucketed from one query
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+    registrations = [
+        _naive_utc(created_at) for (created_at,) in db.query(User.created_at).filter(
+            User.created_at >= thirty_days_ago,
+            User.created_at < thirty_days_ago + timedelta(days=30)
+        )
+    ]
     
     daily_registrations = []
     for i in range(30):
         date = thirty_days_ago + timedelta(days=i)
         next_date = date + timedelta(days=1)
         
-        count = db.query(User).filter(
-            User.created_at >= date,
-            User.created_at < next_date
-        ).count()
+        count = sum(1 for created_at in registrations if date <= created_at < next_date)
         
         daily_registrations.append({
             "date": date.strftime("%Y-%m-%d"),
@@ -119,19 +133,15 @@ def get_user_analytics(
         })
     
     # Consultation usage by subscription tier
-    consultation_by_tier = {}
-    for tier in SubscriptionTier:
-        users_in_tier = db.query(User).filter(User.subscription_tier == tier).all()
-        user_ids = [u.id for u in users_in_tier]
-        
-        if user_ids:
-            consultations = db.query(Consultation).filter(
-                Consultation.user_id.in_(user_ids)
-            ).count()
-        else:
-            consultations = 0
-            
-        consultation_by_tier[tier.value] = consultations
+    consultation_counts = dict(
+        db.query(User.subscription_tier, func.count(Consultation.id))
+        .join(Consultation, Consultation.user_id == User.id)
+        .group_by(User.subscription_tier)
+        .all()
+    )
+    consultation_by_tier = {
+        tier.value: consultation_counts.get(tier, 0) for tier in SubscriptionTier
+    }
     
     return {
         "dailyRegistrations": daily_registrations,
@@ -150,30 +160,55 @@ def get_system_health(
     
     try:
         # Test database connection
-        db.execute("SELECT 1")
+        db.execute(text("SELECT 1"))
         db_status = "healthy"
     except Exception:
         db_status = "error"
     
-    # Check recent error rates (this would integrate with your logging system)
-    # For now, we'll simulate this
-    error_rate = 0.1  # 0.1% error rate
-    
-    # Response time metrics (would come from monitoring)
-    avg_response_time = 150  # ms
+    # Server errors and response times recorded by QueryStatsMiddleware
+    error_rate = health_monitor.error_rate_percent()
+    response_times = health_monitor.response_time_stats()
     
     return {
         "database": {
             "status": db_status,
-            "connections": "normal"
+            "connections": pool_stats().get("primary", {}),
+            "slowQueries": len(slow_queries())
         },
         "api": {
             "errorRate": error_rate,
-            "avgResponseTime": avg_response_time,
+            "avgResponseTime": response_times["avg_response_time_ms"],
+            "p95ResponseTime": response_times["p95_response_time_ms"],
             "status": "healthy" if error_rate < 1.0 else "warning"
         },
         "monitoring": {
             "sentry": "active",
             "analytics": "active"
         }
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/pool-stats")
+def get_pool_stats(
+    current_user: User = Depends(deps.get_current_active_user)
+) -> Any:
+    """
+    Connection pool occupancy and checkout metrics for every engine.
+    """
+    return pool_stats()
+
+
+@router.get("/slow-queries")
+def get_slow_queries(
+    limit: Optional[int] = 50,
+    current_user: User = Depends(deps.get_current_active_user)
+) -> Any:
+    """
+    Recent statements slower than SLOW_QUERY_THRESHOLD_MS with their query plans.
+    Parameter values are never recorded, only their types.
+    """
+    return {
+        "thresholdMs": settings.SLOW_QUERY_THRESHOLD_MS,
+        "recent": slow_queries(limit),
+        "summary": slow_query_summary()
+    }
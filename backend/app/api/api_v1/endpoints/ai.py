@@ -1,10 +1,13 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from openai import OpenAI
 
 from app.api import deps
 from app.core.config import settings
+from app.core.rate_limit import route_policy
+from app.db.pagination import NEXT_CURSOR_HEADER, Cursor, paginate, split_page
 from app.models.user import User
 from app.models.health import Consultation
 from app.schemas.ai import ChatRequest, ChatResponse, ConsultationCreate, ConsultationResponse
@@ -16,6 +19,7 @@ client = OpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else
 
 
 @router.post("/chat", response_model=ChatResponse)
+@route_policy(cost=settings.RATE_LIMIT_LLM_COST, llm=True)
 def chat_with_ai(
     *,
     db: Session = Depends(deps.get_db),
@@ -218,6 +222,7 @@ I'm here to support your health journey. Could you tell me more about what speci
 
 
 @router.post("/consultation", response_model=ConsultationResponse)
+@route_policy(cost=settings.RATE_LIMIT_LLM_COST, llm=True)
 def create_consultation(
     *,
     db: Session = Depends(deps.get_db),
@@ -227,13 +232,20 @@ def create_consultation(
     """
     Create a detailed health consultation.
     """
-    # Check consultation limits using proper unlimited logic
-    from app.core.subscription_config import can_create_consultation
+    # Count the consultation in SQL before doing the work. current_user's
+    # counters may come from the principal cache, and concurrent requests
+    # must not both pass a check of the same value. The condition mirrors
+    # can_create_consultation (-1 is unlimited).
+    reserved = db.query(User).filter(
+        User.id == current_user.id,
+        or_(User.consultations_limit == -1, User.consultations_used < User.consultations_limit),
+    ).update({User.consultations_used: User.consultations_used + 1}, synchronize_session=False)
+    db.commit()
+    db.refresh(current_user)
     
-    if not can_create_consultation(current_user.consultations_used, current_user.consultations_limit):
-        from app.core.subscription_config import get_tier_display_name, get_remaining_consultations
+    if not reserved:
+        from app.core.subscription_config import get_tier_display_name
         
-        remaining = get_remaining_consultations(current_user.consultations_used, current_user.consultations_limit)
         tier_name = get_tier_display_name(current_user.subscription_tier)
         
         raise HTTPException(
@@ -276,7 +288,6 @@ def create_consultation(
         )
         
         db.add(consultation)
-        current_user.consultations_used += 1
         db.commit()
         db.refresh(consultation)
         
@@ -296,26 +307,36 @@ def create_consultation(
         )
         
     except Exception as e:
+        # Give the reserved consultation back
+        db.rollback()
+        db.query(User).filter(User.id == current_user.id).update(
+            {User.consultations_used: User.consultations_used - 1}, synchronize_session=False
+        )
+        db.commit()
         raise HTTPException(status_code=500, detail=f"Consultation service error: {str(e)}")
 
 
 @router.get("/consultations", response_model=List[ConsultationResponse])
 def get_user_consultations(
+    response: Response,
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
     skip: int = 0,
     limit: int = 10,
+    cursor: Optional[Cursor] = Depends(deps.get_cursor),
 ) -> Any:
     """
-    Get user's consultation history.
+    Get user's consultation history, most recent first.
     """
-    consultations = (
-        db.query(Consultation)
-        .filter(Consultation.user_id == current_user.id)
-        .offset(skip)
-        .limit(limit)
-        .all()
+    consultations, next_cursor = split_page(
+        paginate(
+            db.query(Consultation).filter(Consultation.user_id == current_user.id),
+            Consultation.created_at, Consultation.id, cursor=cursor, limit=limit, offset=skip
+        ).all(),
+        limit, Consultation.created_at, Consultation.id
     )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     return [
         ConsultationResponse(
@@ -1,5 +1,5 @@
 from datetime import timedelta
-from typing import Any
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
@@ -8,20 +8,67 @@ import logging
 from app.api import deps
 from app.core import security
 from app.core.config import settings
+from app.core.executors import ExecutorBusy, RequestExecutor
+from app.core.refresh_tokens import (
+    InvalidRefreshToken, issue_refresh_token, revoke_refresh_token, revoke_user_refresh_tokens, rotate_refresh_token,
+)
 from app.core.sentry import capture_exception_with_context, set_user_context, add_breadcrumb
 from app.models.user import User
-from app.schemas.auth import Token, UserCreate, UserResponse
+from app.schemas.auth import RefreshRequest, Token, TokenRefresh, UserCreate, UserResponse
 from app.schemas.user import UserCreate as UserCreateSchema
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+T = TypeVar("T")
+
+
+def _get_user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email).first()
+
+
+def _record_login(db: Session, user: User, new_hash: Optional[str]) -> str:
+    """Store a rehashed password, if any, and start a refresh-token family; returns the refresh token."""
+    if new_hash:
+        # The work factor was raised since this hash was made
+        user.hashed_password = new_hash
+    _, refresh_token = issue_refresh_token(db, user.id)
+    db.commit()
+    db.refresh(user)
+    return refresh_token
+
+
+def _renew_tokens(db: Session, token: str) -> Tuple[int, Dict[str, Any], str]:
+    """Rotate a refresh token; returns the user id, fresh access-token claims and the new refresh token."""
+    user_id, refresh_token = rotate_refresh_token(db, token)
+    # From the row, not the principal cache: these become the new token's claims
+    row = db.query(User.is_active, User.subscription_tier).filter(User.id == user_id).first()
+    is_active, tier = (row.is_active, row.subscription_tier) if row else (False, None)
+    if not is_active:
+        revoke_user_refresh_tokens(db, user_id)
+        db.commit()
+        raise InvalidRefreshToken("Inactive user")
+    return user_id, security.principal_claims(is_active, tier), refresh_token
+
+
+async def _hash_work(executor: RequestExecutor, fn: Callable[..., T], *args: Any) -> T:
+    """Run bcrypt on the password pool, shedding the request with 503 when it is saturated."""
+    try:
+        return await executor.run_password_hashing(fn, *args)
+    except ExecutorBusy:
+        logger.warning("Password hashing pool is full, rejecting auth request")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication is temporarily busy. Please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+
 
 @router.post("/register", response_model=UserResponse)
-def register(
+async def register(
     *,
-    db: Session = Depends(deps.get_db),
+    executor: RequestExecutor = Depends(deps.get_executor),
     user_in: UserCreate,
 ) -> Any:
     """
@@ -31,7 +78,7 @@ def register(
         add_breadcrumb("Starting user registration", category="auth")
         
         # Check if user already exists
-        user = db.query(User).filter(User.email == user_in.email).first()
+        user = await executor.run_db(_get_user_by_email, user_in.email)
         if user:
             add_breadcrumb("User registration failed - email exists", category="auth", level="warning")
             raise HTTPException(
@@ -42,13 +89,11 @@ def register(
         # Create new user
         user = User(
             email=user_in.email,
-            hashed_password=security.get_password_hash(user_in.password),
+            hashed_password=await _hash_work(executor, security.get_password_hash, user_in.password),
             full_name=user_in.full_name,
             is_active=True,
         )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+        await executor.save(user)
         
         # Set user context for Sentry
         set_user_context(user.id, user.email)
@@ -85,8 +130,8 @@ def register(
 
 
 @router.post("/login", response_model=Token)
-def login_for_access_token(
-    db: Session = Depends(deps.get_db),
+async def login_for_access_token(
+    executor: RequestExecutor = Depends(deps.get_executor),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
@@ -95,8 +140,13 @@ def login_for_access_token(
     try:
         add_breadcrumb("Starting user login", category="auth")
         
-        user = db.query(User).filter(User.email == form_data.username).first()
-        if not user or not security.verify_password(form_data.password, user.hashed_password):
+        user = await executor.run_db(_get_user_by_email, form_data.username)
+        valid, new_hash = False, None
+        if user:
+            valid, new_hash = await _hash_work(
+                executor, security.verify_and_update_password, form_data.password, user.hashed_password
+            )
+        if not valid:
             add_breadcrumb("Login failed - invalid credentials", category="auth", level="warning")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -108,19 +158,23 @@ def login_for_access_token(
             set_user_context(user.id, user.email)
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Inactive user")
         
+        refresh_token = await executor.run_db(_record_login, user, new_hash)
+        
         # Set user context for Sentry
         set_user_context(user.id, user.email)
         add_breadcrumb("User login successful", category="auth")
         
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = security.create_access_token(
-            user.id, expires_delta=access_token_expires
+            user.id, expires_delta=access_token_expires,
+            claims=security.principal_claims(user.is_active, user.subscription_tier),
         )
         
         logger.info(f"User logged in: {user.id}")
         
         return {
             "access_token": access_token,
+            "refresh_token": refresh_token,
             "token_type": "bearer",
             "user": UserResponse(
                 id=user.id,
@@ -150,6 +204,48 @@ def login_for_access_token(
         )
 
 
+@router.post("/refresh", response_model=TokenRefresh)
+async def refresh_access_token(
+    body: RefreshRequest,
+    executor: RequestExecutor = Depends(deps.get_executor),
+) -> Any:
+    """
+    Exchange a refresh token for a new access token and refresh token,
+    without a password check. Each refresh token works once.
+    """
+    try:
+        user_id, claims, refresh_token = await executor.run_db(_renew_tokens, body.refresh_token)
+    except InvalidRefreshToken as e:
+        add_breadcrumb(f"Token refresh rejected - {e}", category="auth", level="warning")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return {
+        "access_token": security.create_access_token(user_id, claims=claims),
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+    }
+
+
+@router.post("/logout")
+async def logout(
+    body: RefreshRequest,
+    executor: RequestExecutor = Depends(deps.get_executor),
+) -> Any:
+    """
+    Revoke the refresh token and every token rotated from the same login.
+    Access tokens already issued stay valid until they expire.
+    """
+    try:
+        await executor.run_db(revoke_refresh_token, body.refresh_token)
+    except InvalidRefreshToken:
+        pass  # Already unusable
+    return {"status": "success"}
+
+
 @router.post("/test-token", response_model=UserResponse)
 def test_token(current_user: User = Depends(deps.get_current_user)) -> Any:
     """
@@ -1,77 +1,50 @@
 # AWS-Native Chat Endpoints for CareBow
 # Enhanced endpoints that integrate with AWS services for HIPAA-compliant chat functionality
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Response
+from typing import Optional
 import json
-import boto3
-import uuid
 from datetime import datetime, timedelta
 import logging
 
-from app.core.database import get_db
+from app.api.deps import get_current_principal, get_cursor, get_executor
 from app.core.config import settings
 from app.models.enhanced_chat import (
-    ChatSession, ChatMessage, PersonalizedRemedy, HealthMemory, 
-    UserPreferences, DataExport, DataDeletion, ConversationMemory
+    ChatSession, ChatMessage, PersonalizedRemedy, DataExport, DataDeletion, ConversationMemory
 )
 from app.schemas.enhanced_chat import (
     ChatSessionCreate, ChatSessionResponse, ChatMessageCreate, ChatMessageResponse,
-    PersonalizedRemedyResponse, HealthMemoryCreate, HealthMemoryResponse,
-    UserPreferencesCreate, UserPreferencesResponse, DataExportResponse,
-    DataDeletionResponse, ConversationMemoryResponse
+    DataExportResponse, DataDeletionResponse, ConversationMemoryResponse
 )
 from app.services.enhanced_ai_service import EnhancedAIService
+from openai import OpenAI
 from app.core.aws_client import get_aws_client
+from app.core.executors import RequestExecutor, run_io
+from app.core.rate_limit import route_policy
+from app.core.security import TokenPrincipal
+from app.db.pagination import NEXT_CURSOR_HEADER, Cursor, paginate, split_page
+from app.db.unit_of_work import UnitOfWork, new_id
 
 router = APIRouter()
-security = HTTPBearer()
 logger = logging.getLogger(__name__)
 
-# AWS Clients
-s3_client = boto3.client('s3')
-sqs_client = boto3.client('sqs')
-sns_client = boto3.client('sns')
-stepfunctions_client = boto3.client('stepfunctions')
-opensearch_client = boto3.client('opensearchserverless')
+ai_service = EnhancedAIService(OpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else None)
 
-# Dependency to get current user from Cognito JWT
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Extract user information from Cognito JWT token"""
-    try:
-        # In production, validate JWT with Cognito
-        # For now, extract from token claims
-        token = credentials.credentials
-        # TODO: Implement JWT validation with Cognito
-        # This would typically involve:
-        # 1. Decode JWT
-        # 2. Validate signature with Cognito public keys
-        # 3. Check expiration
-        # 4. Extract user_id from 'sub' claim
-        
-        # Mock implementation for development
-        user_id = "mock-user-id"  # Replace with actual JWT validation
-        return {"user_id": user_id, "email": "user@example.com"}
-    except Exception as e:
-        logger.error(f"Error validating JWT token: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials"
-        )
+# Earlier turns sent to the model with each message
+HISTORY_MESSAGES = 20
 
 @router.post("/sessions", response_model=ChatSessionResponse)
 async def create_chat_session(
     session_data: ChatSessionCreate,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: TokenPrincipal = Depends(get_current_principal),
+    executor: RequestExecutor = Depends(get_executor)
 ):
     """Create a new chat session with AWS-native features"""
     try:
         # Create chat session
         db_session = ChatSession(
-            user_id=current_user["user_id"],
+            id=new_id(),
+            user_id=current_user.id,
             title=session_data.title,
             is_continuous=session_data.is_continuous,
             memory_enabled=session_data.memory_enabled,
@@ -80,23 +53,22 @@ async def create_chat_session(
             data_retention_policy=session_data.data_retention_policy
         )
         
-        db.add(db_session)
-        db.commit()
-        db.refresh(db_session)
+        await executor.save(db_session)
         
         # Store session metadata in S3 for audit
         session_metadata = {
             "session_id": str(db_session.id),
-            "user_id": current_user["user_id"],
+            "user_id": current_user.id,
             "created_at": db_session.created_at.isoformat(),
             "title": db_session.title,
             "is_continuous": db_session.is_continuous,
             "memory_enabled": db_session.memory_enabled
         }
         
-        s3_client.put_object(
+        await executor.run_io(
+            get_aws_client("s3").put_object,
             Bucket=settings.S3_CHAT_DATA_BUCKET,
-            Key=f"sessions/{current_user['user_id']}/{db_session.id}/metadata.json",
+            Key=f"sessions/{current_user.id}/{db_session.id}/metadata.json",
             Body=json.dumps(session_metadata),
             ContentType="application/json",
             ServerSideEncryption="AES256"
@@ -112,20 +84,23 @@ async def create_chat_session(
         )
 
 @router.post("/sessions/{session_id}/messages", response_model=ChatMessageResponse)
+@route_policy(cost=settings.RATE_LIMIT_LLM_COST, llm=True)
 async def send_message(
     session_id: str,
     message_data: ChatMessageCreate,
     background_tasks: BackgroundTasks,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: TokenPrincipal = Depends(get_current_principal),
+    executor: RequestExecutor = Depends(get_executor)
 ):
     """Send a message and get AI response with AWS-native processing"""
     try:
         # Get chat session
-        session = db.query(ChatSession).filter(
-            ChatSession.id == session_id,
-            ChatSession.user_id == current_user["user_id"]
-        ).first()
+        session = await executor.run_db(
+            lambda db: db.query(ChatSession).filter(
+                ChatSession.id == session_id,
+                ChatSession.user_id == current_user.id
+            ).first()
+        )
         
         if not session:
             raise HTTPException(
@@ -133,12 +108,16 @@ async def send_message(
                 detail="Chat session not found"
             )
         
+        # Everything this turn writes is committed once, at the end. Ids and
+        # timestamps are assigned client-side, so they can be used for the
+        # S3 and OpenSearch records before the commit.
+        unit = UnitOfWork()
+        
         # Create user message
-        user_message = ChatMessage(
+        user_message = unit.add(ChatMessage(
             session_id=session_id,
-            user_id=current_user["user_id"],
+            role="user",
             content=message_data.content,
-            message_type="user",
             message_sequence=message_data.message_sequence,
             parent_message_id=message_data.parent_message_id,
             is_edited=message_data.is_edited,
@@ -148,76 +127,72 @@ async def send_message(
             context_used=message_data.context_used,
             follow_up_required=message_data.follow_up_required,
             follow_up_scheduled=message_data.follow_up_scheduled
-        )
-        
-        db.add(user_message)
-        db.commit()
-        db.refresh(user_message)
+        ))
         
         # Store message in S3 for audit
         message_metadata = {
             "message_id": str(user_message.id),
             "session_id": session_id,
-            "user_id": current_user["user_id"],
+            "user_id": current_user.id,
             "content": user_message.content,
-            "message_type": user_message.message_type,
+            "message_type": user_message.role,
             "created_at": user_message.created_at.isoformat()
         }
         
-        s3_client.put_object(
+        await executor.run_io(
+            get_aws_client("s3").put_object,
             Bucket=settings.S3_CHAT_DATA_BUCKET,
-            Key=f"messages/{current_user['user_id']}/{session_id}/{user_message.id}/metadata.json",
+            Key=f"messages/{current_user.id}/{session_id}/{user_message.id}/metadata.json",
             Body=json.dumps(message_metadata),
             ContentType="application/json",
             ServerSideEncryption="AES256"
         )
         
-        # Process message with AI service
-        ai_service = EnhancedAIService(db)
-        
-        # Get conversation memories
-        conversation_memories = ai_service.get_conversation_memory(current_user["user_id"])
-        
-        # Generate AI response
-        ai_response = await ai_service.process_message(
-            user_id=current_user["user_id"],
-            session_id=session_id,
-            message_content=message_data.content,
-            conversation_memories=conversation_memories
+        # Earlier turns of this session, decrypted on the DB thread
+        history = await executor.run_db(
+            lambda db: [
+                {"role": m.role, "content": m.content or ""}
+                for m in reversed(
+                    db.query(ChatMessage)
+                    .filter(ChatMessage.session_id == session_id)
+                    .order_by(ChatMessage.created_at.desc())
+                    .limit(HISTORY_MESSAGES)
+                    .all()
+                )
+            ]
         )
         
+        # Generate AI response; the OpenAI call runs on the I/O pool
+        ai_response = await ai_service.process_message(message_data.content, history=history)
+        
         # Create AI message
-        ai_message = ChatMessage(
+        ai_message = unit.add(ChatMessage(
             session_id=session_id,
-            user_id=current_user["user_id"],
+            role="assistant",
             content=ai_response["response"],
-            message_type="assistant",
-            message_sequence=user_message.message_sequence + 1,
+            message_sequence=(user_message.message_sequence or 0) + 1,
             parent_message_id=user_message.id,
             empathy_indicators=ai_response.get("empathy_indicators", {}),
             context_used=ai_response.get("context_used", {}),
             follow_up_required=ai_response.get("follow_up_required", False),
             follow_up_scheduled=ai_response.get("follow_up_scheduled")
-        )
-        
-        db.add(ai_message)
-        db.commit()
-        db.refresh(ai_message)
+        ))
         
         # Store AI response in S3
         ai_message_metadata = {
             "message_id": str(ai_message.id),
             "session_id": session_id,
-            "user_id": current_user["user_id"],
+            "user_id": current_user.id,
             "content": ai_message.content,
-            "message_type": ai_message.message_type,
+            "message_type": ai_message.role,
             "created_at": ai_message.created_at.isoformat(),
             "ai_metadata": ai_response.get("metadata", {})
         }
         
-        s3_client.put_object(
+        await executor.run_io(
+            get_aws_client("s3").put_object,
             Bucket=settings.S3_CHAT_DATA_BUCKET,
-            Key=f"messages/{current_user['user_id']}/{session_id}/{ai_message.id}/metadata.json",
+            Key=f"messages/{current_user.id}/{session_id}/{ai_message.id}/metadata.json",
             Body=json.dumps(ai_message_metadata),
             ContentType="application/json",
             ServerSideEncryption="AES256"
@@ -226,7 +201,7 @@ async def send_message(
         # Store conversation memory in OpenSearch
         if session.memory_enabled:
             memory_data = {
-                "user_id": current_user["user_id"],
+                "user_id": current_user.id,
                 "session_id": session_id,
                 "message_id": str(ai_message.id),
                 "content": ai_response["response"],
@@ -235,46 +210,57 @@ async def send_message(
             }
             
             # Index in OpenSearch for semantic search
-            opensearch_client.index(
-                index=f"carebow-memories-{current_user['user_id']}",
+            await executor.run_io(
+                get_aws_client("opensearch").index,
+                index=f"carebow-memories-{current_user.id}",
                 body=memory_data
             )
+            
+            # Memories extracted from this turn, one bulk INSERT
+            unit.add_rows(ConversationMemory, [
+                {
+                    "user_id": current_user.id,
+                    "memory_type": memory["type"],
+                    "title": memory.get("title", ""),
+                    "content": memory["content"],
+                    "importance_score": memory.get("importance_score", 0.5),
+                    "confidence_score": memory.get("confidence_score", 0.5),
+                    "context": {"session_id": session_id, "message_id": ai_message.id},
+                    "tags": memory.get("tags", []),
+                }
+                for memory in ai_response.get("memories", [])
+            ])
+        
+        # Personalized remedies, one bulk INSERT
+        unit.add_rows(PersonalizedRemedy, [
+            {
+                "session_id": session_id,
+                "message_id": ai_message.id,
+                "user_id": current_user.id,
+                "remedy_type": remedy_data["type"],
+                "title": remedy_data["title"],
+                "description": remedy_data["description"],
+                "instructions": remedy_data["instructions"],
+                "medical_disclaimer": remedy_data.get("safety_notes", ""),
+                "confidence_score": remedy_data.get("effectiveness_score", 0.0),
+                "personalization_factors": remedy_data.get("personalization_factors", {}),
+            }
+            for remedy_data in ai_response.get("remedies") or []
+        ])
         
-        # Create personalized remedies if applicable
-        remedies = []
-        if ai_response.get("remedies"):
-            for remedy_data in ai_response["remedies"]:
-                remedy = PersonalizedRemedy(
-                    session_id=session_id,
-                    user_id=current_user["user_id"],
-                    remedy_type=remedy_data["type"],
-                    title=remedy_data["title"],
-                    description=remedy_data["description"],
-                    instructions=remedy_data["instructions"],
-                    safety_notes=remedy_data.get("safety_notes", ""),
-                    effectiveness_score=remedy_data.get("effectiveness_score", 0.0),
-                    personalization_factors=remedy_data.get("personalization_factors", {}),
-                    comfort_level=remedy_data.get("comfort_level", "medium"),
-                    empathy_phrases=remedy_data.get("empathy_phrases", []),
-                    comfort_message=remedy_data.get("comfort_message", "")
-                )
-                
-                db.add(remedy)
-                db.commit()
-                db.refresh(remedy)
-                remedies.append(remedy)
+        await executor.commit(unit)
         
         # Schedule background tasks
         background_tasks.add_task(
             store_conversation_memory,
-            current_user["user_id"],
+            current_user.id,
             session_id,
             ai_response
         )
         
         background_tasks.add_task(
             update_user_analytics,
-            current_user["user_id"],
+            current_user.id,
             session_id,
             message_data.content
         )
@@ -291,35 +277,35 @@ async def send_message(
 @router.post("/export-data", response_model=DataExportResponse)
 async def request_data_export(
     export_type: str = "full",
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: TokenPrincipal = Depends(get_current_principal),
+    executor: RequestExecutor = Depends(get_executor)
 ):
     """Request data export with AWS Step Functions orchestration"""
     try:
         # Create export request record
         export_request = DataExport(
-            user_id=current_user["user_id"],
+            id=new_id(),
+            user_id=current_user.id,
             export_type=export_type,
             status="pending",
             requested_at=datetime.utcnow(),
             expires_at=datetime.utcnow() + timedelta(days=7)
         )
         
-        db.add(export_request)
-        db.commit()
-        db.refresh(export_request)
+        await executor.save(export_request)
         
         # Start Step Functions execution
         execution_input = {
-            "user_id": current_user["user_id"],
+            "user_id": current_user.id,
             "export_id": str(export_request.id),
             "export_type": export_type,
             "requested_at": export_request.requested_at.isoformat()
         }
         
-        stepfunctions_client.start_execution(
+        await executor.run_io(
+            get_aws_client("stepfunctions").start_execution,
             stateMachineArn=settings.DATA_EXPORT_STATE_MACHINE_ARN,
-            name=f"export-{current_user['user_id']}-{export_request.id}",
+            name=f"export-{current_user.id}-{export_request.id}",
             input=json.dumps(execution_input)
         )
         
@@ -335,14 +321,15 @@ async def request_data_export(
 @router.post("/delete-account", response_model=DataDeletionResponse)
 async def request_account_deletion(
     reason: str = "User requested account deletion",
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: TokenPrincipal = Depends(get_current_principal),
+    executor: RequestExecutor = Depends(get_executor)
 ):
     """Request account deletion with grace period"""
     try:
         # Create deletion request record
         deletion_request = DataDeletion(
-            user_id=current_user["user_id"],
+            id=new_id(),
+            user_id=current_user.id,
             deletion_type="account",
             status="pending",
             reason=reason,
@@ -352,22 +339,21 @@ async def request_account_deletion(
             can_cancel=True
         )
         
-        db.add(deletion_request)
-        db.commit()
-        db.refresh(deletion_request)
+        await executor.save(deletion_request)
         
         # Start Step Functions execution
         execution_input = {
-            "user_id": current_user["user_id"],
+            "user_id": current_user.id,
             "deletion_id": str(deletion_request.id),
             "deletion_type": "account",
             "reason": reason,
             "requested_at": deletion_request.requested_at.isoformat()
         }
         
-        stepfunctions_client.start_execution(
+        await executor.run_io(
+            get_aws_client("stepfunctions").start_execution,
             stateMachineArn=settings.DATA_DELETION_STATE_MACHINE_ARN,
-            name=f"deletion-{current_user['user_id']}-{deletion_request.id}",
+            name=f"deletion-{current_user.id}-{deletion_request.id}",
             input=json.dumps(execution_input)
         )
         
@@ -384,14 +370,15 @@ async def request_account_deletion(
 async def search_memories(
     query: str,
     limit: int = 10,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: TokenPrincipal = Depends(get_current_principal),
+    executor: RequestExecutor = Depends(get_executor)
 ):
     """Search conversation memories using OpenSearch"""
     try:
         # Search in OpenSearch
-        search_response = opensearch_client.search(
-            index=f"carebow-memories-{current_user['user_id']}",
+        search_response = await executor.run_io(
+            get_aws_client("opensearch").search,
+            index=f"carebow-memories-{current_user.id}",
             body={
                 "query": {
                     "multi_match": {
@@ -426,16 +413,23 @@ async def search_memories(
 
 @router.get("/memories")
 async def get_all_memories(
+    response: Response,
     limit: int = 50,
     offset: int = 0,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    cursor: Optional[Cursor] = Depends(get_cursor),
+    current_user: TokenPrincipal = Depends(get_current_principal),
+    executor: RequestExecutor = Depends(get_executor)
 ):
-    """Get all conversation memories for the user"""
+    """Get all conversation memories for the user, newest first"""
     try:
-        memories = db.query(ConversationMemory).filter(
-            ConversationMemory.user_id == current_user["user_id"]
-        ).offset(offset).limit(limit).all()
+        memories, next_cursor = split_page(await executor.run_db(
+            lambda db: paginate(
+                db.query(ConversationMemory).filter(ConversationMemory.user_id == current_user.id),
+                ConversationMemory.created_at, ConversationMemory.id, cursor=cursor, limit=limit, offset=offset
+            ).all()
+        ), limit, ConversationMemory.created_at, ConversationMemory.id)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         return [ConversationMemoryResponse.from_orm(memory) for memory in memories]
         
@@ -447,7 +441,7 @@ async def get_all_memories(
         )
 
 # Background task functions
-async def store_conversation_memory(user_id: str, session_id: str, ai_response: dict):
+async def store_conversation_memory(user_id: int, session_id: str, ai_response: dict):
     """Store conversation memory in OpenSearch"""
     try:
         memory_data = {
@@ -458,7 +452,8 @@ async def store_conversation_memory(user_id: str, session_id: str, ai_response:
             "metadata": ai_response.get("metadata", {})
         }
         
-        opensearch_client.index(
+        await run_io(
+            get_aws_client("opensearch").index,
             index=f"carebow-memories-{user_id}",
             body=memory_data
         )
@@ -466,7 +461,7 @@ async def store_conversation_memory(user_id: str, session_id: str, ai_response:
     except Exception as e:
         logger.error(f"Error storing conversation memory: {e}")
 
-async def update_user_analytics(user_id: str, session_id: str, message_content: str):
+async def update_user_analytics(user_id: int, session_id: str, message_content: str):
     """Update user analytics in S3"""
     try:
         analytics_data = {
@@ -477,7 +472,8 @@ async def update_user_analytics(user_id: str, session_id: str, message_content:
             "message_type": "user_input"
         }
         
-        s3_client.put_object(
+        await run_io(
+            get_aws_client("s3").put_object,
             Bucket=settings.S3_CHAT_DATA_BUCKET,
             Key=f"analytics/{user_id}/{session_id}/{datetime.utcnow().strftime('%Y/%m/%d')}/analytics.json",
             Body=json.dumps(analytics_data),
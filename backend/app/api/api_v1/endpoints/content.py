@@ -12,6 +12,7 @@ import math
 
 from app.api import deps
 from app.core.config import settings
+from app.db.pagination import Cursor, paginate, split_page
 from app.models.user import User
 from app.models.content import BlogPost, ContentAnalytics, ContentCategory, ContentTag, ContentTemplate, ContentSchedule
 from app.schemas.content import (
@@ -187,15 +188,20 @@ def create_blog_post(
 @router.get("/posts", response_model=BlogPostListResponse)
 def list_blog_posts(
     *,
-    db: Session = Depends(deps.get_db),
+    db: Session = Depends(deps.get_read_db),
     current_user: User = Depends(deps.get_current_active_user),
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
     status: Optional[ContentStatus] = None,
     category: Optional[str] = None,
     search: Optional[str] = None,
+    cursor: Optional[Cursor] = Depends(deps.get_cursor),
 ) -> Any:
-    """List blog posts with filtering and pagination"""
+    """List blog posts with filtering and pagination, newest first.
+    
+    Pass next_cursor back as cursor for the following page; page is
+    ignored when a cursor is given.
+    """
     
     query = db.query(BlogPost).filter(BlogPost.author_id == current_user.id)
     
@@ -216,7 +222,10 @@ def list_blog_posts(
     
     # Apply pagination
     offset = (page - 1) * per_page
-    posts = query.order_by(desc(BlogPost.created_at)).offset(offset).limit(per_page).all()
+    posts, next_cursor = split_page(
+        paginate(query, BlogPost.created_at, BlogPost.id, cursor=cursor, limit=per_page, offset=offset).all(),
+        per_page, BlogPost.created_at, BlogPost.id
+    )
     
     # Add author names
     for post in posts:
@@ -229,7 +238,8 @@ def list_blog_posts(
         total=total,
         page=page,
         per_page=per_page,
-        total_pages=total_pages
+        total_pages=total_pages,
+        next_cursor=next_cursor
     )
 
 
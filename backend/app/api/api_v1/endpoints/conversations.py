@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, Response, WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import uuid
@@ -8,7 +8,8 @@ from datetime import datetime
 from app.db.session import get_db
 from app.schemas.conversations import ConversationCreate, ConversationResponse, MessageCreate, MessageResponse
 from app.models.conversations import Conversation, Message
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, get_cursor
+from app.db.pagination import NEXT_CURSOR_HEADER, Cursor, paginate, split_page
 from app.models.user import User
 
 router = APIRouter()
@@ -70,15 +71,20 @@ def get_conversation(
 
 @router.get("/", response_model=List[ConversationResponse])
 def list_conversations(
+    response: Response,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[Cursor] = Depends(get_cursor),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """List user's conversations."""
-    conversations = db.query(Conversation).filter(
-        Conversation.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    """List user's conversations, most recently started first."""
+    conversations, next_cursor = split_page(paginate(
+        db.query(Conversation).filter(Conversation.user_id == current_user.id),
+        Conversation.started_at, Conversation.id, cursor=cursor, limit=limit, offset=skip
+    ).all(), limit, Conversation.started_at, Conversation.id)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     return conversations
 
@@ -118,12 +124,14 @@ def add_message(
 @router.get("/{conversation_id}/messages", response_model=List[MessageResponse])
 def list_messages(
     conversation_id: str,
+    response: Response,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[Cursor] = Depends(get_cursor),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """List messages in a conversation."""
+    """List messages in a conversation, oldest first."""
     # Verify conversation belongs to user
     conversation = db.query(Conversation).filter(
         Conversation.id == conversation_id,
@@ -133,9 +141,12 @@ def list_messages(
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    messages = db.query(Message).filter(
-        Message.conversation_id == conversation_id
-    ).offset(skip).limit(limit).all()
+    messages, next_cursor = split_page(paginate(
+        db.query(Message).filter(Message.conversation_id == conversation_id),
+        Message.created_at, Message.id, cursor=cursor, limit=limit, offset=skip, descending=False
+    ).all(), limit, Message.created_at, Message.id)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     return messages
 
@@ -9,6 +9,7 @@ from pydantic import BaseModel
 
 from app.api import deps
 from app.core.config import settings
+from app.core.rate_limit import route_policy
 from app.models.user import User
 from app.services.enhanced_ai_service import EnhancedAIService, SymptomContext, AIAnalysis, UrgencyLevel
 from openai import OpenAI
@@ -49,6 +50,7 @@ class FollowUpQuestionResponse(BaseModel):
     next_steps: List[str]
 
 @router.post("/analyze-symptoms", response_model=SymptomAnalysisResponse)
+@route_policy(cost=settings.RATE_LIMIT_LLM_COST, llm=True)
 def analyze_symptoms(
     *,
     db: Session = Depends(deps.get_db),
@@ -186,6 +188,7 @@ def get_urgency_levels() -> Any:
     }
 
 @router.post("/quick-assessment")
+@route_policy(cost=settings.RATE_LIMIT_LLM_COST, llm=True)
 def quick_health_assessment(
     *,
     db: Session = Depends(deps.get_db),
@@ -1,19 +1,34 @@
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Response
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 import uuid
+from openai import OpenAI
 
 from app.api import deps
+from app.db.batch_decrypt import execute_decrypted
+from app.db.pagination import NEXT_CURSOR_HEADER, Cursor, paginate, split_page
 from app.models.user import User
 from app.models.enhanced_chat import ChatSession, ChatMessage, PersonalizedRemedy, HealthMemory, UserPreferences
 from app.services.enhanced_ai_service import EnhancedAIService
 from app.core.encryption import get_encryption
+from app.core.config import settings
+from app.core.executors import RequestExecutor
+from app.core.rate_limit import route_policy
+from app.core.security import TokenPrincipal
+from app.db.unit_of_work import UnitOfWork
 
 router = APIRouter()
-ai_service = EnhancedAIService()
+# Initialize OpenAI client
+client = OpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else None
+ai_service = EnhancedAIService(client)
 encryption = get_encryption()
 
+# Earlier turns sent to the model with each message
+HISTORY_MESSAGES = 20
+
 
 # Pydantic models for API
 class ChatMessageRequest(BaseModel):
@@ -73,10 +88,10 @@ class UserPreferencesRequest(BaseModel):
 
 
 @router.post("/sessions", response_model=ChatSessionResponse)
-def create_chat_session(
+async def create_chat_session(
     *,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: TokenPrincipal = Depends(deps.get_current_principal)
 ) -> Any:
     """Create a new chat session."""
     session_id = str(uuid.uuid4())
@@ -89,8 +104,8 @@ def create_chat_session(
     )
     
     db.add(session)
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await db.refresh(session)
     
     return ChatSessionResponse(
         id=session.id,
@@ -103,23 +118,35 @@ def create_chat_session(
 
 
 @router.get("/sessions", response_model=List[ChatSessionResponse])
-def get_chat_sessions(
+async def get_chat_sessions(
     *,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(deps.get_async_read_db),
+    current_user: TokenPrincipal = Depends(deps.get_current_principal),
+    response: Response,
     limit: int = 20,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[Cursor] = Depends(deps.get_cursor)
 ) -> Any:
-    """Get user's chat sessions."""
-    sessions = db.query(ChatSession).filter(
-        ChatSession.user_id == current_user.id
-    ).order_by(ChatSession.last_activity.desc()).offset(offset).limit(limit).all()
+    """Get user's chat sessions, most recently active first."""
+    sessions, next_cursor = split_page((await db.execute(
+        paginate(
+            select(ChatSession).where(ChatSession.user_id == current_user.id),
+            ChatSession.last_activity, ChatSession.id, cursor=cursor, limit=limit, offset=offset
+        )
+    )).scalars().all(), limit, ChatSession.last_activity, ChatSession.id)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    
+    # Message counts for the whole page in one query
+    message_counts = dict((await db.execute(
+        select(ChatMessage.session_id, func.count()).where(
+            ChatMessage.session_id.in_([session.id for session in sessions])
+        ).group_by(ChatMessage.session_id)
+    )).all())
     
     result = []
     for session in sessions:
-        message_count = db.query(ChatMessage).filter(
-            ChatMessage.session_id == session.id
-        ).count()
+        message_count = message_counts.get(session.id, 0)
         
         result.append(ChatSessionResponse(
             id=session.id,
@@ -134,30 +161,36 @@ def get_chat_sessions(
 
 
 @router.get("/sessions/{session_id}", response_model=dict)
-def get_chat_session(
+async def get_chat_session(
     *,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: TokenPrincipal = Depends(deps.get_current_principal),
     session_id: str
 ) -> Any:
     """Get a specific chat session with messages."""
-    session = db.query(ChatSession).filter(
-        ChatSession.id == session_id,
-        ChatSession.user_id == current_user.id
-    ).first()
+    session = (await db.execute(
+        select(ChatSession).where(
+            ChatSession.id == session_id,
+            ChatSession.user_id == current_user.id
+        )
+    )).scalars().first()
     
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    # Get messages
-    messages = db.query(ChatMessage).filter(
-        ChatMessage.session_id == session_id
-    ).order_by(ChatMessage.created_at.asc()).all()
+    # Get messages (decrypted as one batch, off the event loop)
+    messages = (await execute_decrypted(
+        db, select(ChatMessage).where(
+            ChatMessage.session_id == session_id
+        ).order_by(ChatMessage.created_at.asc())
+    )).scalars().all()
     
     # Get remedies
-    remedies = db.query(PersonalizedRemedy).filter(
-        PersonalizedRemedy.session_id == session_id
-    ).all()
+    remedies = (await execute_decrypted(
+        db, select(PersonalizedRemedy).where(
+            PersonalizedRemedy.session_id == session_id
+        )
+    )).scalars().all()
     
     # Format messages
     formatted_messages = []
@@ -165,7 +198,7 @@ def get_chat_session(
         formatted_messages.append({
             "id": msg.id,
             "role": msg.role,
-            "content": encryption.decrypt(msg.content) if msg.content else "",
+            "content": msg.content or "",
             "content_type": msg.content_type,
             "modality": msg.modality,
             "timestamp": msg.created_at.isoformat(),
@@ -180,9 +213,9 @@ def get_chat_session(
         formatted_remedies.append({
             "id": remedy.id,
             "type": remedy.remedy_type,
-            "title": encryption.decrypt(remedy.title) if remedy.title else "",
-            "description": encryption.decrypt(remedy.description) if remedy.description else "",
-            "instructions": encryption.decrypt(remedy.instructions) if remedy.instructions else "",
+            "title": remedy.title or "",
+            "description": remedy.description or "",
+            "instructions": remedy.instructions or "",
             "safety_level": remedy.safety_level,
             "confidence_score": remedy.confidence_score,
             "personalization_factors": remedy.personalization_factors or [],
@@ -207,44 +240,65 @@ def get_chat_session(
 
 
 @router.post("/sessions/{session_id}/messages", response_model=ChatMessageResponse)
+@route_policy(cost=settings.RATE_LIMIT_LLM_COST, llm=True)
 async def send_message(
     *,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    executor: RequestExecutor = Depends(deps.get_executor),
+    current_user: TokenPrincipal = Depends(deps.get_current_principal),
     session_id: str,
     message_request: ChatMessageRequest,
     background_tasks: BackgroundTasks
 ) -> Any:
     """Send a message to the AI and get a personalized response."""
     
+    def load_conversation(db: Session):
+        session = db.query(ChatSession).filter(
+            ChatSession.id == session_id,
+            ChatSession.user_id == current_user.id
+        ).first()
+        if not session:
+            return None, []
+        recent = db.query(ChatMessage).filter(
+            ChatMessage.session_id == session_id
+        ).order_by(ChatMessage.created_at.desc()).limit(HISTORY_MESSAGES).all()
+        # Contents are decrypted here, on the DB thread
+        history = [{"role": m.role, "content": m.content or ""} for m in reversed(recent)]
+        return session, history
+    
     # Verify session belongs to user
-    session = db.query(ChatSession).filter(
-        ChatSession.id == session_id,
-        ChatSession.user_id == current_user.id
-    ).first()
+    session, history = await executor.run_db(load_conversation)
     
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
     try:
-        # Process message with AI service
-        result = await ai_service.process_message(
-            db=db,
-            user=current_user,
+        # The OpenAI call runs on the I/O pool
+        result = await ai_service.process_message(message_request.content, history=history)
+        
+        unit = UnitOfWork()
+        user_message = unit.add(ChatMessage(
             session_id=session_id,
-            message_content=message_request.content,
-            message_type=message_request.message_type,
+            role="user",
+            content=message_request.content,
+            content_type=message_request.message_type,
             audio_uri=message_request.audio_uri,
-            image_uris=message_request.image_uris
-        )
-        
-        # Get the AI message from database
-        ai_message = db.query(ChatMessage).filter(
-            ChatMessage.id == result["message_id"]
-        ).first()
-        
-        if not ai_message:
-            raise HTTPException(status_code=500, detail="Failed to retrieve AI response")
+            image_uris=message_request.image_uris,
+            message_sequence=len(history) + 1
+        ))
+        ai_message = unit.add(ChatMessage(
+            session_id=session_id,
+            role="assistant",
+            content=result["response"],
+            message_sequence=len(history) + 2,
+            parent_message_id=user_message.id,
+            ai_analysis=result.get("analysis", {}),
+            urgency_detected=result.get("analysis", {}).get("urgency_level"),
+            remedy_suggestions=result.get("remedies", []),
+            follow_up_required=result.get("follow_up_required", False)
+        ))
+        session.last_activity = ai_message.created_at
+        unit.add(session)
+        await executor.commit(unit)
         
         # Format remedies
         formatted_remedies = []
@@ -262,7 +316,7 @@ async def send_message(
         
         return ChatMessageResponse(
             message_id=ai_message.id,
-            content=encryption.decrypt(ai_message.content) if ai_message.content else "",
+            content=result["response"],
             role=ai_message.role,
             timestamp=ai_message.created_at.isoformat(),
             remedies=formatted_remedies,
@@ -274,35 +328,39 @@ async def send_message(
 
 
 @router.get("/sessions/{session_id}/remedies", response_model=List[PersonalizedRemedyResponse])
-def get_session_remedies(
+async def get_session_remedies(
     *,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: TokenPrincipal = Depends(deps.get_current_principal),
     session_id: str
 ) -> Any:
     """Get personalized remedies for a session."""
     
     # Verify session belongs to user
-    session = db.query(ChatSession).filter(
-        ChatSession.id == session_id,
-        ChatSession.user_id == current_user.id
-    ).first()
+    session = (await db.execute(
+        select(ChatSession).where(
+            ChatSession.id == session_id,
+            ChatSession.user_id == current_user.id
+        )
+    )).scalars().first()
     
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    remedies = db.query(PersonalizedRemedy).filter(
-        PersonalizedRemedy.session_id == session_id
-    ).order_by(PersonalizedRemedy.created_at.desc()).all()
+    remedies = (await execute_decrypted(
+        db, select(PersonalizedRemedy).where(
+            PersonalizedRemedy.session_id == session_id
+        ).order_by(PersonalizedRemedy.created_at.desc())
+    )).scalars().all()
     
     result = []
     for remedy in remedies:
         result.append(PersonalizedRemedyResponse(
             id=remedy.id,
             type=remedy.remedy_type,
-            title=encryption.decrypt(remedy.title) if remedy.title else "",
-            description=encryption.decrypt(remedy.description) if remedy.description else "",
-            instructions=encryption.decrypt(remedy.instructions) if remedy.instructions else "",
+            title=remedy.title or "",
+            description=remedy.description or "",
+            instructions=remedy.instructions or "",
             safety_level=remedy.safety_level,
             confidence_score=remedy.confidence_score,
             personalization_factors=remedy.personalization_factors or []
@@ -356,15 +414,17 @@ def get_health_memories(
     if memory_type:
         query = query.filter(HealthMemory.memory_type == memory_type)
     
-    memories = query.order_by(HealthMemory.importance_score.desc()).limit(limit).all()
+    memories = query.order_by(HealthMemory.importance_score.desc()).limit(limit).execution_options(
+        batch_decrypt=True
+    ).all()
     
     result = []
     for memory in memories:
         result.append(HealthMemoryResponse(
             id=memory.id,
             type=memory.memory_type,
-            title=encryption.decrypt(memory.title) if memory.title else "",
-            content=encryption.decrypt(memory.content) if memory.content else "",
+            title=memory.title or "",
+            content=memory.content or "",
             importance_score=memory.importance_score,
             tags=memory.tags or [],
             created_at=memory.created_at.isoformat()
@@ -448,25 +508,30 @@ def update_user_preferences(
 
 
 @router.delete("/sessions/{session_id}")
-def delete_chat_session(
+async def delete_chat_session(
     *,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: TokenPrincipal = Depends(deps.get_current_principal),
     session_id: str
 ) -> Any:
     """Delete a chat session and all associated data."""
     
-    session = db.query(ChatSession).filter(
-        ChatSession.id == session_id,
-        ChatSession.user_id == current_user.id
-    ).first()
+    session = (await db.execute(
+        select(ChatSession).where(
+            ChatSession.id == session_id,
+            ChatSession.user_id == current_user.id
+        )
+    )).scalars().first()
     
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    # Delete associated messages and remedies (cascade should handle this)
-    db.delete(session)
-    db.commit()
+    # Delete associated remedies and messages with bulk DELETEs; the ORM
+    # cascade would load, and decrypt, every message first
+    await db.execute(delete(PersonalizedRemedy).where(PersonalizedRemedy.session_id == session_id))
+    await db.execute(delete(ChatMessage).where(ChatMessage.session_id == session_id))
+    await db.delete(session)
+    await db.commit()
     
     return {"message": "Session deleted successfully"}
 
@@ -1,9 +1,12 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
-from app.models.user import User
+from app.core.security import TokenPrincipal
+from app.db.batch_decrypt import execute_decrypted
+from app.db.pagination import NEXT_CURSOR_HEADER, Cursor, paginate, split_page
 from app.models.health import HealthProfile, HealthMetric
 from app.schemas.health import (
     HealthProfileCreate, 
@@ -16,26 +19,26 @@ router = APIRouter()
 
 
 @router.post("/profile", response_model=HealthProfileResponse)
-def create_health_profile(
+async def create_health_profile(
     *,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: TokenPrincipal = Depends(deps.get_current_principal),
     profile_in: HealthProfileCreate,
 ) -> Any:
     """
     Create or update health profile.
     """
     # Check if profile exists
-    existing_profile = db.query(HealthProfile).filter(
-        HealthProfile.user_id == current_user.id
-    ).first()
+    existing_profile = (await execute_decrypted(
+        db, select(HealthProfile).where(HealthProfile.user_id == current_user.id)
+    )).scalars().first()
     
     if existing_profile:
         # Update existing profile
         for field, value in profile_in.dict(exclude_unset=True).items():
             setattr(existing_profile, field, value)
-        db.commit()
-        db.refresh(existing_profile)
+        await db.commit()
+        await db.refresh(existing_profile, ["updated_at"])
         profile = existing_profile
     else:
         # Create new profile
@@ -44,8 +47,10 @@ def create_health_profile(
             **profile_in.dict()
         )
         db.add(profile)
-        db.commit()
-        db.refresh(profile)
+        await db.commit()
+        # Only the server-generated timestamps; re-reading the encrypted
+        # columns would decrypt them on the event loop
+        await db.refresh(profile, ["created_at", "updated_at"])
     
     return HealthProfileResponse(
         id=profile.id,
@@ -68,16 +73,16 @@ def create_health_profile(
 
 
 @router.get("/profile", response_model=HealthProfileResponse)
-def get_health_profile(
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+async def get_health_profile(
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: TokenPrincipal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get user's health profile.
     """
-    profile = db.query(HealthProfile).filter(
-        HealthProfile.user_id == current_user.id
-    ).first()
+    profile = (await execute_decrypted(
+        db, select(HealthProfile).where(HealthProfile.user_id == current_user.id)
+    )).scalars().first()
     
     if not profile:
         raise HTTPException(status_code=404, detail="Health profile not found")
@@ -103,10 +108,10 @@ def get_health_profile(
 
 
 @router.post("/metrics", response_model=HealthMetricResponse)
-def add_health_metric(
+async def add_health_metric(
     *,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: TokenPrincipal = Depends(deps.get_current_principal),
     metric_in: HealthMetricCreate,
 ) -> Any:
     """
@@ -117,8 +122,8 @@ def add_health_metric(
         **metric_in.dict()
     )
     db.add(metric)
-    db.commit()
-    db.refresh(metric)
+    await db.commit()
+    await db.refresh(metric, ["recorded_at"])
     
     return HealthMetricResponse(
         id=metric.id,
@@ -131,22 +136,28 @@ def add_health_metric(
 
 
 @router.get("/metrics", response_model=List[HealthMetricResponse])
-def get_health_metrics(
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+async def get_health_metrics(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_async_read_db),
+    current_user: TokenPrincipal = Depends(deps.get_current_principal),
     metric_type: str = None,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[Cursor] = Depends(deps.get_cursor),
 ) -> Any:
     """
-    Get user's health metrics.
+    Get user's health metrics, most recent first.
     """
-    query = db.query(HealthMetric).filter(HealthMetric.user_id == current_user.id)
+    query = select(HealthMetric).where(HealthMetric.user_id == current_user.id)
     
     if metric_type:
-        query = query.filter(HealthMetric.metric_type == metric_type)
+        query = query.where(HealthMetric.metric_type == metric_type)
     
-    metrics = query.offset(skip).limit(limit).all()
+    metrics, next_cursor = split_page((await execute_decrypted(
+        db, paginate(query, HealthMetric.recorded_at, HealthMetric.id, cursor=cursor, limit=limit, offset=skip)
+    )).scalars().all(), limit, HealthMetric.recorded_at, HealthMetric.id)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     return [
         HealthMetricResponse(
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 import stripe
@@ -6,6 +6,7 @@ import logging
 
 from app.api import deps
 from app.core.config import settings
+from app.core.executors import RequestExecutor
 from app.models.user import User, SubscriptionTier
 from app.schemas.payments import SubscriptionCreate, SubscriptionResponse
 from app.core.subscription_config import (
@@ -25,6 +26,17 @@ else:
     stripe.api_key = None
 
 
+def _update_subscription(db: Session, customer_id: str, **changes) -> Optional[int]:
+    """Apply subscription changes to the user of a Stripe customer; returns the user id."""
+    user = db.query(User).filter(User.stripe_customer_id == customer_id).first()
+    if user is None:
+        return None
+    for field, value in changes.items():
+        setattr(user, field, value)
+    db.commit()
+    return user.id
+
+
 def _get_attr(obj, name, default=None):
     """Safely get attribute from Stripe object or dict (for testing)."""
     return obj.get(name, default) if isinstance(obj, dict) else getattr(obj, name, default)
@@ -92,7 +104,7 @@ def create_subscription(
 
 
 @router.post("/webhook")
-async def stripe_webhook(request: Request, db: Session = Depends(deps.get_db)):
+async def stripe_webhook(request: Request, executor: RequestExecutor = Depends(deps.get_executor)):
     """
     Handle Stripe webhooks with proper price-to-tier mapping.
     """
@@ -125,7 +137,7 @@ async def stripe_webhook(request: Request, db: Session = Depends(deps.get_db)):
         
         # Get subscription details to extract price_id
         try:
-            subscription = stripe.Subscription.retrieve(subscription_id)
+            subscription = await executor.run_io(stripe.Subscription.retrieve, subscription_id)
             price_id = subscription["items"]["data"][0]["price"]["id"]
             
             logger.info(f"Processing successful payment for customer {customer_id}, price_id: {price_id}")
@@ -142,14 +154,15 @@ async def stripe_webhook(request: Request, db: Session = Depends(deps.get_db)):
                 logger.info(f"Mapped price_id {price_id} to tier {tier.value}, limit {consultations_limit}")
             
             # Update user subscription status
-            user = db.query(User).filter(User.stripe_customer_id == customer_id).first()
-            if user:
-                user.subscription_active = True
-                user.subscription_tier = tier
-                user.consultations_limit = consultations_limit
-                db.commit()
-                
-                logger.info(f"Updated user {user.id} subscription: tier={tier.value}, limit={consultations_limit}")
+            user_id = await executor.run_db(
+                _update_subscription,
+                customer_id,
+                subscription_active=True,
+                subscription_tier=tier,
+                consultations_limit=consultations_limit
+            )
+            if user_id:
+                logger.info(f"Updated user {user_id} subscription: tier={tier.value}, limit={consultations_limit}")
             else:
                 logger.error(f"User not found for Stripe customer {customer_id}")
                 
@@ -165,17 +178,17 @@ async def stripe_webhook(request: Request, db: Session = Depends(deps.get_db)):
         logger.info(f"Processing failed payment for customer {customer_id}")
         
         # Handle failed payment - could implement grace period logic here
-        user = db.query(User).filter(User.stripe_customer_id == customer_id).first()
-        if user:
-            # For now, immediately deactivate subscription
-            # In production, you might want a grace period
-            user.subscription_active = False
-            # Optionally reset to free tier limits
-            user.subscription_tier = SubscriptionTier.FREE
-            user.consultations_limit = 3
-            db.commit()
-            
-            logger.info(f"Deactivated subscription for user {user.id} due to payment failure")
+        # For now, immediately deactivate subscription and reset to free tier limits
+        # In production, you might want a grace period
+        user_id = await executor.run_db(
+            _update_subscription,
+            customer_id,
+            subscription_active=False,
+            subscription_tier=SubscriptionTier.FREE,
+            consultations_limit=3
+        )
+        if user_id:
+            logger.info(f"Deactivated subscription for user {user_id} due to payment failure")
         else:
             logger.error(f"User not found for failed payment, customer {customer_id}")
     
@@ -186,14 +199,15 @@ async def stripe_webhook(request: Request, db: Session = Depends(deps.get_db)):
         
         logger.info(f"Processing subscription cancellation for customer {customer_id}")
         
-        user = db.query(User).filter(User.stripe_customer_id == customer_id).first()
-        if user:
-            user.subscription_active = False
-            user.subscription_tier = SubscriptionTier.FREE
-            user.consultations_limit = 3
-            db.commit()
-            
-            logger.info(f"Cancelled subscription for user {user.id}")
+        user_id = await executor.run_db(
+            _update_subscription,
+            customer_id,
+            subscription_active=False,
+            subscription_tier=SubscriptionTier.FREE,
+            consultations_limit=3
+        )
+        if user_id:
+            logger.info(f"Cancelled subscription for user {user_id}")
         else:
             logger.error(f"User not found for subscription cancellation, customer {customer_id}")
     
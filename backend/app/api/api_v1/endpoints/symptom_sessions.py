@@ -2,12 +2,13 @@
 Symptom session management endpoints for CareBow.
 """
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Response, status, BackgroundTasks
 from sqlalchemy.orm import Session
 import uuid
 from datetime import datetime, timedelta
 
 from app.api import deps
+from app.db.pagination import NEXT_CURSOR_HEADER, Cursor, paginate, split_page
 from app.models.user import User
 from app.models.symptom_sessions import (
     SymptomSession, SymptomAnswer, TriageResult, 
@@ -87,19 +88,27 @@ def get_symptom_session(
 
 @router.get("/sessions", response_model=List[SymptomSessionResponse])
 def list_symptom_sessions(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     status: Optional[SessionStatus] = None,
+    cursor: Optional[Cursor] = Depends(deps.get_cursor),
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ) -> Any:
-    """List user's symptom sessions."""
+    """List user's symptom sessions, most recently started first."""
     query = db.query(SymptomSession).filter(SymptomSession.user_id == current_user.id)
     
     if status:
         query = query.filter(SymptomSession.status == status)
     
-    sessions = query.offset(skip).limit(limit).all()
+    sessions, next_cursor = split_page(
+        paginate(query, SymptomSession.started_at, SymptomSession.id, cursor=cursor, limit=limit, offset=skip)
+        .execution_options(batch_decrypt=True).all(),
+        limit, SymptomSession.started_at, SymptomSession.id
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return sessions
 
 
@@ -188,7 +197,7 @@ def get_next_question(
         # Get conversation history
         answers = db.query(SymptomAnswer).filter(
             SymptomAnswer.session_id == session.id
-        ).order_by(SymptomAnswer.created_at).all()
+        ).order_by(SymptomAnswer.created_at).execution_options(batch_decrypt=True).all()
         
         conversation_history = []
         for answer in answers:
@@ -304,7 +313,7 @@ def get_triage_result(
     # Get triage result
     triage_result = db.query(TriageResult).filter(
         TriageResult.session_id == session.id
-    ).first()
+    ).execution_options(batch_decrypt=True).first()
     
     if not triage_result:
         raise HTTPException(
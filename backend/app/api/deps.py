@@ -1,11 +1,19 @@
-from typing import Generator
-from fastapi import Depends, HTTPException, status
+from typing import AsyncGenerator, Generator, Optional, Tuple
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, JWTError
+from jose import JWTError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.config import settings
-from app.db.session import SessionLocal
+from app.core.executors import RequestExecutor, run_state_store
+from app.core.rate_limit import (
+    client_ip, get_rate_limiter, get_route_policy, llm_concurrency, retry_after_header, tier_limits,
+)
+from app.core.security import TokenPrincipal, decode_token
+from app.db.pagination import Cursor, InvalidCursor, decode_cursor
+from app.db.principal_cache import cache_principal, claims_changed_at, get_principal
+from app.db.session import AsyncSessionLocal, SessionLocal
 from app.models.user import User
 
 security = HTTPBearer(auto_error=False)
@@ -19,32 +27,75 @@ def get_db() -> Generator:
         db.close()
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> User:
-    credentials_exception = HTTPException(
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_read_db(db: Session = Depends(get_db)) -> Session:
+    """The request's session, with plain SELECTs routed to a read replica."""
+    db.info["use_replica"] = True
+    return db
+
+
+async def get_async_read_db(db: AsyncSession = Depends(get_async_db)) -> AsyncSession:
+    """The request's AsyncSession, with plain SELECTs routed to a read replica."""
+    db.info["use_replica"] = True
+    return db
+
+
+async def get_executor(db: Session = Depends(get_db)) -> RequestExecutor:
+    """Executor for blocking work in async endpoints, bound to the request's session."""
+    return RequestExecutor(db)
+
+
+def get_cursor(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+) -> Optional[Cursor]:
+    """Decoded keyset pagination cursor; malformed cursors are rejected with 400."""
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+
+def _token_claims(credentials: Optional[HTTPAuthorizationCredentials]) -> dict:
     if credentials is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
     try:
-        payload = jwt.decode(
-            credentials.credentials, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
+        return decode_token(credentials.credentials)
     except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.id == int(user_id)).first()
+        raise _credentials_exception()
+
+
+def _user_id_from_token(credentials: Optional[HTTPAuthorizationCredentials]) -> int:
+    return int(_token_claims(credentials)["sub"])
+
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> User:
+    user_id = _user_id_from_token(credentials)
+    db.info["user_id"] = user_id  # read-your-writes stickiness for replica reads
+    principal = get_principal(user_id)
+    if principal is not None:
+        return principal.attach(db)
+    user = db.query(User).filter(User.id == user_id).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    cache_principal(user)
     return user
 
 
@@ -53,4 +104,106 @@ def get_current_active_user(
 ) -> User:
     if not current_user.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+async def get_current_principal(
+    db: AsyncSession = Depends(get_async_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> TokenPrincipal:
+    """
+    The caller's id, active flag and tier, read from the access token's
+    claims without a database query. Claims are as old as
+    the token (ACCESS_TOKEN_EXPIRE_MINUTES at most), so a token issued before
+    the user was deactivated or changed tier is checked against the row
+    instead. Endpoints that act on counters should load the user.
+    """
+    claims = _token_claims(credentials)
+    user_id = int(claims["sub"])
+    db.info["user_id"] = user_id
+    changed_at = await run_state_store(claims_changed_at, user_id)
+    # iat has whole seconds, so a token from the second of the change counts as older
+    current = changed_at is None or claims.get("iat", 0) > changed_at
+    cached = get_principal(user_id) if current and "active" not in claims else None
+    if current and "active" in claims:
+        principal = TokenPrincipal(user_id, claims["active"], claims.get("tier"))
+    elif cached is not None:
+        # Issued before access tokens carried these claims
+        principal = TokenPrincipal(user_id, cached.is_active, cached.subscription_tier)
+    else:
+        row = (await db.execute(
+            select(User.is_active, User.subscription_tier).where(User.id == user_id)
+        )).first()
+        if row is None:
+            raise _credentials_exception()
+        tier = row.subscription_tier
+        principal = TokenPrincipal(user_id, bool(row.is_active), tier.value if tier is not None else None)
+    if not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Inactive user")
+    return principal
+
+
+def _rate_limit_subject(
+    request: Request, credentials: Optional[HTTPAuthorizationCredentials]
+) -> Tuple[str, Optional[str]]:
+    """
+    Budget key and tier: the user for a valid access token, otherwise the IP.
+    The key leaves out the tier, so changing tier keeps what was already spent.
+    """
+    if credentials is not None:
+        try:
+            claims = decode_token(credentials.credentials)
+        except JWTError:
+            claims = None
+        if claims is not None:
+            user_id = int(claims["sub"])
+            tier = claims.get("tier")
+            if tier is None:
+                cached = get_principal(user_id)
+                tier = cached.subscription_tier if cached is not None else None
+            return f"user:{user_id}", tier
+    return f"anon:{client_ip(request)}", None
+
+
+async def enforce_rate_limit(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+) -> AsyncGenerator[None, None]:
+    """
+    Charge the route's cost (see route_policy) to the caller's budget, sized
+    by their subscription tier. The tier is read from the token's claims, so
+    an upgrade applies from the next access token. LLM routes also hold a
+    concurrency slot until the endpoint returns. Limiter and caller-slot
+    calls go through run_state_store, since shm and redis backends block.
+    """
+    policy = get_route_policy(request)
+    key, tier = _rate_limit_subject(request, credentials)
+    result = await run_state_store(get_rate_limiter().hit, key, tier_limits(tier), policy.cost)
+    if not result.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded. Try again later.",
+            headers={"Retry-After": retry_after_header(result)},
+        )
+    if not policy.llm:
+        yield
+        return
+    
+    if not await run_state_store(llm_concurrency.acquire_caller_slot, key, tier):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many AI requests in progress",
+            headers={"Retry-After": "1"},
+        )
+    if not llm_concurrency.acquire_worker_slot(tier):
+        await run_state_store(llm_concurrency.release_caller_slot, key)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI service is busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        yield
+    finally:
+        llm_concurrency.release_worker_slot()
+        await run_state_store(llm_concurrency.release_caller_slot, key)
@@ -1,4 +1,4 @@
-from typing import List, Union, Optional
+from typing import Dict, List, Union, Optional
 from pydantic import field_validator, validator, model_validator
 from pydantic_settings import BaseSettings
 import secrets
@@ -15,6 +15,30 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./carebow.db"
+    DB_EXECUTOR_WORKERS: int = 10  # Threads for blocking DB calls from async endpoints
+    IO_EXECUTOR_WORKERS: int = 0  # Threads for LLM, S3, Stripe and other network calls (0 = LLM_MAX_CONCURRENCY + DB_EXECUTOR_WORKERS)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds; keeps connections under RDS/proxy idle limits
+    DB_POOL_PRE_PING: str = "idle"  # always, idle (only after DB_POOL_PRE_PING_IDLE_SECONDS unused), never
+    DB_POOL_PRE_PING_IDLE_SECONDS: int = 60
+    DB_STATEMENT_TIMEOUT_MS: int = 30000  # Postgres statement_timeout (0 = none)
+    DB_SQLITE_WAL: bool = True
+    DB_SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    DB_SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    DB_REPLICA_URLS: str = ""  # Comma-separated read replica URLs
+    DB_REPLICA_STRATEGY: str = "round_robin"  # round_robin, least_load
+    DB_REPLICA_STICKY_SECONDS: int = 10  # Reads go to the primary this long after a user's own write
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0  # Replicas lagging further behind are skipped
+    DB_REPLICA_ERROR_THRESHOLD: int = 3  # Consecutive errors before a replica is taken out of rotation
+    DB_REPLICA_RETRY_SECONDS: int = 30  # How long a failing replica stays out of rotation
+    DB_REPLICA_CHECK_INTERVAL: int = 5  # Seconds between replica lag checks
+    DB_N_PLUS_ONE_THRESHOLD: int = 5  # Repeats of one statement per request reported as N+1
+    SLOW_QUERY_THRESHOLD_MS: int = 200  # Statements at least this slow go to the slow-query log
+    SLOW_QUERY_LOG_SIZE: int = 500  # Slow queries kept in memory
+    SLOW_QUERY_EXPLAIN: bool = True  # Capture the query plan of slow statements
+    SLOW_QUERY_EXPLAIN_INTERVAL: int = 300  # Seconds before the same statement is EXPLAINed again
     
     # AWS Infrastructure (for production deployment)
     DB_HOST: str = ""
@@ -28,12 +52,26 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     
+    # Short-lived security state: MFA/login sessions, threat tracking, rate limits
+    STATE_STORE_BACKEND: str = "memory"  # memory, shm (one host, all workers), redis
+    STATE_STORE_SHM_PATH: str = ""  # SQLite file for shm (default /dev/shm/carebow-state.db)
+    
+    # Authenticated-principal cache (skips the users lookup in get_current_user)
+    PRINCIPAL_CACHE_BACKEND: str = "memory"  # memory, redis, none
+    PRINCIPAL_CACHE_TTL: int = 30  # Seconds a cached principal is trusted
+    PRINCIPAL_CACHE_SIZE: int = 10000  # Principals kept by the in-process backend
+    
     # JWT - Generate secure key if not provided
     SECRET_KEY: str = ""
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15  # Renewed through /auth/refresh
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     
+    # Password hashing
+    PASSWORD_BCRYPT_ROUNDS: int = 12  # bcrypt work factor; weaker hashes are rehashed at login
+    PASSWORD_HASH_WORKERS: int = 0  # Threads hashing passwords (0 = one per CPU core)
+    PASSWORD_HASH_QUEUE_LIMIT: int = 32  # Hashes waiting for a worker before auth returns 503
+    
     @validator('SECRET_KEY', pre=True)
     def validate_secret_key(cls, v: str) -> str:
         if not v or v == "your-secret-key-change-this-in-production":
@@ -85,14 +123,35 @@ class Settings(BaseSettings):
     AWS_ACCESS_KEY_ID: str = ""
     AWS_SECRET_ACCESS_KEY: str = ""
     AWS_S3_BUCKET: str = "carebow-documents"
+    S3_CHAT_DATA_BUCKET: str = "carebow-chat-data"  # Chat audit records and analytics
+    DATA_EXPORT_STATE_MACHINE_ARN: str = ""
+    DATA_DELETION_STATE_MACHINE_ARN: str = ""
     
     # Healthcare Compliance
     HIPAA_ENCRYPTION_KEY: str = ""
+    HIPAA_ENCRYPTION_MODE: str = "envelope"  # envelope, legacy (per-value PBKDF2)
+    HIPAA_ACTIVE_KEY_ID: int = 1  # Data key version used for new writes
+    HIPAA_PLAINTEXT_CACHE: bool = False  # Cache decrypted values in memory (LRU/TTL)
+    HIPAA_PLAINTEXT_CACHE_MAX_BYTES: int = 8 * 1024 * 1024
+    HIPAA_PLAINTEXT_CACHE_MAX_ENTRY_BYTES: int = 16 * 1024
+    HIPAA_PLAINTEXT_CACHE_TTL: int = 300  # seconds
+    REENCRYPTION_BATCH_SIZE: int = 500  # Rows per keyset page during key rotation
+    REENCRYPTION_ROWS_PER_SECOND: int = 1000  # Throttle for background re-encryption (0 = unthrottled)
     AUDIT_LOG_RETENTION_DAYS: int = 2555  # 7 years for HIPAA compliance
     
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 100
     RATE_LIMIT_PER_HOUR: int = 1000
+    RATE_LIMIT_MAX_KEYS: int = 100000  # Clients tracked by the in-process limiter before the idlest are dropped
+    # Per-user budgets in cost units by subscription tier; anonymous callers get the free budget per IP
+    RATE_LIMIT_TIER_PER_MINUTE: Dict[str, int] = {"free": 60, "basic": 120, "premium": 300, "enterprise": 1000}
+    RATE_LIMIT_TIER_PER_HOUR: Dict[str, int] = {"free": 600, "basic": 1500, "premium": 5000, "enterprise": 20000}
+    RATE_LIMIT_LLM_COST: int = 10  # Cost units of one LLM-backed request (other routes default to 1)
+    LLM_CONCURRENCY_PER_USER: Dict[str, int] = {"free": 1, "basic": 2, "premium": 4, "enterprise": 8}
+    LLM_MAX_CONCURRENCY: int = 32  # LLM requests in flight per worker
+    # Fraction of LLM_MAX_CONCURRENCY each tier may fill, so paying users keep headroom under load
+    LLM_CONCURRENCY_SHARE: Dict[str, float] = {"free": 0.5, "basic": 0.75, "premium": 1.0, "enterprise": 1.0}
+    LLM_SLOT_TTL: int = 300  # seconds; releases per-user slots held by a worker that died mid-request
     
     # Feature Flags
     ENABLE_EMAIL_VERIFICATION: bool = True
@@ -137,6 +196,27 @@ class Settings(BaseSettings):
         if self.DB_HOST and self.DB_NAME and self.DB_USER and self.DB_PASSWORD:
             return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
         return self.DATABASE_URL
+    
+    @property
+    def async_database_url(self) -> str:
+        """database_url with its asyncio driver (asyncpg for Postgres, aiosqlite for SQLite)."""
+        return async_driver_url(self.database_url)
+    
+    @property
+    def replica_urls(self) -> List[str]:
+        """Read replica URLs from DB_REPLICA_URLS."""
+        return [url.strip() for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
+
+
+def async_driver_url(database_url: str) -> str:
+    """Swap a database URL onto its asyncio driver (asyncpg for Postgres, aiosqlite for SQLite)."""
+    from sqlalchemy.engine import make_url
+    
+    url = make_url(database_url)
+    driver = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}.get(url.get_backend_name())
+    if driver is None:
+        return database_url
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
 
 
 settings = Settings()
@@ -2,26 +2,186 @@
 HIPAA-compliant encryption utilities for healthcare data.
 """
 import base64
+import hashlib
+import hmac
 import secrets
-from typing import Optional, Union
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict, UserString
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Union
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.backends import default_backend
 import os
 import logging
 
+try:
+    import zstandard
+except ImportError:  # optional; zlib is used when zstd is not installed
+    zstandard = None
+
 logger = logging.getLogger(__name__)
 
+# Envelope ciphertexts look like "v2:<key_id>:<base64(nonce + ciphertext + tag)>".
+# ":" is not part of the base64 alphabet, so legacy values can never match.
+ENVELOPE_VERSION = "v2"
+ENVELOPE_PREFIX = f"{ENVELOPE_VERSION}:"
+
+# Fixed salt for the one-time key-encryption-key derivation. The KEK never
+# encrypts field data directly; it only seeds the per-version data keys.
+KEK_SALT = b"carebow-hipaa-kek-v1"
+LEGACY_KEY_CACHE_SIZE = 1024
+
+# Batches smaller than this run inline; thread hand-off costs more than it saves.
+BATCH_PARALLEL_THRESHOLD = 64
+
+# Binary envelopes (EncryptedBinary columns) are raw bytes:
+# version (1) | key id (4) | flags (1) | nonce (12) | ciphertext + tag.
+# The 6-byte header is bound as associated data.
+BINARY_ENVELOPE_VERSION = 2
+BINARY_HEADER = struct.Struct(">BIB")
+FLAG_ZLIB = 0x01
+FLAG_ZSTD = 0x02
+
+# Plaintexts shorter than this are never compressed
+COMPRESSION_THRESHOLD = 256
+
+# Blind index tags are truncated HMAC-SHA256 digests (128 bits, hex encoded)
+BLIND_INDEX_LENGTH = 32
+
+# Plaintext cache defaults (see PlaintextCache)
+PLAINTEXT_CACHE_MAX_BYTES = 8 * 1024 * 1024
+PLAINTEXT_CACHE_MAX_ENTRY_BYTES = 16 * 1024
+PLAINTEXT_CACHE_TTL_SECONDS = 300
+
+
+class PlaintextCache:
+    """
+    Memory-bounded LRU/TTL cache of decrypted values.
+
+    Entries are keyed by a digest of the ciphertext, so the ciphertext
+    itself is never held as a key, and a value that changes gets a new
+    key. Plaintext is kept in a bytearray that is overwritten with zeros
+    when the entry is evicted or expires. This is best effort: str copies
+    handed to callers live until Python frees them.
+    """
+    
+    def __init__(
+        self,
+        max_bytes: int = PLAINTEXT_CACHE_MAX_BYTES,
+        max_entry_bytes: int = PLAINTEXT_CACHE_MAX_ENTRY_BYTES,
+        ttl_seconds: float = PLAINTEXT_CACHE_TTL_SECONDS,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @classmethod
+    def from_env(cls) -> Optional["PlaintextCache"]:
+        """Build the cache from HIPAA_PLAINTEXT_CACHE_* settings; None if disabled."""
+        if os.getenv("HIPAA_PLAINTEXT_CACHE", "false").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            max_bytes=int(os.getenv("HIPAA_PLAINTEXT_CACHE_MAX_BYTES", PLAINTEXT_CACHE_MAX_BYTES)),
+            max_entry_bytes=int(os.getenv("HIPAA_PLAINTEXT_CACHE_MAX_ENTRY_BYTES", PLAINTEXT_CACHE_MAX_ENTRY_BYTES)),
+            ttl_seconds=float(os.getenv("HIPAA_PLAINTEXT_CACHE_TTL", PLAINTEXT_CACHE_TTL_SECONDS)),
+        )
+    
+    @staticmethod
+    def _digest(encrypted_data: Union[str, bytes]) -> bytes:
+        if isinstance(encrypted_data, str):
+            encrypted_data = encrypted_data.encode('ascii')
+        return hashlib.blake2b(encrypted_data, digest_size=16).digest()
+    
+    def _evict(self, digest: bytes) -> None:
+        buffer, _ = self._entries.pop(digest)
+        self._size -= len(buffer)
+        buffer[:] = bytes(len(buffer))
+    
+    def get(self, encrypted_data: str) -> Optional[str]:
+        """Return the cached plaintext for a ciphertext, or None."""
+        digest = self._digest(encrypted_data)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry[1] <= time.monotonic():
+                self._evict(digest)
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry[0].decode('utf-8')
+    
+    def put(self, encrypted_data: str, plaintext: str) -> None:
+        """Cache a plaintext unless it exceeds the per-entry limit."""
+        buffer = bytearray(plaintext.encode('utf-8'))
+        if len(buffer) > self.max_entry_bytes:
+            return
+        digest = self._digest(encrypted_data)
+        with self._lock:
+            if digest in self._entries:
+                self._evict(digest)
+            self._entries[digest] = (buffer, time.monotonic() + self.ttl_seconds)
+            self._size += len(buffer)
+            while self._size > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def clear(self) -> None:
+        """Drop and overwrite every cached plaintext."""
+        with self._lock:
+            for digest in list(self._entries):
+                self._evict(digest)
+    
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size, for monitoring."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
 
 class HIPAAEncryption:
     """
     HIPAA-compliant encryption for sensitive healthcare data.
     Uses AES-256 encryption with secure key derivation.
+
+    New values are written in envelope mode: the master key is stretched once
+    into a key-encryption key (KEK), and each key version gets its own data
+    key derived from the KEK. Derived keys are cached in memory, so a field
+    costs one AES-GCM operation instead of a full PBKDF2 run. Values written
+    in the legacy per-salt format are still decrypted.
     """
     
-    def __init__(self, master_key: Optional[str] = None):
+    def __init__(
+        self,
+        master_key: Optional[str] = None,
+        active_key_id: Optional[int] = None,
+        envelope: Optional[bool] = None,
+        plaintext_cache: Optional[PlaintextCache] = None,
+    ):
         """Initialize with master encryption key."""
         self._master_key = master_key or os.getenv("HIPAA_ENCRYPTION_KEY")
         if not self._master_key:
@@ -29,6 +189,39 @@ class HIPAAEncryption:
         
         if len(self._master_key) < 32:
             raise ValueError("HIPAA_ENCRYPTION_KEY must be at least 32 characters")
+        
+        if active_key_id is None:
+            active_key_id = int(os.getenv("HIPAA_ACTIVE_KEY_ID", "1"))
+        if active_key_id < 1:
+            raise ValueError("HIPAA_ACTIVE_KEY_ID must be a positive integer")
+        self._active_key_id = active_key_id
+        
+        if envelope is None:
+            envelope = os.getenv("HIPAA_ENCRYPTION_MODE", "envelope").lower() != "legacy"
+        self._envelope = envelope
+        
+        self._key_lock = threading.Lock()
+        self._kek: Optional[bytes] = None
+        self._data_keys: Dict[int, AESGCM] = {}
+        self._blind_index_keys: Dict[str, bytes] = {}
+        self._legacy_keys: "OrderedDict[bytes, bytes]" = OrderedDict()
+        self._plaintext_cache = plaintext_cache if plaintext_cache is not None else PlaintextCache.from_env()
+    
+    @property
+    def plaintext_cache(self) -> Optional[PlaintextCache]:
+        """Opt-in cache of decrypted values (HIPAA_PLAINTEXT_CACHE), or None."""
+        return self._plaintext_cache
+    
+    @property
+    def active_key_id(self) -> int:
+        """Key version used for new envelope ciphertexts."""
+        return self._active_key_id
+    
+    def set_active_key_id(self, key_id: int) -> None:
+        """Switch the key version used for new writes (see KeyRotation)."""
+        if key_id < 1:
+            raise ValueError("Key id must be a positive integer")
+        self._active_key_id = key_id
     
     def _derive_key(self, salt: bytes) -> bytes:
         """Derive encryption key from master key using PBKDF2."""
@@ -41,14 +234,84 @@ class HIPAAEncryption:
         )
         return kdf.derive(self._master_key.encode())
     
-    def encrypt(self, data: Union[str, bytes]) -> str:
+    def _key_encryption_key(self) -> bytes:
+        """Derive the KEK from the master key once per process."""
+        if self._kek is None:
+            with self._key_lock:
+                if self._kek is None:
+                    self._kek = self._derive_key(KEK_SALT)
+        return self._kek
+    
+    def _expand_key(self, info: str) -> bytes:
+        """Derive a purpose-specific 256-bit key from the KEK with HKDF."""
+        hkdf = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=info.encode(),
+            backend=default_backend()
+        )
+        return hkdf.derive(self._key_encryption_key())
+    
+    def _data_key(self, key_id: int) -> AESGCM:
+        """Return the cached AES-GCM data key for a key version."""
+        aead = self._data_keys.get(key_id)
+        if aead is None:
+            aead = AESGCM(self._expand_key(f"carebow-hipaa-dek:{key_id}"))
+            self._data_keys[key_id] = aead
+        return aead
+    
+    def _legacy_key(self, salt: bytes) -> bytes:
+        """PBKDF2 key for a legacy ciphertext, memoized by salt."""
+        key = self._legacy_keys.get(salt)
+        if key is None:
+            key = self._derive_key(salt)
+            with self._key_lock:
+                self._legacy_keys[salt] = key
+                if len(self._legacy_keys) > LEGACY_KEY_CACHE_SIZE:
+                    self._legacy_keys.popitem(last=False)
+        return key
+    
+    def blind_index(self, value: str, scope: str) -> str:
+        """
+        Deterministic keyed HMAC of a value, for equality lookups on encrypted
+        columns. Each scope (e.g. "email", "phone") has its own HMAC key. The
+        keys are not tied to data key versions, so indexes survive rotation.
+        """
+        key = self._blind_index_keys.get(scope)
+        if key is None:
+            key = self._expand_key(f"carebow-hipaa-bidx:{scope}")
+            self._blind_index_keys[scope] = key
+        digest = hmac.new(key, value.encode('utf-8'), hashlib.sha256).hexdigest()
+        return digest[:BLIND_INDEX_LENGTH]
+    
+    @staticmethod
+    def key_id_of(encrypted_data: Union[str, bytes]) -> Optional[int]:
+        """Return the key version of an envelope ciphertext, or None if legacy."""
+        if isinstance(encrypted_data, bytes):
+            version, key_id, _ = BINARY_HEADER.unpack_from(encrypted_data)
+            if version != BINARY_ENVELOPE_VERSION:
+                raise ValueError("Malformed binary ciphertext")
+            return key_id
+        if not encrypted_data.startswith(ENVELOPE_PREFIX):
+            return None
+        key_id, sep, _ = encrypted_data[len(ENVELOPE_PREFIX):].partition(":")
+        if not sep or not key_id.isdigit():
+            raise ValueError("Malformed envelope ciphertext")
+        return int(key_id)
+    
+    def encrypt(self, data: Union[str, bytes], key_id: Optional[int] = None) -> str:
         """
         Encrypt sensitive data with AES-256-GCM.
-        Returns base64-encoded encrypted data with salt and nonce.
+        Returns a "v2:<key_id>:" envelope ciphertext, or the legacy
+        base64-encoded salt + nonce + tag + ciphertext when envelope mode is off.
         """
         if isinstance(data, str):
             data = data.encode('utf-8')
         
+        if self._envelope or key_id is not None:
+            return self._encrypt_envelope(data, key_id or self._active_key_id)
+        
         # Generate random salt and nonce
         salt = secrets.token_bytes(16)
         nonce = secrets.token_bytes(12)  # GCM requires 96-bit nonce
@@ -71,12 +334,86 @@ class HIPAAEncryption:
         # Return base64 encoded
         return base64.b64encode(encrypted_data).decode('ascii')
     
-    def decrypt(self, encrypted_data: str) -> str:
+    def _encrypt_envelope(self, data: bytes, key_id: int) -> str:
+        """Encrypt with a cached data key; the header is bound as associated data."""
+        header = f"{ENVELOPE_PREFIX}{key_id}:"
+        nonce = secrets.token_bytes(12)  # GCM requires 96-bit nonce
+        ciphertext = self._data_key(key_id).encrypt(nonce, data, header.encode('ascii'))
+        return header + base64.b64encode(nonce + ciphertext).decode('ascii')
+    
+    def _decrypt_envelope(self, encrypted_data: str) -> str:
+        key_id = self.key_id_of(encrypted_data)
+        header, _, body = encrypted_data.rpartition(":")
+        data = base64.b64decode(body.encode('ascii'))
+        plaintext = self._data_key(key_id).decrypt(
+            data[:12], data[12:], (header + ":").encode('ascii')
+        )
+        return plaintext.decode('utf-8')
+    
+    def encrypt_bytes(
+        self,
+        data: Union[str, bytes],
+        key_id: Optional[int] = None,
+        compress: bool = False,
+    ) -> bytes:
+        """
+        Encrypt into a raw binary envelope for LargeBinary columns.
+        With compress=True, plaintexts of COMPRESSION_THRESHOLD bytes or more
+        are zstd (or zlib) compressed first when that makes them smaller.
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        key_id = key_id or self._active_key_id
+        
+        flags = 0
+        if compress and len(data) >= COMPRESSION_THRESHOLD:
+            if zstandard is not None:
+                packed, packed_flag = zstandard.ZstdCompressor().compress(data), FLAG_ZSTD
+            else:
+                packed, packed_flag = zlib.compress(data), FLAG_ZLIB
+            if len(packed) < len(data):
+                data, flags = packed, packed_flag
+        
+        header = BINARY_HEADER.pack(BINARY_ENVELOPE_VERSION, key_id, flags)
+        nonce = secrets.token_bytes(12)  # GCM requires 96-bit nonce
+        return header + nonce + self._data_key(key_id).encrypt(nonce, data, header)
+    
+    def _decrypt_binary(self, encrypted_data: bytes) -> str:
+        key_id = self.key_id_of(encrypted_data)
+        flags = encrypted_data[BINARY_HEADER.size - 1]
+        header = encrypted_data[:BINARY_HEADER.size]
+        nonce = encrypted_data[BINARY_HEADER.size:BINARY_HEADER.size + 12]
+        data = self._data_key(key_id).decrypt(nonce, encrypted_data[BINARY_HEADER.size + 12:], header)
+        if flags & FLAG_ZSTD:
+            if zstandard is None:
+                raise ValueError("zstandard is required to read this value")
+            data = zstandard.ZstdDecompressor().decompress(data)
+        elif flags & FLAG_ZLIB:
+            data = zlib.decompress(data)
+        return data.decode('utf-8')
+    
+    def decrypt(self, encrypted_data: Union[str, bytes]) -> str:
         """
-        Decrypt data encrypted with encrypt().
+        Decrypt data encrypted with encrypt() or encrypt_bytes().
         Returns the original string data.
         """
+        cache = self._plaintext_cache
+        if cache is None:
+            return self._decrypt_uncached(encrypted_data)
+        
+        plaintext = cache.get(encrypted_data)
+        if plaintext is None:
+            plaintext = self._decrypt_uncached(encrypted_data)
+            cache.put(encrypted_data, plaintext)
+        return plaintext
+    
+    def _decrypt_uncached(self, encrypted_data: Union[str, bytes]) -> str:
         try:
+            if isinstance(encrypted_data, bytes):
+                return self._decrypt_binary(encrypted_data)
+            if encrypted_data.startswith(ENVELOPE_PREFIX):
+                return self._decrypt_envelope(encrypted_data)
+            
             # Decode base64
             data = base64.b64decode(encrypted_data.encode('ascii'))
             
@@ -87,7 +424,7 @@ class HIPAAEncryption:
             ciphertext = data[44:]
             
             # Derive key
-            key = self._derive_key(salt)
+            key = self._legacy_key(salt)
             
             # Decrypt with AES-256-GCM
             cipher = Cipher(
@@ -104,6 +441,41 @@ class HIPAAEncryption:
             logger.error(f"Decryption failed: {e}")
             raise ValueError("Failed to decrypt data")
     
+    def _map_batch(self, fn: Callable, values: Iterable) -> List:
+        """Apply fn to every value, spreading large batches over the crypto pool."""
+        values = list(values)
+        workers = crypto_worker_count()
+        if len(values) < BATCH_PARALLEL_THRESHOLD or workers == 1:
+            return [fn(value) for value in values]
+        
+        executor = get_crypto_executor()
+        chunk_size = -(-len(values) // workers)
+        chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+        results = executor.map(lambda chunk: [fn(value) for value in chunk], chunks)
+        return [value for chunk in results for value in chunk]
+    
+    def encrypt_many(self, values: Iterable[Optional[Union[str, bytes]]]) -> List[Optional[str]]:
+        """Encrypt a batch of field values, preserving order and None values."""
+        return self._map_batch(self.encrypt_field, values)
+    
+    def decrypt_many(self, encrypted_values: Iterable[Optional[str]]) -> List[Optional[str]]:
+        """Decrypt a batch of field values, preserving order and None values."""
+        return self._map_batch(self.decrypt_field, encrypted_values)
+    
+    def reencrypt(self, encrypted_data: Union[str, bytes], key_id: Optional[int] = None) -> Union[str, bytes]:
+        """Re-encrypt a value under key_id (default: the active key); no-op if already there."""
+        key_id = key_id or self._active_key_id
+        if self.key_id_of(encrypted_data) == key_id:
+            return encrypted_data
+        if isinstance(encrypted_data, bytes):
+            compressed = bool(encrypted_data[BINARY_HEADER.size - 1] & (FLAG_ZLIB | FLAG_ZSTD))
+            return self.encrypt_bytes(self.decrypt(encrypted_data), key_id, compress=compressed)
+        return self._encrypt_envelope(self.decrypt(encrypted_data).encode('utf-8'), key_id)
+    
+    def reencrypt_many(self, encrypted_values: Iterable[Union[str, bytes]], key_id: Optional[int] = None) -> List:
+        """Re-encrypt a batch of values under key_id, preserving order."""
+        return self._map_batch(lambda value: self.reencrypt(value, key_id), encrypted_values)
+    
     def encrypt_field(self, field_value: Optional[str]) -> Optional[str]:
         """Encrypt a database field value, handling None values."""
         if field_value is None:
@@ -128,6 +500,101 @@ def get_encryption() -> HIPAAEncryption:
     return _encryption_instance
 
 
+# Shared pool for batch crypto; AES-GCM and PBKDF2 in `cryptography` release the GIL.
+_crypto_executor = None
+_crypto_executor_lock = threading.Lock()
+
+def crypto_worker_count() -> int:
+    """Number of threads in the crypto pool (HIPAA_CRYPTO_WORKERS)."""
+    return max(1, int(os.getenv("HIPAA_CRYPTO_WORKERS", min(4, os.cpu_count() or 1))))
+
+
+def get_crypto_executor() -> ThreadPoolExecutor:
+    """Get the thread pool used for batched encryption work."""
+    global _crypto_executor
+    if _crypto_executor is None:
+        with _crypto_executor_lock:
+            if _crypto_executor is None:
+                _crypto_executor = ThreadPoolExecutor(
+                    max_workers=crypto_worker_count(),
+                    thread_name_prefix="hipaa-crypto"
+                )
+    return _crypto_executor
+
+
+# Ciphertexts seen while a batch_decryption() block is active. EncryptedString
+# hands these back undecrypted so the whole result set is decrypted at once.
+_batch_ciphertexts: ContextVar[Optional[Set[str]]] = ContextVar("hipaa_batch_ciphertexts", default=None)
+
+@contextmanager
+def batch_decryption() -> Iterator[Set[str]]:
+    """Collect ciphertexts loaded inside the block instead of decrypting them."""
+    pending: Set[str] = set()
+    token = _batch_ciphertexts.set(pending)
+    try:
+        yield pending
+    finally:
+        _batch_ciphertexts.reset(token)
+
+
+def defer_to_batch(encrypted_value: str) -> bool:
+    """Register a ciphertext with the active batch; False if no batch is active."""
+    pending = _batch_ciphertexts.get()
+    if pending is None:
+        return False
+    pending.add(encrypted_value)
+    return True
+
+
+class LazyDecrypted(UserString):
+    """
+    String proxy around a ciphertext that decrypts on first access and then
+    memoizes the plaintext. Comparisons, hashing, len() and str methods all
+    go through the decrypted value, and derived strings (slices, strip(),
+    concatenation) are plain str; repr() never reveals it.
+    """
+    
+    def __init__(self, encrypted_value: str, encryption: Optional[HIPAAEncryption] = None):
+        self.encrypted_value = encrypted_value
+        self._encryption = encryption
+        self._plaintext: Optional[str] = None
+    
+    @property
+    def data(self) -> str:
+        if self._plaintext is None:
+            self._plaintext = (self._encryption or get_encryption()).decrypt(self.encrypted_value)
+        return self._plaintext
+    
+    @property
+    def is_decrypted(self) -> bool:
+        return self._plaintext is not None
+    
+    def __repr__(self) -> str:
+        return "LazyDecrypted(<encrypted>)"
+    
+    def __radd__(self, other):
+        return (other.data if isinstance(other, UserString) else other) + self.data
+
+
+def _plain_str_method(name: str) -> Callable:
+    # UserString rewraps results in self.__class__, which would treat the
+    # plaintext as a ciphertext; derived strings are plain str instead.
+    def method(self, *args, **kwargs):
+        args = tuple(arg.data if isinstance(arg, UserString) else arg for arg in args)
+        return getattr(self.data, name)(*args, **kwargs)
+    method.__name__ = name
+    return method
+
+
+for _name in (
+    "__getitem__", "__add__", "__mul__", "__rmul__", "__mod__", "__rmod__",
+    "capitalize", "casefold", "center", "expandtabs", "format", "format_map", "ljust", "lower",
+    "lstrip", "removeprefix", "removesuffix", "replace", "rjust", "rstrip", "strip", "swapcase",
+    "title", "translate", "upper", "zfill",
+):
+    setattr(LazyDecrypted, _name, _plain_str_method(_name))
+
+
 class EncryptedField:
     """
     SQLAlchemy custom type for encrypted fields.
@@ -0,0 +1,188 @@
+"""
+Thread pools for blocking work started from async endpoints.
+
+Crypto runs on the shared crypto pool (see app.core.encryption), blocking
+database calls on a sized DB pool, and network calls (LLM completions, S3,
+Stripe) on an I/O pool large enough for every LLM slot, so none of them can
+stall the event loop or starve the others. Password hashing
+gets a bounded pool of its own: a login burst queues there, up to
+PASSWORD_HASH_QUEUE_LIMIT, instead of occupying every worker thread.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.encryption import get_crypto_executor
+from app.core.state_store import MemoryStateStore, get_state_store
+from app.db.unit_of_work import UnitOfWork
+
+T = TypeVar("T")
+
+_db_executor = None
+_db_executor_lock = threading.Lock()
+_io_executor = None
+_io_executor_lock = threading.Lock()
+_password_executor = None
+_password_executor_lock = threading.Lock()
+
+
+class ExecutorBusy(Exception):
+    """The executor's queue is full; the caller should shed the request."""
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """Get the thread pool used for blocking database calls."""
+    global _db_executor
+    if _db_executor is None:
+        with _db_executor_lock:
+            if _db_executor is None:
+                _db_executor = ThreadPoolExecutor(
+                    max_workers=settings.DB_EXECUTOR_WORKERS,
+                    thread_name_prefix="db-blocking"
+                )
+    return _db_executor
+
+
+def io_worker_count() -> int:
+    return settings.IO_EXECUTOR_WORKERS or settings.LLM_MAX_CONCURRENCY + settings.DB_EXECUTOR_WORKERS
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Get the thread pool used for blocking network calls, slow LLM completions included."""
+    global _io_executor
+    if _io_executor is None:
+        with _io_executor_lock:
+            if _io_executor is None:
+                _io_executor = ThreadPoolExecutor(
+                    max_workers=io_worker_count(),
+                    thread_name_prefix="network-io"
+                )
+    return _io_executor
+
+
+class BoundedExecutor:
+    """An executor that refuses work once limit calls are running or queued."""
+
+    def __init__(self, executor: Executor, limit: int):
+        self.executor = executor
+        self.limit = limit
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        with self._lock:
+            if self.pending >= self.limit:
+                raise ExecutorBusy(f"{self.pending} calls already pending")
+            self.pending += 1
+        try:
+            return await _run_in(self.executor, fn, *args, **kwargs)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+
+def password_worker_count() -> int:
+    return settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+
+
+def get_password_executor() -> BoundedExecutor:
+    """Get the bounded thread pool used for password hashing (bcrypt releases the GIL)."""
+    global _password_executor
+    if _password_executor is None:
+        with _password_executor_lock:
+            if _password_executor is None:
+                workers = password_worker_count()
+                _password_executor = BoundedExecutor(
+                    ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash"),
+                    limit=workers + settings.PASSWORD_HASH_QUEUE_LIMIT,
+                )
+    return _password_executor
+
+
+async def _run_in(executor: Executor, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    # Copy the caller's context so ContextVars (batch decryption, request
+    # state) are visible inside the worker thread.
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(context.run, fn, *args, **kwargs))
+
+
+async def run_crypto(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run CPU-bound encryption work on the crypto pool."""
+    return await _run_in(get_crypto_executor(), fn, *args, **kwargs)
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking database call on the DB pool."""
+    return await _run_in(get_db_executor(), fn, *args, **kwargs)
+
+
+async def run_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking network call (LLM, S3, Stripe, ...) on the I/O pool."""
+    return await _run_in(get_io_executor(), fn, *args, **kwargs)
+
+
+async def run_state_store(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Call fn, which uses the shared state store. The shm and redis backends
+    block on SQLite or the network, so their calls run on the DB pool; the
+    in-process store is called directly.
+    """
+    if isinstance(get_state_store(), MemoryStateStore):
+        return fn(*args, **kwargs)
+    return await run_blocking(fn, *args, **kwargs)
+
+
+async def run_password_hashing(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a password hash or verify on the password pool; raises ExecutorBusy when it is full."""
+    return await get_password_executor().run(fn, *args, **kwargs)
+
+
+class RequestExecutor:
+    """
+    Per-request handle on the crypto and DB pools.
+
+    Calls that use the request's Session are serialized, because a Session
+    must never be used from two threads at the same time.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._db_lock = asyncio.Lock()
+
+    async def run_db(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Call fn(db, *args, **kwargs) on the DB pool."""
+        async with self._db_lock:
+            return await run_blocking(fn, self.db, *args, **kwargs)
+
+    async def save(self, *instances: Any) -> None:
+        """Add, commit and refresh instances on the DB pool."""
+        def _save(db: Session) -> None:
+            db.add_all(instances)
+            db.commit()
+            for instance in instances:
+                db.refresh(instance)
+        await self.run_db(_save)
+    
+    async def commit(self, unit: UnitOfWork) -> None:
+        """Commit a unit of work in a single transaction on the DB pool."""
+        await self.run_db(unit.commit)
+
+    async def run_io(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking network call (S3, Stripe, ...) on the I/O pool."""
+        return await run_io(fn, *args, **kwargs)
+
+    async def run_crypto(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run encryption work on the crypto pool."""
+        return await run_crypto(fn, *args, **kwargs)
+
+    async def run_password_hashing(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run password hashing on the bounded password pool."""
+        return await run_password_hashing(fn, *args, **kwargs)
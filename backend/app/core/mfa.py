@@ -8,12 +8,19 @@ import io
 import base64
 import secrets
 import hashlib
-from typing import List, Optional, Tuple
-from datetime import datetime, timedelta
+import hmac
+import time
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.core.encryption import get_encryption
+from app.core.state_store import StateStore, get_state_store
+
+BACKUP_CODE_KDF_ITERATIONS = 100000
+BACKUP_CODE_LOOKUP_LENGTH = 4  # Hex characters of the keyed lookup prefix
+# Verified against when no stored code matches, so a miss costs one KDF like a hit
+_DUMMY_BACKUP_HASH = f"{'0' * BACKUP_CODE_LOOKUP_LENGTH}${'0' * 32}${'0' * 64}"
 
 
 class MFAManager:
@@ -54,73 +61,111 @@ class MFAManager:
         totp = pyotp.TOTP(secret)
         return totp.verify(token, valid_window=window)
     
+    def normalize_backup_code(self, code: str) -> str:
+        """Backup codes are accepted in any case and with spaces or dashes."""
+        return code.strip().replace("-", "").replace(" ", "").upper()
+    
+    def backup_code_lookup(self, code: str) -> str:
+        """
+        Short keyed prefix identifying which stored hash a code belongs to.
+        Cheap to compute, so verification only runs the KDF for that one hash.
+        """
+        digest = hmac.new(settings.SECRET_KEY.encode(), self.normalize_backup_code(code).encode(), hashlib.sha256)
+        return digest.hexdigest()[:BACKUP_CODE_LOOKUP_LENGTH]
+    
     def generate_backup_codes(self, count: int = 8) -> List[str]:
-        """Generate backup codes for account recovery."""
+        """Generate backup codes for account recovery, each with a distinct lookup prefix."""
         codes = []
-        for _ in range(count):
+        lookups = set()
+        while len(codes) < count:
             code = secrets.token_hex(4).upper()  # 8-character hex codes
-            codes.append(code)
+            lookup = self.backup_code_lookup(code)
+            if lookup not in lookups:
+                lookups.add(lookup)
+                codes.append(code)
         return codes
     
-    def hash_backup_code(self, code: str) -> str:
-        """Hash backup code for secure storage."""
-        return hashlib.pbkdf2_hex(
-            code.encode(), 
-            settings.SECRET_KEY.encode(), 
-            100000, 
+    def hash_backup_code(self, code: str, salt: Optional[bytes] = None) -> str:
+        """Hash backup code for secure storage, as lookup$salt$hash with a per-code salt."""
+        salt = salt or secrets.token_bytes(16)
+        derived = hashlib.pbkdf2_hmac(
+            "sha256",
+            self.normalize_backup_code(code).encode(),
+            salt,
+            BACKUP_CODE_KDF_ITERATIONS,
             dklen=32
         )
+        return f"{self.backup_code_lookup(code)}${salt.hex()}${derived.hex()}"
     
     def verify_backup_code(self, code: str, hashed_code: str) -> bool:
         """Verify a backup code against its hash."""
-        return self.hash_backup_code(code) == hashed_code
+        try:
+            _, salt, expected = hashed_code.split("$")
+            salt_bytes = bytes.fromhex(salt)
+        except ValueError:
+            return False
+        _, _, actual = self.hash_backup_code(code, salt_bytes).split("$")
+        return hmac.compare_digest(actual, expected)
+    
+    def find_backup_code(self, code: str, stored_hashes: List[str]) -> Optional[int]:
+        """
+        Index of the stored hash matching code, or None. Costs one KDF and one
+        constant-time compare whether or not a code matches.
+        """
+        by_lookup: Dict[str, int] = {
+            stored_hash.split("$", 1)[0]: index for index, stored_hash in enumerate(stored_hashes)
+        }
+        index = by_lookup.get(self.backup_code_lookup(code))
+        candidate = stored_hashes[index] if index is not None else _DUMMY_BACKUP_HASH
+        if self.verify_backup_code(code, candidate) and index is not None:
+            return index
+        return None
 
 
 class MFASession:
-    """Manages MFA session state."""
+    """Manages MFA session state, kept in the shared state store."""
     
-    def __init__(self):
-        self.sessions = {}  # In production, use Redis
+    prefix = "mfa:session:"
+    
+    def __init__(self, store: Optional[StateStore] = None):
+        self._store = store
+    
+    @property
+    def store(self) -> StateStore:
+        return self._store or get_state_store()
     
     def create_mfa_session(self, user_id: int, expires_minutes: int = 10) -> str:
         """Create temporary MFA session."""
         session_token = secrets.token_urlsafe(32)
-        expires_at = datetime.utcnow() + timedelta(minutes=expires_minutes)
+        ttl = expires_minutes * 60
         
-        self.sessions[session_token] = {
+        self.store.set(f"{self.prefix}{session_token}", {
             "user_id": user_id,
-            "expires_at": expires_at,
+            "expires_at": time.time() + ttl,
             "verified": False
-        }
+        }, ttl=ttl)
         
         return session_token
     
     def verify_mfa_session(self, session_token: str) -> Optional[int]:
         """Verify and return user_id if session is valid."""
-        session = self.sessions.get(session_token)
+        session = self.store.get(f"{self.prefix}{session_token}")
         if not session:
             return None
         
-        if datetime.utcnow() > session["expires_at"]:
-            del self.sessions[session_token]
-            return None
-        
         return session["user_id"] if session["verified"] else None
     
     def mark_session_verified(self, session_token: str):
-        """Mark MFA session as verified."""
-        if session_token in self.sessions:
-            self.sessions[session_token]["verified"] = True
+        """Mark MFA session as verified, keeping its original expiry."""
+        key = f"{self.prefix}{session_token}"
+        session = self.store.get(key)
+        if session:
+            remaining = session["expires_at"] - time.time()
+            if remaining > 0:
+                self.store.set(key, {**session, "verified": True}, ttl=remaining)
     
     def cleanup_expired_sessions(self):
-        """Remove expired sessions."""
-        now = datetime.utcnow()
-        expired_tokens = [
-            token for token, session in self.sessions.items()
-            if now > session["expires_at"]
-        ]
-        for token in expired_tokens:
-            del self.sessions[token]
+        """Expired sessions are dropped by the state store; nothing to do."""
 
 
 # Global instances
@@ -145,9 +190,14 @@ def verify_mfa_token(secret: str, token: str) -> bool:
     return mfa_manager.verify_totp(secret, token)
 
 
+def hash_mfa_backup_codes(codes: List[str]) -> List[str]:
+    """Hashes to store for freshly generated backup codes."""
+    return [mfa_manager.hash_backup_code(code) for code in codes]
+
+
 def verify_mfa_backup_code(code: str, stored_hashes: List[str]) -> bool:
-    """Verify backup code against stored hashes."""
-    for stored_hash in stored_hashes:
-        if mfa_manager.verify_backup_code(code, stored_hash):
-            return True
-    return False
\ No newline at end of file
+    """
+    Verify backup code against stored hashes. Callers should remove the
+    matching hash (see MFAManager.find_backup_code) so each code works once.
+    """
+    return mfa_manager.find_backup_code(code, stored_hashes) is not None
@@ -6,12 +6,14 @@ import logging
 import os
 import time
 import psutil
+from collections import deque
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
-from app.db.session import SessionLocal
+from app.db.pool import pool_stats
+from app.db.session import SessionLocal, replicas
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -25,6 +27,7 @@ class HealthMonitor:
         self.request_count = 0
         self.error_count = 0
         self.last_health_check = None
+        self.response_times = deque(maxlen=1000)  # Seconds, most recent requests
         
     async def comprehensive_health_check(self) -> Dict[str, Any]:
         """
@@ -101,7 +104,8 @@ class HealthMonitor:
                 "metrics": {
                     "total_users": user_count,
                     "total_audit_logs": audit_count,
-                    "connection_pool_size": "healthy"
+                    "connection_pool": pool_stats().get("primary", {}),
+                    "replicas": replicas.status()
                 }
             }
             
@@ -161,11 +165,14 @@ class HealthMonitor:
             if decrypted != test_data:
                 raise ValueError("Encryption round-trip failed")
             
+            cache = encryption.plaintext_cache
             return {
                 "status": "healthy",
                 "response_time_ms": round(encryption_time * 1000, 2),
                 "hipaa_compliant": True,
                 "algorithm": "AES-256-GCM",
+                "active_key_id": encryption.active_key_id,
+                "plaintext_cache": cache.stats() if cache is not None else None,
                 "key_rotation_needed": False  # TODO: Implement key rotation
             }
             
@@ -251,10 +258,26 @@ class HealthMonitor:
         return {
             "requests_total": self.request_count,
             "errors_total": self.error_count,
-            "error_rate_percent": round((self.error_count / max(self.request_count, 1)) * 100, 2),
+            "error_rate_percent": self.error_rate_percent(),
+            **self.response_time_stats(),
             "uptime_hours": round((time.time() - self.start_time) / 3600, 2)
         }
     
+    def error_rate_percent(self) -> float:
+        """Share of requests that failed since startup."""
+        return round((self.error_count / max(self.request_count, 1)) * 100, 2)
+    
+    def response_time_stats(self) -> Dict[str, Optional[float]]:
+        """Average and 95th percentile over the most recent requests."""
+        durations = sorted(self.response_times)
+        if not durations:
+            return {"avg_response_time_ms": None, "p95_response_time_ms": None}
+        p95 = durations[min(int(len(durations) * 0.95), len(durations) - 1)]
+        return {
+            "avg_response_time_ms": round(sum(durations) / len(durations) * 1000, 2),
+            "p95_response_time_ms": round(p95 * 1000, 2)
+        }
+    
     def increment_request_count(self):
         """Increment request counter."""
         self.request_count += 1
@@ -262,6 +285,10 @@ class HealthMonitor:
     def increment_error_count(self):
         """Increment error counter."""
         self.error_count += 1
+    
+    def record_response_time(self, duration: float):
+        """Record how long a request took, in seconds."""
+        self.response_times.append(duration)
 
 
 # Global health monitor instance
@@ -273,9 +300,13 @@ async def get_health_status() -> Dict[str, Any]:
     return await health_monitor.comprehensive_health_check()
 
 
-def record_request():
-    """Record a request for metrics."""
+def record_request(duration: Optional[float] = None, failed: bool = False):
+    """Record a request, its duration in seconds and whether it failed, for metrics."""
     health_monitor.increment_request_count()
+    if duration is not None:
+        health_monitor.record_response_time(duration)
+    if failed:
+        health_monitor.increment_error_count()
 
 
 def record_error():
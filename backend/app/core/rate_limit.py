@@ -0,0 +1,303 @@
+"""
+Fixed-memory rate limiting with GCRA (generic cell rate algorithm).
+
+A limit of N requests per period is enforced by keeping one number per
+client and period: the theoretical arrival time (TAT) at which the client's
+budget is fully replenished. Each request moves the TAT forward by
+period / N (times its cost) and is allowed while the TAT stays within one
+period of now. That gives a smooth sliding window with bursts up to N, in
+O(1) time and space per request, with nothing to clean up. A key whose TAT
+has passed is indistinguishable from a new one, so idle keys are simply
+dropped: evicted from memory, or left to expire in SQLite and Redis.
+
+The backend follows STATE_STORE_BACKEND, so limits are enforced per
+process (memory), across the workers of one host (shm) or across hosts
+(redis, via a Lua script that checks and updates every limit atomically).
+
+On top of the per-IP middleware limit, API routes are charged against
+per-user budgets: each route declares a cost with route_policy (1 by
+default), budgets depend on the caller's subscription tier, and LLM routes
+also take a slot from ConcurrencyLimiter while they run.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.core.state_store import RedisStateStore, SharedMemoryStateStore, StateStore, get_state_store
+
+# (requests, period in seconds)
+Limit = Tuple[int, float]
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: int  # Requests left before the tightest limit is reached
+    retry_after: float  # Seconds until a denied request would be allowed
+
+
+def _gcra(
+    tats: Sequence[Optional[float]], limits: Sequence[Limit], cost: float, now: float
+) -> Tuple[RateLimitResult, List[float]]:
+    """Apply one request to the stored TATs; returns the result and the TATs to store if allowed."""
+    new_tats = []
+    remaining = None
+    retry_after = 0.0
+    for tat, (requests, period) in zip(tats, limits):
+        interval = period / requests
+        tat = max(tat or now, now)
+        new_tat = tat + interval * cost
+        if new_tat - now > period:
+            retry_after = max(retry_after, new_tat - period - now)
+            left = (now + period - tat) / interval
+        else:
+            left = (now + period - new_tat) / interval
+        new_tats.append(new_tat)
+        remaining = left if remaining is None else min(remaining, left)
+    allowed = retry_after == 0.0
+    return RateLimitResult(allowed, max(0, int((remaining or 0) + 1e-9)), retry_after), new_tats
+
+
+class MemoryRateLimiter:
+    """
+    Process-local limiter. Clients are kept in last-used order with the
+    TATs of all their limits (so a key should always be hit with the same
+    limits); clients whose TATs have all passed are evicted
+    from the cold end on every call, and at most max_keys are kept.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # key -> (latest TAT, TAT per limit)
+        self._tats: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limits: Sequence[Limit], cost: float = 1) -> RateLimitResult:
+        with self._lock:
+            now = time.time()
+            stored = self._tats.get(key)
+            tats = stored[1] if stored is not None and len(stored[1]) == len(limits) else [None] * len(limits)
+            result, new_tats = _gcra(tats, limits, cost, now)
+            if result.allowed:
+                self._tats[key] = (max(new_tats), new_tats)
+                self._tats.move_to_end(key)
+            self._evict(now)
+        return result
+
+    def _evict(self, now: float) -> None:
+        tats = self._tats
+        while tats:
+            oldest_key = next(iter(tats))
+            if tats[oldest_key][0] > now and len(tats) <= self.max_keys:
+                break
+            del tats[oldest_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tats.clear()
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+class SharedMemoryRateLimiter:
+    """Limiter in the shm state store's SQLite file, shared by one host's workers."""
+
+    def __init__(self, store: SharedMemoryStateStore):
+        self.store = store
+        with store._transaction() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limits_tat ON rate_limits (tat)")
+
+    def hit(self, key: str, limits: Sequence[Limit], cost: float = 1) -> RateLimitResult:
+        keys = [f"{key}:{period:g}" for _, period in limits]
+        with self.store._transaction() as conn:
+            now = time.time()
+            stored = dict(conn.execute(
+                f"SELECT key, tat FROM rate_limits WHERE key IN ({', '.join('?' * len(keys))})", keys
+            ).fetchall())
+            result, new_tats = _gcra([stored.get(k) for k in keys], limits, cost, now)
+            if result.allowed:
+                conn.executemany("INSERT OR REPLACE INTO rate_limits (key, tat) VALUES (?, ?)", zip(keys, new_tats))
+                # Idle keys: a few per write, oldest first
+                conn.execute(
+                    "DELETE FROM rate_limits WHERE key IN "
+                    "(SELECT key FROM rate_limits WHERE tat <= ? ORDER BY tat LIMIT 10)", (now,)
+                )
+        return result
+
+    def clear(self) -> None:
+        self.store._conn.execute("DELETE FROM rate_limits")
+
+
+# KEYS: one per limit. ARGV: cost, then emission interval and period (microseconds) per key.
+# Uses the server clock so every node agrees on "now".
+GCRA_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000000 + tonumber(now_parts[2])
+local cost = tonumber(ARGV[1])
+local new_tats = {}
+local remaining = nil
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[i * 2])
+    local period = tonumber(ARGV[i * 2 + 1])
+    local tat = tonumber(redis.call('GET', key) or now)
+    if tat < now then tat = now end
+    local new_tat = tat + interval * cost
+    local left
+    if new_tat - now > period then
+        retry_after = math.max(retry_after, new_tat - period - now)
+        left = (now + period - tat) / interval
+    else
+        left = (now + period - new_tat) / interval
+    end
+    new_tats[i] = new_tat
+    if remaining == nil or left < remaining then remaining = left end
+end
+if retry_after == 0 then
+    for i, key in ipairs(KEYS) do
+        redis.call('SET', key, string.format('%d', new_tats[i]), 'PX', math.ceil((new_tats[i] - now) / 1000))
+    end
+end
+return {retry_after == 0 and 1 or 0, math.max(0, math.floor(remaining)), retry_after}
+"""
+
+
+class RedisRateLimiter:
+    """Limiter enforced across workers and nodes by one Lua script call per request."""
+
+    prefix = "ratelimit:"
+
+    def __init__(self, store: RedisStateStore):
+        self.store = store
+        self._script = None
+
+    def hit(self, key: str, limits: Sequence[Limit], cost: float = 1) -> RateLimitResult:
+        if self._script is None:
+            self._script = self.store.client.register_script(GCRA_SCRIPT)
+        keys = [f"{self.prefix}{key}:{period:g}" for _, period in limits]
+        args: List[float] = [cost]
+        for requests, period in limits:
+            args += [int(period * 1e6 / requests), int(period * 1e6)]
+        allowed, remaining, retry_after = self._script(keys=keys, args=args)
+        return RateLimitResult(bool(allowed), int(remaining), int(retry_after) / 1e6)
+
+    def clear(self) -> None:
+        keys = list(self.store.client.scan_iter(f"{self.prefix}*"))
+        if keys:
+            self.store.client.delete(*keys)
+
+
+def retry_after_header(result: RateLimitResult) -> str:
+    return str(max(1, math.ceil(result.retry_after)))
+
+
+def client_ip(request: Request) -> str:
+    """Client IP address, from the proxy headers when behind a load balancer."""
+    if forwarded_for := request.headers.get("X-Forwarded-For"):
+        return forwarded_for.split(",")[0].strip()
+    if real_ip := request.headers.get("X-Real-IP"):
+        return real_ip
+    return request.client.host if request.client else "unknown"
+
+
+class RoutePolicy(NamedTuple):
+    cost: float = 1
+    llm: bool = False  # Also hold an LLM concurrency slot
+
+
+DEFAULT_POLICY = RoutePolicy()
+
+
+def route_policy(cost: float = 1, llm: bool = False) -> Callable:
+    """Declare what calling an endpoint costs against the caller's budget."""
+    def decorate(endpoint: Callable) -> Callable:
+        endpoint.rate_limit_policy = RoutePolicy(cost, llm)
+        return endpoint
+    return decorate
+
+
+def get_route_policy(request: Request) -> RoutePolicy:
+    route = request.scope.get("route")
+    return getattr(getattr(route, "endpoint", None), "rate_limit_policy", DEFAULT_POLICY)
+
+
+def _tier_setting(values: dict, tier: Optional[str]):
+    return values.get(tier or "free", values["free"])
+
+
+def tier_limits(tier: Optional[str]) -> List[Limit]:
+    """Per-minute and per-hour budgets, in cost units, for a subscription tier."""
+    return [
+        (_tier_setting(settings.RATE_LIMIT_TIER_PER_MINUTE, tier), 60),
+        (_tier_setting(settings.RATE_LIMIT_TIER_PER_HOUR, tier), 3600),
+    ]
+
+
+class ConcurrencyLimiter:
+    """
+    Caps LLM requests in flight: per caller across workers (counters in the
+    state store) and per worker, where each tier may only fill its share of
+    the worker's slots so lower tiers cannot crowd out paying users.
+    """
+
+    def __init__(self, max_in_flight: int, store: Optional[StateStore] = None):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._store = store
+        self._lock = threading.Lock()
+
+    @property
+    def store(self) -> StateStore:
+        return self._store or get_state_store()
+
+    def acquire_worker_slot(self, tier: Optional[str]) -> bool:
+        with self._lock:
+            if self.in_flight >= self.max_in_flight * _tier_setting(settings.LLM_CONCURRENCY_SHARE, tier):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release_worker_slot(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def acquire_caller_slot(self, key: str, tier: Optional[str]) -> bool:
+        limit = _tier_setting(settings.LLM_CONCURRENCY_PER_USER, tier)
+        if self.store.incr(f"llm:inflight:{key}", ttl=settings.LLM_SLOT_TTL) > limit:
+            self.release_caller_slot(key)
+            return False
+        return True
+
+    def release_caller_slot(self, key: str) -> None:
+        # The counter may have expired mid-request; never leave it negative
+        if self.store.incr(f"llm:inflight:{key}", -1, ttl=settings.LLM_SLOT_TTL) <= 0:
+            self.store.delete(f"llm:inflight:{key}")
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Get the process-wide limiter for the configured state store backend."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                store = get_state_store()
+                if isinstance(store, RedisStateStore):
+                    _rate_limiter = RedisRateLimiter(store)
+                elif isinstance(store, SharedMemoryStateStore):
+                    _rate_limiter = SharedMemoryRateLimiter(store)
+                else:
+                    _rate_limiter = MemoryRateLimiter(settings.RATE_LIMIT_MAX_KEYS)
+    return _rate_limiter
+
+
+llm_concurrency = ConcurrencyLimiter(settings.LLM_MAX_CONCURRENCY)
@@ -0,0 +1,85 @@
+"""
+Rotating refresh tokens.
+
+A refresh token is a signed JWT naming a row in refresh_tokens, so renewing
+an access token costs an HMAC check and a primary-key lookup rather than a
+password hash. Each token is used once: refreshing revokes it and issues
+its replacement in the same family. Presenting a token that was already
+replaced means it leaked, so the whole family is revoked and the login
+must be repeated.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Tuple
+
+from jose import JWTError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.security import REFRESH_TOKEN, create_refresh_token, decode_token
+from app.models.auth import RefreshToken
+
+
+class InvalidRefreshToken(Exception):
+    """The refresh token is malformed, expired, revoked or reused."""
+
+
+def issue_refresh_token(db: Session, user_id: int, family_id: str = None) -> Tuple[RefreshToken, str]:
+    """Record a new refresh token (starting a family unless one is given); the caller commits."""
+    jti = str(uuid.uuid4())
+    expire = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    row = RefreshToken(id=jti, user_id=user_id, family_id=family_id or jti, expires_at=expire)
+    db.add(row)
+    return row, create_refresh_token(user_id, jti, expire)
+
+
+def _load(db: Session, token: str) -> RefreshToken:
+    try:
+        payload = decode_token(token, REFRESH_TOKEN)
+    except JWTError:
+        raise InvalidRefreshToken("Invalid refresh token")
+    query = db.query(RefreshToken).filter(RefreshToken.id == payload.get("jti"))
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update()  # Serialize concurrent rotations of one token
+    row = query.first()
+    if row is None or str(row.user_id) != payload["sub"]:
+        raise InvalidRefreshToken("Unknown refresh token")
+    return row
+
+
+def _revoke_family(db: Session, family_id: str) -> None:
+    db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.now(timezone.utc)}, synchronize_session=False)
+
+
+def rotate_refresh_token(db: Session, token: str) -> Tuple[int, str]:
+    """
+    Revoke token and issue its replacement; returns (user_id, new token).
+    Reuse of a revoked token revokes its family. Commits either way.
+    """
+    row = _load(db, token)
+    if row.revoked_at is not None:
+        _revoke_family(db, row.family_id)
+        db.commit()
+        raise InvalidRefreshToken("Refresh token reused")
+    replacement, new_token = issue_refresh_token(db, row.user_id, row.family_id)
+    row.revoked_at = datetime.now(timezone.utc)
+    row.replaced_by = replacement.id
+    db.commit()
+    return row.user_id, new_token
+
+
+def revoke_refresh_token(db: Session, token: str) -> int:
+    """Revoke every token descended from the same login (logout); returns the user id."""
+    row = _load(db, token)
+    _revoke_family(db, row.family_id)
+    db.commit()
+    return row.user_id
+
+
+def revoke_user_refresh_tokens(db: Session, user_id: int) -> None:
+    """Revoke all of a user's refresh tokens, e.g. on deactivation; the caller commits."""
+    db.query(RefreshToken).filter(
+        RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.now(timezone.utc)}, synchronize_session=False)
@@ -1,29 +1,72 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Any, Union
-from jose import jwt
+from typing import Any, Dict, Optional, Tuple, Union
+from jose import jwt, JWTError
 from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes below PASSWORD_BCRYPT_ROUNDS report needs_update and are rehashed at login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS)
+
+
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
+
+@dataclass(frozen=True)
+class TokenPrincipal:
+    """The caller as described by access-token claims, known without a user lookup."""
+    id: int
+    is_active: bool
+    subscription_tier: Optional[str]
+
+
+def principal_claims(is_active: bool, subscription_tier: Any) -> Dict[str, Any]:
+    """Access-token claims that let endpoints authorize without loading the user."""
+    return {"active": bool(is_active), "tier": getattr(subscription_tier, "value", subscription_tier)}
 
 
 def create_access_token(
-    subject: Union[str, Any], expires_delta: timedelta = None
+    subject: Union[str, Any], expires_delta: timedelta = None, claims: Optional[Dict[str, Any]] = None
 ) -> str:
+    now = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(
+        expire = now + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {**(claims or {}), "iat": now, "exp": expire, "sub": str(subject), "type": ACCESS_TOKEN}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
+def create_refresh_token(subject: Union[str, Any], jti: str, expire: datetime) -> str:
+    to_encode = {"exp": expire, "sub": str(subject), "jti": jti, "type": REFRESH_TOKEN}
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def decode_token(token: str, token_type: str = ACCESS_TOKEN) -> Dict[str, Any]:
+    """
+    Verify a token's signature and expiry and return its claims. Raises
+    JWTError for a token of another type, so a refresh token is never
+    accepted as an access token. Tokens without a type predate refresh
+    tokens and are access tokens.
+    """
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    if payload.get("type", ACCESS_TOKEN) != token_type or payload.get("sub") is None:
+        raise JWTError(f"Expected a {token_type} token")
+    return payload
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also returns a new hash when the stored one is below the current policy."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
@@ -7,14 +7,14 @@ import ipaddress
 import re
 import secrets
 import time
-import jwt
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Set
-from collections import defaultdict, deque
+from collections import defaultdict
 import logging
 
 from app.core.config import settings
 from app.core.encryption import get_encryption
+from app.core.state_store import StateStore, get_state_store
 
 logger = logging.getLogger(__name__)
 
@@ -22,10 +22,9 @@ logger = logging.getLogger(__name__)
 class ThreatDetection:
     """Advanced threat detection and prevention system."""
     
-    def __init__(self):
-        self.failed_attempts = defaultdict(deque)
-        self.suspicious_ips = set()
-        self.blocked_ips = set()
+    def __init__(self, store: Optional[StateStore] = None):
+        # Failed-login counters and suspicious/blocked IPs live in the state store
+        self._store = store
         self.encryption = get_encryption()
         
         # Threat detection thresholds
@@ -76,31 +75,26 @@ class ThreatDetection:
             "action": "block" if risk_score >= 70 else "monitor" if risk_score >= 30 else "allow"
         }
     
+    @property
+    def store(self) -> StateStore:
+        return self._store or get_state_store()
+    
     def record_failed_login(self, ip: str, username: str):
-        """Record failed login attempt."""
-        current_time = time.time()
-        
-        # Clean old attempts
-        cutoff_time = current_time - self.lockout_duration
-        self.failed_attempts[ip] = deque(
-            [t for t in self.failed_attempts[ip] if t > cutoff_time],
-            maxlen=self.max_failed_attempts
-        )
-        
-        self.failed_attempts[ip].append(current_time)
+        """Record failed login attempt; attempts are counted per lockout window."""
+        attempts = self.store.incr(f"threat:failed:{ip}", ttl=self.lockout_duration)
         
         # Mark as suspicious if too many attempts
-        if len(self.failed_attempts[ip]) >= self.max_failed_attempts:
-            self.suspicious_ips.add(ip)
+        if attempts >= self.max_failed_attempts:
+            self.store.set(f"threat:suspicious:{ip}", True, ttl=self.lockout_duration)
             logger.warning(f"IP {ip} marked as suspicious due to failed login attempts")
     
     def is_suspicious_ip(self, ip: str) -> bool:
         """Check if IP is marked as suspicious."""
-        return ip in self.suspicious_ips
+        return self.store.exists(f"threat:suspicious:{ip}")
     
     def is_blocked_ip(self, ip: str) -> bool:
         """Check if IP is blocked."""
-        return ip in self.blocked_ips
+        return self.store.exists(f"threat:blocked:{ip}")
     
     def is_high_frequency_ip(self, ip: str) -> bool:
         """Simplified high-frequency detection."""
@@ -113,23 +107,30 @@ class ThreatDetection:
         return False
     
     def block_ip(self, ip: str, reason: str):
-        """Block an IP address."""
-        self.blocked_ips.add(ip)
+        """Block an IP address until unblocked."""
+        self.store.set(f"threat:blocked:{ip}", reason)
         logger.warning(f"IP {ip} blocked: {reason}")
     
     def unblock_ip(self, ip: str):
         """Unblock an IP address."""
-        self.blocked_ips.discard(ip)
-        self.suspicious_ips.discard(ip)
+        self.store.delete(f"threat:blocked:{ip}", f"threat:suspicious:{ip}", f"threat:failed:{ip}")
 
 
 class KeyRotation:
-    """Encryption key rotation system."""
+    """
+    Encryption key rotation system.
+
+    Key versions map to HKDF-derived data keys (see HIPAAEncryption), so
+    rotating switches new writes to the next version and starts the
+    background re-encryption of existing data. Deployments must also bump
+    HIPAA_ACTIVE_KEY_ID so other workers and restarts pick up the version.
+    """
     
     def __init__(self):
-        self.current_key_version = 1
+        self.current_key_version = settings.HIPAA_ACTIVE_KEY_ID
         self.key_rotation_interval = 30 * 24 * 3600  # 30 days
         self.last_rotation = time.time()
+        self.reencryption_thread = None
     
     def should_rotate_keys(self) -> bool:
         """Check if keys should be rotated."""
@@ -139,17 +140,20 @@ class KeyRotation:
         """Generate a new encryption key."""
         return secrets.token_urlsafe(32)
     
-    def rotate_encryption_key(self) -> str:
-        """Rotate the main encryption key."""
-        if not self.should_rotate_keys():
+    def rotate_encryption_key(self, force: bool = False) -> Optional[int]:
+        """Rotate to the next data key version and re-encrypt existing data."""
+        if not force and not self.should_rotate_keys():
             return None
-            
-        new_key = self.generate_new_key()
+        
+        from app.services.reencryption import start_background_reencryption
+        
         self.current_key_version += 1
+        get_encryption().set_active_key_id(self.current_key_version)
         self.last_rotation = time.time()
+        self.reencryption_thread = start_background_reencryption(self.current_key_version)
         
         logger.info(f"Encryption key rotated to version {self.current_key_version}")
-        return new_key
+        return self.current_key_version
     
     def get_key_metadata(self) -> Dict[str, any]:
         """Get key rotation metadata."""
@@ -159,18 +163,30 @@ class KeyRotation:
             "next_rotation": datetime.fromtimestamp(
                 self.last_rotation + self.key_rotation_interval
             ).isoformat(),
-            "days_until_rotation": int((self.last_rotation + self.key_rotation_interval - time.time()) / 86400)
+            "days_until_rotation": int((self.last_rotation + self.key_rotation_interval - time.time()) / 86400),
+            "reencryption_running": bool(self.reencryption_thread and self.reencryption_thread.is_alive())
         }
 
 
 class SessionSecurity:
     """Enhanced session security management."""
     
-    def __init__(self):
-        self.active_sessions = {}  # In production, use Redis
+    def __init__(self, store: Optional[StateStore] = None):
+        # Sessions live in the state store, indexed by user
+        self._store = store
         self.session_timeout = 3600  # 1 hour
         self.max_sessions_per_user = 5
     
+    @property
+    def store(self) -> StateStore:
+        return self._store or get_state_store()
+    
+    def _save(self, session_id: str, session: Dict) -> None:
+        # Saving again restarts the idle timeout
+        self.store.set(
+            f"session:{session_id}", session, ttl=self.session_timeout, index=f"session:user:{session['user_id']}"
+        )
+    
     def create_secure_session(self, user_id: int, ip: str, user_agent: str) -> str:
         """Create a secure session with metadata."""
         session_id = secrets.token_urlsafe(32)
@@ -185,61 +201,52 @@ class SessionSecurity:
             "csrf_token": secrets.token_urlsafe(16)
         }
         
+        self._save(session_id, session_data)
+        
         # Limit sessions per user
         self.cleanup_user_sessions(user_id)
         
-        self.active_sessions[session_id] = session_data
         return session_id
     
     def validate_session(self, session_id: str, ip: str) -> Optional[Dict]:
         """Validate session and check for anomalies."""
-        session = self.active_sessions.get(session_id)
+        session = self.store.get(f"session:{session_id}")
         if not session:
             return None
         
-        now = time.time()
-        
-        # Check timeout
-        if now - session["last_activity"] > self.session_timeout:
-            del self.active_sessions[session_id]
-            return None
-        
         # Check IP consistency (basic session hijacking protection)
         if session["ip_address"] != ip:
             logger.warning(f"Session {session_id} IP mismatch: {session['ip_address']} vs {ip}")
-            del self.active_sessions[session_id]
+            self.invalidate_session(session_id)
             return None
         
         # Update last activity
-        session["last_activity"] = now
+        session["last_activity"] = time.time()
+        self._save(session_id, session)
         return session
     
     def cleanup_user_sessions(self, user_id: int):
         """Cleanup old sessions for a user."""
         user_sessions = [
-            (sid, session) for sid, session in self.active_sessions.items()
-            if session["user_id"] == user_id
+            (key, self.store.get(key)) for key in self.store.index_keys(f"session:user:{user_id}")
         ]
+        user_sessions = [(key, session) for key, session in user_sessions if session]
         
         # Sort by last activity and keep only the most recent sessions
         user_sessions.sort(key=lambda x: x[1]["last_activity"], reverse=True)
         
         # Remove excess sessions
-        for sid, _ in user_sessions[self.max_sessions_per_user:]:
-            del self.active_sessions[sid]
+        excess = [key for key, _ in user_sessions[self.max_sessions_per_user:]]
+        if excess:
+            self.store.delete(*excess)
     
     def invalidate_session(self, session_id: str):
         """Invalidate a specific session."""
-        self.active_sessions.pop(session_id, None)
+        self.store.delete(f"session:{session_id}")
     
     def invalidate_user_sessions(self, user_id: int):
         """Invalidate all sessions for a user."""
-        to_remove = [
-            sid for sid, session in self.active_sessions.items()
-            if session["user_id"] == user_id
-        ]
-        for sid in to_remove:
-            del self.active_sessions[sid]
+        self.store.delete(*self.store.index_keys(f"session:user:{user_id}"))
 
 
 class DataLossPrevention:
@@ -0,0 +1,347 @@
+"""
+Shared store for short-lived security state.
+
+MFA sessions, login sessions and threat tracking keep their state here
+instead of in per-process dicts, and the rate limiter uses the same
+backend. Every entry has a TTL (or is explicitly permanent), so state
+cannot grow without bound. The store also offers atomic counters and
+per-owner secondary indexes, so "all of one user's sessions" is a lookup
+instead of a scan.
+
+Backends (STATE_STORE_BACKEND):
+
+* ``memory`` - this process only; the default and what tests use.
+* ``shm`` - a SQLite database on /dev/shm, shared by every worker on one
+  host without running another service.
+* ``redis`` - shared across hosts through REDIS_URL.
+
+Values must be JSON-serializable.
+"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore(ABC):
+    """Interface shared by the backends."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """The live value of key, or None."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, index: Optional[str] = None) -> None:
+        """
+        Store value under key for ttl seconds (None keeps it until deleted).
+        With index, key is also listed under that secondary index.
+        """
+
+    @abstractmethod
+    def delete(self, *keys: str) -> None:
+        """Remove keys; missing keys are ignored."""
+
+    @abstractmethod
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """
+        Atomically add amount to an integer counter and return the result.
+        A new (or expired) counter starts from zero and lives for ttl
+        seconds; incrementing does not extend it, so counters are fixed windows.
+        """
+
+    @abstractmethod
+    def index_keys(self, index: str) -> List[str]:
+        """Live keys listed under a secondary index."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every entry."""
+
+    def exists(self, key: str) -> bool:
+        return self.get(key) is not None
+
+
+class MemoryStateStore(StateStore):
+    """Process-local store; expired entries are swept as writes arrive."""
+
+    sweep_every = 1000  # Writes between sweeps of expired entries
+
+    def __init__(self):
+        # key -> (expires at or None, value, index or None)
+        self._entries: Dict[str, Tuple[Optional[float], Any, Optional[str]]] = {}
+        self._indexes: Dict[str, Set[str]] = {}
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _live(self, key: str, now: float) -> Optional[Tuple[Optional[float], Any, Optional[str]]]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is not None and entry[0] <= now:
+            self._remove(key)
+            return None
+        return entry
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry[2] is not None:
+            members = self._indexes.get(entry[2])
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._indexes[entry[2]]
+
+    def _put(self, key: str, value: Any, ttl: Optional[float], index: Optional[str], now: float) -> None:
+        self._remove(key)
+        self._entries[key] = (now + ttl if ttl is not None else None, value, index)
+        if index is not None:
+            self._indexes.setdefault(index, set()).add(key)
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            self._sweep(now)
+
+    def _sweep(self, now: float) -> None:
+        for key in [k for k, (expires, _, _) in self._entries.items() if expires is not None and expires <= now]:
+            self._remove(key)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._live(key, time.time())
+            return entry[1] if entry is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, index: Optional[str] = None) -> None:
+        with self._lock:
+            self._put(key, value, ttl, index, time.time())
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        with self._lock:
+            now = time.time()
+            entry = self._live(key, now)
+            if entry is None:
+                self._put(key, amount, ttl, None, now)
+                return amount
+            value = entry[1] + amount
+            self._entries[key] = (entry[0], value, entry[2])
+            return value
+
+    def index_keys(self, index: str) -> List[str]:
+        with self._lock:
+            now = time.time()
+            return [key for key in list(self._indexes.get(index, ())) if self._live(key, now) is not None]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._indexes.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SharedMemoryStateStore(StateStore):
+    """
+    SQLite database on tmpfs, shared by the worker processes of one host.
+    Each thread has its own connection; read-modify-write operations run in
+    BEGIN IMMEDIATE transactions, so they are atomic across processes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, idx TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_state_idx ON state (idx) WHERE idx IS NOT NULL")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_state_expires_at ON state (expires_at)")
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # tmpfs; nothing here needs to survive a reboot
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _sweep(conn: sqlite3.Connection) -> None:
+        # A few expired rows go with every insert, so the table stays small
+        conn.execute(
+            "DELETE FROM state WHERE key IN "
+            "(SELECT key FROM state WHERE expires_at <= ? ORDER BY expires_at LIMIT 10)", (time.time(),)
+        )
+
+    @staticmethod
+    def _expires(ttl: Optional[float]) -> Optional[float]:
+        return time.time() + ttl if ttl is not None else None
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn.execute(
+            "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, index: Optional[str] = None) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO state (key, value, expires_at, idx) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), self._expires(ttl), index),
+            )
+            self._sweep(conn)
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self._conn.execute(f"DELETE FROM state WHERE key IN ({', '.join('?' * len(keys))})", keys)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, now)
+            ).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(amount), self._expires(ttl)),
+                )
+                self._sweep(conn)
+                return amount
+            value = json.loads(row[0]) + amount
+            conn.execute("UPDATE state SET value = ? WHERE key = ?", (json.dumps(value), key))
+            return value
+
+    def index_keys(self, index: str) -> List[str]:
+        rows = self._conn.execute(
+            "SELECT key FROM state WHERE idx = ? AND (expires_at IS NULL OR expires_at > ?)", (index, time.time())
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def clear(self) -> None:
+        self._conn.execute("DELETE FROM state")
+
+
+class RedisStateStore(StateStore):
+    """
+    Shared across hosts. Secondary indexes are Redis sets kept alive as
+    long as their longest-lived member; members that expired are pruned
+    when the index is read.
+    """
+
+    def __init__(self, client=None, prefix: str = "state:"):
+        self._client = client
+        self.prefix = prefix
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.from_url(settings.REDIS_URL, socket_timeout=0.5)
+        return self._client
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _index_key(self, index: str) -> str:
+        return f"{self.prefix}index:{index}"
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, index: Optional[str] = None) -> None:
+        pipe = self.client.pipeline()
+        pipe.set(self._key(key), json.dumps(value), px=int(ttl * 1000) if ttl is not None else None)
+        if index is not None:
+            pipe.sadd(self._index_key(index), key)
+            if ttl is not None:
+                # Set a TTL on a new index, then only ever extend it
+                pipe.expire(self._index_key(index), int(ttl) + 1, nx=True)
+                pipe.expire(self._index_key(index), int(ttl) + 1, gt=True)
+            else:
+                pipe.persist(self._index_key(index))
+        pipe.execute()
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*(self._key(key) for key in keys))
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        pipe = self.client.pipeline()  # MULTI/EXEC, so create-with-TTL and increment apply together
+        if ttl is not None:
+            pipe.set(self._key(key), 0, px=int(ttl * 1000), nx=True)
+        pipe.incrby(self._key(key), amount)
+        return int(pipe.execute()[-1])
+
+    def index_keys(self, index: str) -> List[str]:
+        members = sorted(m.decode() if isinstance(m, bytes) else m for m in self.client.smembers(self._index_key(index)))
+        if not members:
+            return []
+        live = self.client.mget([self._key(member) for member in members])
+        expired = [member for member, value in zip(members, live) if value is None]
+        if expired:
+            self.client.srem(self._index_key(index), *expired)
+        return [member for member, value in zip(members, live) if value is not None]
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(f"{self.prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+def _shm_path() -> str:
+    if settings.STATE_STORE_SHM_PATH:
+        return settings.STATE_STORE_SHM_PATH
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "carebow-state.db")
+
+
+def create_state_store(backend: Optional[str] = None) -> StateStore:
+    backend = (backend or settings.STATE_STORE_BACKEND).lower()
+    if backend == "redis":
+        return RedisStateStore()
+    if backend == "shm":
+        return SharedMemoryStateStore(_shm_path())
+    if backend != "memory":
+        logger.warning(f"Unknown STATE_STORE_BACKEND {backend!r}, using memory")
+    return MemoryStateStore()
+
+
+_state_store: Optional[StateStore] = None
+_state_store_lock = threading.Lock()
+
+
+def get_state_store() -> StateStore:
+    """Get the process-wide state store."""
+    global _state_store
+    if _state_store is None:
+        with _state_store_lock:
+            if _state_store is None:
+                _state_store = create_state_store()
+    return _state_store
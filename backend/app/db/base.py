@@ -2,6 +2,11 @@
 # imported by Alembic
 from app.db.base_class import Base  # noqa
 from app.models.user import User  # noqa
+from app.models.auth import RefreshToken  # noqa
 from app.models.health import HealthProfile, Consultation, HealthMetric  # noqa
 from app.models.conversations import Conversation, Message  # noqa
-from app.models.feedback import ConversationFeedback  # noqa
\ No newline at end of file
+from app.models.feedback import ConversationFeedback  # noqa
+from app.models.key_rotation import ReencryptionCheckpoint  # noqa
+from app.models.enhanced_chat import ChatSession, ChatMessage  # noqa
+from app.models.content import BlogPost  # noqa
+from app.models.symptom_sessions import SymptomSession, SymptomAnswer, TriageResult, Provider, Caregiver  # noqa
@@ -0,0 +1,130 @@
+"""
+Batched decryption of EncryptedString columns in ORM result sets.
+
+Mark a query with ``.execution_options(batch_decrypt=True)`` and every
+encrypted value (EncryptedString or EncryptedBinary) it loads is decrypted by a single
+HIPAAEncryption.decrypt_many() call instead of once per column per row.
+Async routes use execute_decrypted(), which does that decryption off the
+event loop.
+"""
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set, Union
+
+from sqlalchemy import Executable, event, inspect
+from sqlalchemy.engine import FrozenResult, Result
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.encryption import batch_decryption, get_encryption
+from app.core.executors import run_blocking
+from app.db.base_class import Base
+from app.models.user import EncryptedBinary, EncryptedString
+
+BATCH_DECRYPT = "batch_decrypt"
+
+_loaded_instances: ContextVar[Optional[List[Any]]] = ContextVar("batch_decrypt_instances", default=None)
+_encrypted_keys_by_mapper: Dict[Any, List[str]] = {}
+
+
+def _encrypted_keys(mapper) -> List[str]:
+    """Attribute names of a mapper that are backed by an encrypted column type."""
+    keys = _encrypted_keys_by_mapper.get(mapper)
+    if keys is None:
+        keys = [
+            prop.key for prop in mapper.column_attrs
+            if any(isinstance(column.type, (EncryptedString, EncryptedBinary)) for column in prop.columns)
+        ]
+        _encrypted_keys_by_mapper[mapper] = keys
+    return keys
+
+
+def _track_instance(target) -> None:
+    instances = _loaded_instances.get()
+    if instances is not None:
+        instances.append(target)
+
+
+@event.listens_for(Base, "load", propagate=True)
+def _on_load(target, context):
+    _track_instance(target)
+
+
+@event.listens_for(Base, "refresh", propagate=True)
+def _on_refresh(target, context, attrs):
+    _track_instance(target)
+
+
+class DecryptionBatch:
+    """The ciphertexts one batch_decrypt query loaded, and what they were loaded into."""
+    
+    def __init__(self):
+        self.instances: List[Any] = []
+        self.pending: Set[Union[str, bytes]] = set()
+        self.frozen: Optional[FrozenResult] = None
+    
+    def load(self, orm_execute_state: ORMExecuteState) -> Result:
+        """Run the statement with decryption deferred; the result still holds ciphertexts."""
+        token = _loaded_instances.set(self.instances)
+        try:
+            with batch_decryption() as pending:
+                self.frozen = orm_execute_state.invoke_statement().freeze()
+        finally:
+            _loaded_instances.reset(token)
+        self.pending = pending
+        return self.frozen()
+    
+    def decrypt(self) -> Result:
+        """Decrypt everything load() collected in one call and return the plaintext result."""
+        if not self.pending:
+            return self.frozen()
+        
+        ciphertexts = list(self.pending)
+        plaintexts = dict(zip(ciphertexts, get_encryption().decrypt_many(ciphertexts)))
+        
+        # ORM entities, including eagerly loaded relationships
+        applied = set()
+        for instance in self.instances:
+            state = inspect(instance)
+            for key in _encrypted_keys(state.mapper):
+                value = state.dict.get(key)
+                if isinstance(value, (str, bytes)) and value in plaintexts:
+                    set_committed_value(instance, key, plaintexts[value])
+                    applied.add(value)
+        
+        # Plain column rows, e.g. select(ChatMessage.content)
+        if len(applied) < len(plaintexts):
+            self.frozen = self.frozen.with_new_rows([
+                [plaintexts.get(value, value) if isinstance(value, (str, bytes)) else value for value in row]
+                for row in self.frozen().all()
+            ])
+        return self.frozen()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _batch_decrypt_results(orm_execute_state: ORMExecuteState):
+    """Load the result with decryption deferred, then decrypt it in one batch."""
+    option = orm_execute_state.execution_options.get(BATCH_DECRYPT)
+    if not orm_execute_state.is_select or not option:
+        return None
+    
+    if isinstance(option, DecryptionBatch):
+        # execute_decrypted() decrypts off the event loop once this returns
+        return option.load(orm_execute_state)
+    batch = DecryptionBatch()
+    batch.load(orm_execute_state)
+    return batch.decrypt()
+
+
+async def execute_decrypted(db: AsyncSession, statement: Executable) -> Result:
+    """
+    AsyncSession.execute() for queries that load encrypted columns.
+
+    AsyncSession runs the ORM on the event loop thread, so a plain execute()
+    would decrypt there. Here the rows load with decryption deferred and the
+    batch is decrypted on the blocking-call pool; decrypt_many() spreads
+    large batches over the crypto pool from there.
+    """
+    batch = DecryptionBatch()
+    await db.execute(statement.execution_options(**{BATCH_DECRYPT: batch}))
+    return await run_blocking(batch.decrypt)
@@ -1,31 +1,159 @@
-from sqlalchemy.orm import Session
-import subprocess
+"""
+Startup schema check.
+
+Every worker compares the database's Alembic revision with the head
+revision in-process and only migrates when they differ, so a normal boot
+costs a single query. Upgrades are serialized across workers with a
+Postgres advisory lock or, on SQLite, a lock file next to the database;
+the revision is checked again once the lock is held, so workers that
+waited find the schema already upgraded. A fresh database is built with
+create_all() and stamped at head instead of replaying every migration.
+"""
+import logging
 import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Set
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
 
-from app.db.session import SessionLocal
+from app.core.config import settings
 from app.db.base import Base
 from app.db.session import engine
-from app.models.user import User
-from app.models.health import HealthProfile, Consultation, HealthMetric
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "alembic.ini")
+
+# pg_advisory_lock key shared by every worker migrating this database
+MIGRATION_LOCK_ID = 0x63617265626F77  # "carebow"
 
 
-def init_db() -> None:
-    """Initialize database using Alembic migrations."""
+def _alembic_config(connection: Optional[Connection] = None) -> Config:
+    config = Config(ALEMBIC_INI)
+    if connection is not None:
+        # env.py runs on this connection instead of creating its own engine
+        config.attributes["connection"] = connection
+    return config
+
+
+def _current_revisions(connection: Connection) -> Set[str]:
+    return set(MigrationContext.configure(connection).get_current_heads())
+
+
+@contextmanager
+def _timed(timings: Dict[str, float], phase: str) -> Iterator[None]:
+    start = time.perf_counter()
     try:
-        # Run Alembic upgrade to create/update tables
-        result = subprocess.run(
-            ["alembic", "upgrade", "head"],
-            cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-            capture_output=True,
-            text=True
-        )
-        if result.returncode != 0:
-            print(f"Alembic upgrade failed: {result.stderr}")
-            # Fallback to direct table creation for development
-            Base.metadata.create_all(bind=engine)
-        else:
-            print("Database initialized successfully with Alembic")
-    except Exception as e:
-        print(f"Error running Alembic: {e}")
-        # Fallback to direct table creation
-        Base.metadata.create_all(bind=engine)
\ No newline at end of file
+        yield
+    finally:
+        timings[phase] = round((time.perf_counter() - start) * 1000, 2)
+
+
+@contextmanager
+def migration_lock(connection: Connection) -> Iterator[None]:
+    """Hold the cross-process migration lock for this database."""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_ID})
+        connection.commit()
+        try:
+            yield
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_ID})
+            connection.commit()
+    elif dialect == "sqlite" and connection.engine.url.database not in (None, "", ":memory:"):
+        if fcntl is None:
+            logger.warning("fcntl is unavailable; SQLite migrations are not serialized across workers")
+            yield
+            return
+        # The lock file is never removed: unlinking it would let a waiting
+        # worker lock a file that a newcomer can no longer see.
+        with open(f"{connection.engine.url.database}.migrate.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    else:
+        yield
+
+
+def _migrate(connection: Connection, heads: Set[str], timings: Dict[str, float]) -> None:
+    """Bring the schema to head; the caller holds the migration lock."""
+    current = _current_revisions(connection)
+    if current == heads:
+        logger.info("Database was upgraded by another worker")
+        return
+
+    tables = set(inspect(connection).get_table_names()) - {"alembic_version"}
+    # Alembic must own the transaction: migrations with autocommit blocks
+    # (CREATE INDEX CONCURRENTLY) cannot run inside an outer one.
+    connection.commit()
+    if not current and not tables:
+        with _timed(timings, "create_all"):
+            Base.metadata.create_all(bind=connection)
+            connection.commit()
+        with _timed(timings, "stamp"):
+            command.stamp(_alembic_config(connection), "head")
+        logger.info(f"Created database schema at revision {', '.join(sorted(heads))}")
+        return
+
+    if not current:
+        # Created by create_all() before migrations were tracked: the revision
+        # is unknown, so only add missing tables and leave it unstamped.
+        logger.warning("Database has tables but no Alembic revision; creating missing tables only")
+        with _timed(timings, "create_all"):
+            Base.metadata.create_all(bind=connection)
+        return
+
+    logger.info(f"Upgrading database from {', '.join(sorted(current))} to {', '.join(sorted(heads))}")
+    try:
+        with _timed(timings, "upgrade"):
+            command.upgrade(_alembic_config(connection), "head")
+    except Exception:
+        logger.exception("Alembic upgrade failed")
+        if settings.ENVIRONMENT == "production":
+            raise
+        connection.rollback()
+        # Development databases (SQLite cannot ALTER constraints) keep
+        # booting with any missing tables created.
+        logger.warning("Falling back to create_all(); the schema may be behind head")
+        with _timed(timings, "create_all"):
+            Base.metadata.create_all(bind=connection)
+
+
+def init_db(bind: Optional[Engine] = None) -> Dict[str, float]:
+    """
+    Make sure the schema is at the Alembic head revision.
+
+    Returns the time spent in each phase, in milliseconds.
+    """
+    bind = bind or engine
+    timings: Dict[str, float] = {}
+
+    with _timed(timings, "revision_check"):
+        heads = set(ScriptDirectory.from_config(_alembic_config()).get_heads())
+        with bind.connect() as connection:
+            current = _current_revisions(connection)
+    if current == heads:
+        logger.info(f"Database schema is up to date at {', '.join(sorted(heads))}")
+        return timings
+
+    with bind.connect() as connection:
+        start = time.perf_counter()
+        with migration_lock(connection):
+            timings["lock_wait"] = round((time.perf_counter() - start) * 1000, 2)
+            _migrate(connection, heads, timings)
+            connection.commit()
+    return timings
@@ -0,0 +1,100 @@
+"""
+Deferred decryption of EncryptedString(lazy=True) columns on ORM instances.
+
+A lazy column loads as a LazyDecrypted proxy. When an ORM instance is
+loaded the proxy is moved out of the instance dict into an attribute
+loader, so the ciphertext is only decrypted the first time the attribute
+is read and the attribute itself always holds a plain ``str``. Column-only
+selects such as ``select(User.phone)`` have no instance to defer to, so
+their rows are decrypted before they are returned.
+"""
+from typing import Any, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.orm.base import PassiveFlag
+
+from app.core.encryption import LazyDecrypted, get_encryption
+from app.db.base_class import Base
+from app.models.user import EncryptedString
+
+_lazy_keys_by_mapper: Dict[Any, List[str]] = {}
+
+
+def _lazy_keys(mapper) -> List[str]:
+    """Attribute names of a mapper backed by a lazy EncryptedString."""
+    keys = _lazy_keys_by_mapper.get(mapper)
+    if keys is None:
+        keys = [
+            prop.key for prop in mapper.column_attrs
+            if any(
+                isinstance(column.type, EncryptedString) and column.type.lazy
+                for column in prop.columns
+            )
+        ]
+        _lazy_keys_by_mapper[mapper] = keys
+    return keys
+
+
+class _LazyAttributeLoader:
+    """Attribute loader callable that resolves a LazyDecrypted proxy."""
+
+    def __init__(self, proxy: LazyDecrypted):
+        self.proxy = proxy
+
+    def __call__(self, state, passive: PassiveFlag) -> str:
+        return self.proxy.data
+
+
+def _defer_decryption(state, keys) -> None:
+    for key in keys:
+        value = state.dict.get(key)
+        if isinstance(value, LazyDecrypted):
+            del state.dict[key]
+            if "callables" not in state.__dict__:
+                state.callables = {}
+            state.callables[key] = _LazyAttributeLoader(value)
+
+
+@event.listens_for(Base, "load", propagate=True)
+def _on_load(target, context):
+    state = target._sa_instance_state
+    _defer_decryption(state, _lazy_keys(state.mapper))
+
+
+@event.listens_for(Base, "refresh", propagate=True)
+def _on_refresh(target, context, attrs):
+    state = target._sa_instance_state
+    keys = _lazy_keys(state.mapper)
+    if attrs is not None:
+        keys = [key for key in keys if key in attrs]
+    _defer_decryption(state, keys)
+
+
+def _is_lazy_column(description: Dict[str, Any]) -> bool:
+    column_type = description.get("type")
+    return isinstance(column_type, EncryptedString) and column_type.lazy
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _decrypt_lazy_columns(orm_execute_state: ORMExecuteState):
+    """Return plain strings, not proxies, for lazy columns selected on their own."""
+    if not orm_execute_state.is_select:
+        return None
+    descriptions = getattr(orm_execute_state.statement, "column_descriptions", ())
+    if not any(_is_lazy_column(description) for description in descriptions):
+        return None
+    
+    frozen = orm_execute_state.invoke_statement().freeze()
+    rows = frozen().all()
+    proxies = [value for row in rows for value in row if isinstance(value, LazyDecrypted)]
+    if not proxies:
+        return frozen()
+    plaintexts = dict(zip(
+        (id(proxy) for proxy in proxies),
+        get_encryption().decrypt_many([proxy.encrypted_value for proxy in proxies]),
+    ))
+    return frozen.with_new_rows([
+        [plaintexts[id(value)] if isinstance(value, LazyDecrypted) else value for value in row]
+        for row in rows
+    ])()
@@ -0,0 +1,105 @@
+"""
+Keyset (cursor) pagination.
+
+Lists are ordered by a timestamp column with the primary key as
+tie-breaker, and the next page starts strictly after the last row of the
+previous one instead of skipping OFFSET rows, so deep pages cost the same
+as the first and rows inserted meanwhile do not shift pages. Cursors are
+opaque URL-safe strings encoding the (timestamp, id) of that last row.
+Each list has a composite index ending in (timestamp, id) that serves
+both the seek and the sort.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import String, and_, literal, or_
+from sqlalchemy.types import DateTime, TypeDecorator
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+Cursor = Tuple[Optional[datetime], Any]
+
+
+class InvalidCursor(ValueError):
+    """The cursor was not produced by encode_cursor()."""
+
+
+class _CursorTimestamp(TypeDecorator):
+    """
+    Binds a cursor timestamp the way SQLite stores it.
+
+    SQLite keeps timestamps as text, and server_default=func.now() writes
+    them without fractional seconds while SQLAlchemy always appends
+    ".000000"; compared as strings those never match, so a cursor on a
+    whole second is bound without fraction. Other databases get a datetime.
+    """
+
+    impl = DateTime
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(String())
+        return dialect.type_descriptor(DateTime(timezone=True))
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != "sqlite":
+            return value
+        return value.strftime("%Y-%m-%d %H:%M:%S" + (".%f" if value.microsecond else ""))
+
+    def process_literal_param(self, value, dialect):
+        return f"'{self.process_bind_param(value, dialect)}'" if dialect.name == "sqlite" else f"'{value.isoformat()}'"
+
+
+def encode_cursor(timestamp: Optional[datetime], id_: Any) -> str:
+    payload = json.dumps([timestamp.isoformat() if timestamp is not None else None, id_])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, id_ = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(id_, (int, str)) or isinstance(id_, bool):
+            raise InvalidCursor("cursor id must be an integer or string")
+        return (datetime.fromisoformat(timestamp) if timestamp is not None else None), id_
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e)) from e
+
+
+def paginate(query, sort_column, id_column, *, cursor: Optional[Cursor] = None, limit: int = 50,
+             offset: int = 0, descending: bool = True):
+    """
+    Order a Query or select() by (sort_column, id_column) and fetch one page.
+
+    With a cursor the page starts after the row it encodes and offset is
+    ignored; without one, offset is still honoured for older clients. One
+    extra row is fetched so split_page() can tell whether another page exists.
+    """
+    if cursor is not None:
+        timestamp, id_ = cursor
+        if timestamp is not None:
+            timestamp = literal(timestamp, _CursorTimestamp())
+        after = (lambda column, value: column < value) if descending else (lambda column, value: column > value)
+        query = query.where(or_(
+            after(sort_column, timestamp),
+            and_(sort_column == timestamp, after(id_column, id_)),
+        ))
+    elif offset:
+        query = query.offset(offset)
+    order = (sort_column.desc(), id_column.desc()) if descending else (sort_column.asc(), id_column.asc())
+    return query.order_by(*order).limit(limit + 1)
+
+
+def split_page(rows: Sequence, limit: int, sort_column, id_column) -> Tuple[List, Optional[str]]:
+    """Trim the extra row fetched by paginate() and build the cursor for the next page."""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
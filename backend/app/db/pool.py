@@ -0,0 +1,203 @@
+"""
+Connection pool configuration and metrics.
+
+Engines are created with pool sizes, recycling, pre-ping strategy and
+statement timeout taken from settings. Pools are instrumented so that
+checked-out connections, overflow, checkout wait time and timeouts can be
+reported through pool_stats(). SQLite connections get WAL journaling and
+busy/cache pragmas on connect.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+
+
+class PoolMetrics:
+    """Checkout counters for one pool; updated from pool events and connect()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_timeout(self, seconds: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+class _InstrumentedPoolMixin:
+    """Times every checkout and counts pool timeouts."""
+
+    metrics: PoolMetrics
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout(time.perf_counter() - start)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_engines: Dict[str, Engine] = {}
+
+
+def _is_sqlite_memory(url) -> bool:
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+
+def engine_options(database_url: str, is_async: bool = False) -> Dict[str, Any]:
+    """Keyword arguments for create_engine()/create_async_engine() from settings."""
+    if settings.DB_POOL_PRE_PING not in PRE_PING_STRATEGIES:
+        raise ValueError(f"DB_POOL_PRE_PING must be one of {', '.join(PRE_PING_STRATEGIES)}")
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING == "always"}
+
+    if not _is_sqlite_memory(url):
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+
+    if backend == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS:
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        if settings.DB_SQLITE_WAL:
+            # WAL lets readers run alongside the single writer; NORMAL sync is
+            # durable across application crashes and much cheaper than FULL.
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.DB_SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA cache_size={-int(settings.DB_SQLITE_CACHE_SIZE_KB)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def _ping_if_idle(dbapi_connection, connection_record, connection_proxy) -> None:
+    checked_in_at = connection_record.info.get("checked_in_at")
+    if checked_in_at is None or time.monotonic() - checked_in_at < settings.DB_POOL_PRE_PING_IDLE_SECONDS:
+        return
+    try:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("SELECT 1")
+        cursor.close()
+    except Exception as e:
+        # The pool discards this connection and retries with a fresh one
+        raise exc.DisconnectionError(f"Idle connection failed pre-ping: {e}")
+
+
+def instrument_engine(engine: Engine, name: str) -> Engine:
+    """Attach pool metrics, pre-ping and SQLite pragmas to an engine and register it for pool_stats()."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pool = sync_engine.pool
+    metrics = getattr(pool, "metrics", None)
+    if metrics is None:
+        metrics = pool.metrics = PoolMetrics()
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.connects += 1
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+
+    if settings.DB_POOL_PRE_PING == "idle":
+        event.listen(sync_engine, "checkout", _ping_if_idle)
+
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _apply_sqlite_pragmas)
+
+    _engines[name] = sync_engine
+    return engine
+
+
+def pool_stats(name: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Current pool occupancy and checkout metrics per registered engine."""
+    stats = {}
+    for engine_name, engine in _engines.items():
+        if name is not None and engine_name != name:
+            continue
+        pool = engine.pool
+        entry: Dict[str, Any] = {"pool": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            entry.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+            )
+        metrics = getattr(pool, "metrics", None)
+        if metrics is not None:
+            entry.update(metrics.snapshot())
+        stats[engine_name] = entry
+    return stats
@@ -0,0 +1,312 @@
+"""
+Cache of authenticated principals keyed by user id.
+
+get_current_user needs little more than the user's id, active flag, tier
+and consultation counters, so those are cached for PRINCIPAL_CACHE_TTL
+seconds and a hit is turned back into a persistent User without a SELECT.
+Any other attribute is loaded on first access. Committed writes to a User,
+through the unit of work or a bulk query(User).update(), invalidate its
+entry whichever session made them, so profile updates, payment webhooks and
+deactivation are seen on the next request. Cached counters can still be a
+few seconds stale in other workers, so quota checks must re-read the row.
+
+Access tokens carry the active flag and tier as claims. When a commit
+changes either column, the time is recorded in the shared state store for
+one access-token lifetime, and claims_changed_at() tells
+get_current_principal which tokens predate the change.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import ORMExecuteState, Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList
+
+from app.core.config import settings
+from app.core.state_store import get_state_store
+from app.models.user import SubscriptionTier, User
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "principal_cache_invalidate"
+_PENDING_ALL_KEY = "principal_cache_invalidate_all"
+_PENDING_CLAIMS_KEY = "principal_claims_changed"
+
+# Columns copied into access-token claims (see security.principal_claims)
+_CLAIM_COLUMNS = ("is_active", "subscription_tier")
+_CLAIMS_CHANGED_KEY = "principal:claims-changed:{}"
+_ALL_USERS = "*"
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    is_active: bool
+    subscription_tier: Optional[str]
+    subscription_active: bool
+    consultations_used: int
+    consultations_limit: int
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        tier = user.subscription_tier
+        return cls(
+            id=user.id,
+            is_active=bool(user.is_active),
+            subscription_tier=tier.value if tier is not None else None,
+            subscription_active=bool(user.subscription_active),
+            consultations_used=user.consultations_used or 0,
+            consultations_limit=user.consultations_limit or 0,
+        )
+
+    def attach(self, db: Session) -> User:
+        """
+        The User this principal stands for, persistent in db without a query.
+        Uncached attributes are expired, so reading one loads the row.
+        """
+        existing = db.identity_map.get(identity_key(User, self.id))
+        if existing is not None:
+            return existing
+        user = User(
+            id=self.id,
+            is_active=self.is_active,
+            subscription_tier=SubscriptionTier(self.subscription_tier) if self.subscription_tier else None,
+            subscription_active=self.subscription_active,
+            consultations_used=self.consultations_used,
+            consultations_limit=self.consultations_limit,
+        )
+        make_transient_to_detached(user)
+        db.add(user)
+        return user
+
+
+class MemoryPrincipalCache:
+    """Per-process LRU with a TTL; each worker invalidates its own entries."""
+
+    def __init__(self, ttl: int, size: int):
+        self.ttl = ttl
+        self.size = size
+        self._entries: "OrderedDict[int, Tuple[float, Principal]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, principal = entry
+            if expires <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return principal
+
+    def set(self, principal: Principal) -> None:
+        with self._lock:
+            self._entries[principal.id] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisPrincipalCache:
+    """
+    Shared across workers, so an invalidation is seen everywhere. Redis
+    errors are logged and treated as a miss; the database stays the source
+    of truth.
+    """
+
+    prefix = "principal:"
+
+    def __init__(self, ttl: int, client=None):
+        self.ttl = ttl
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.from_url(settings.REDIS_URL, socket_timeout=0.1)
+        return self._client
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        try:
+            raw = self.client.get(f"{self.prefix}{user_id}")
+        except Exception as e:
+            logger.warning(f"Principal cache read failed: {e}")
+            return None
+        return Principal(**json.loads(raw)) if raw else None
+
+    def set(self, principal: Principal) -> None:
+        try:
+            self.client.setex(f"{self.prefix}{principal.id}", self.ttl, json.dumps(asdict(principal)))
+        except Exception as e:
+            logger.warning(f"Principal cache write failed: {e}")
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        keys = [f"{self.prefix}{user_id}" for user_id in user_ids]
+        if not keys:
+            return
+        try:
+            self.client.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Principal cache invalidation failed: {e}")
+
+    def clear(self) -> None:
+        try:
+            keys = list(self.client.scan_iter(f"{self.prefix}*"))
+            if keys:
+                self.client.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Principal cache clear failed: {e}")
+
+
+class NullPrincipalCache:
+    def get(self, user_id: int) -> Optional[Principal]:
+        return None
+
+    def set(self, principal: Principal) -> None:
+        pass
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+def _create_cache():
+    backend = settings.PRINCIPAL_CACHE_BACKEND.lower()
+    if backend == "redis":
+        return RedisPrincipalCache(settings.PRINCIPAL_CACHE_TTL)
+    if backend == "memory":
+        return MemoryPrincipalCache(settings.PRINCIPAL_CACHE_TTL, settings.PRINCIPAL_CACHE_SIZE)
+    return NullPrincipalCache()
+
+
+principal_cache = _create_cache()
+
+
+def get_principal(user_id: int) -> Optional[Principal]:
+    return principal_cache.get(user_id)
+
+
+def cache_principal(user: User) -> None:
+    principal_cache.set(Principal.from_user(user))
+
+
+def claims_changed_at(user_id: int) -> Optional[float]:
+    """When the user's active flag or tier last changed, if an access token issued before then may be live."""
+    store = get_state_store()
+    changes = [
+        changed for changed in (
+            store.get(_CLAIMS_CHANGED_KEY.format(user_id)), store.get(_CLAIMS_CHANGED_KEY.format(_ALL_USERS))
+        )
+        if changed is not None
+    ]
+    return max(changes, default=None)
+
+
+def _mark_claims_changed(user_ids: Iterable) -> None:
+    store = get_state_store()
+    now = time.time()
+    for user_id in user_ids:
+        store.set(_CLAIMS_CHANGED_KEY.format(user_id), now, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+def _changes_claims(instance: User, deleted: bool) -> bool:
+    if deleted:
+        return True
+    state = inspect(instance)
+    return any(state.attrs[key].history.has_changes() for key in _CLAIM_COLUMNS)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_user_writes(session: Session, flush_context) -> None:
+    """Remember which users this transaction wrote; they are dropped on commit."""
+    users = [
+        instance for instance in (*session.dirty, *session.deleted)
+        if isinstance(instance, User) and instance.id is not None
+    ]
+    if users:
+        pending: Set[int] = session.info.setdefault(_PENDING_KEY, set())
+        pending.update(user.id for user in users)
+        claims_changed = {user.id for user in users if _changes_claims(user, user in session.deleted)}
+        if claims_changed:
+            session.info.setdefault(_PENDING_CLAIMS_KEY, set()).update(claims_changed)
+
+
+def _pinned_user_ids(criterion) -> Optional[Set[int]]:
+    """Ids a WHERE clause restricts users to (id = x, id IN (...)), or None if it does not."""
+    if isinstance(criterion, BooleanClauseList) and criterion.operator is operators.and_:
+        for clause in criterion.clauses:
+            user_ids = _pinned_user_ids(clause)
+            if user_ids is not None:
+                return user_ids
+        return None
+    if (
+        isinstance(criterion, BinaryExpression)
+        and getattr(criterion.left, "table", None) is User.__table__
+        and criterion.left.key == "id"
+        and isinstance(criterion.right, BindParameter)
+    ):
+        if criterion.operator is operators.eq:
+            return {criterion.right.value}
+        if criterion.operator is operators.in_op:
+            return set(criterion.right.value)
+    return None
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_user_writes(orm_execute_state: ORMExecuteState) -> None:
+    """query(User).update()/delete() bypass the flush; note their users too."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if not any(mapper.class_ is User for mapper in orm_execute_state.all_mappers):
+        return
+    session = orm_execute_state.session
+    statement = orm_execute_state.statement
+    user_ids = _pinned_user_ids(statement.whereclause)
+    if user_ids is None:
+        session.info[_PENDING_ALL_KEY] = True
+    else:
+        session.info.setdefault(_PENDING_KEY, set()).update(user_ids)
+    
+    written = {getattr(column, "key", column) for column in getattr(statement, "_values", None) or ()}
+    if orm_execute_state.is_delete or not written or written.intersection(_CLAIM_COLUMNS):
+        session.info.setdefault(_PENDING_CLAIMS_KEY, set()).update(user_ids or {_ALL_USERS})
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    user_ids = session.info.pop(_PENDING_KEY, None)
+    if session.info.pop(_PENDING_ALL_KEY, False):
+        principal_cache.clear()
+    elif user_ids:
+        principal_cache.invalidate(user_ids)
+    claims_changed = session.info.pop(_PENDING_CLAIMS_KEY, None)
+    if claims_changed:
+        _mark_claims_changed(claims_changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_PENDING_ALL_KEY, None)
+    session.info.pop(_PENDING_CLAIMS_KEY, None)
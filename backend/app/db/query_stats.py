@@ -0,0 +1,129 @@
+"""
+Per-request SQL statement counting and N+1 detection.
+
+Every statement run on any engine is timed and attributed to the
+QueryStats of the current request (a context variable set by
+QueryStatsMiddleware), and to any capture_queries() block that is open.
+Statements are grouped by their SQL text with parameter lists collapsed,
+so the same query run with different parameters counts as a repeat.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+_captures: List["QueryStats"] = []
+_captures_lock = threading.Lock()
+
+_PLACEHOLDER = r"(?:\?|%\(\w+\)s|%s|\$\d+)"
+_PARAM_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_NUMBERED = re.compile(r"\$\d+|%\(\w+\)s")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """SQL text with whitespace, placeholder names and IN-list lengths normalized."""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _PARAM_LIST.sub("(?)", statement)
+    return _NUMBERED.sub("?", statement)
+
+
+class QueryStats:
+    """Statement count, time and repeats for one request or capture block."""
+
+    def __init__(self, endpoint: Optional[str] = None):
+        self._lock = threading.Lock()
+        self.endpoint = endpoint
+        self.count = 0
+        self.total_time = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        normalized = normalize_sql(statement)
+        with self._lock:
+            self.count += 1
+            self.total_time += elapsed
+            self.statements[normalized] += 1
+
+    @property
+    def total_time_ms(self) -> float:
+        return round(self.total_time * 1000, 2)
+
+    def repeated(self, threshold: Optional[int] = None) -> Dict[str, int]:
+        """Statements run at least threshold times (likely N+1 queries)."""
+        threshold = threshold or settings.DB_N_PLUS_ONE_THRESHOLD
+        with self._lock:
+            return {sql: count for sql, count in self.statements.items() if count >= threshold}
+
+    def summary(self, limit: int = 5) -> str:
+        with self._lock:
+            top = self.statements.most_common(limit)
+        lines = [f"{self.count} statements in {self.total_time_ms}ms"]
+        lines += [f"  {count}x {sql[:200]}" for sql, count in top]
+        return "\n".join(lines)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@contextmanager
+def track_request(endpoint: Optional[str] = None) -> Iterator[QueryStats]:
+    """Attribute statements run in this context (and threads it spawns) to a new QueryStats."""
+    stats = QueryStats(endpoint)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryStats]:
+    """Collect every statement run in the process while the block is open (for tests)."""
+    stats = QueryStats()
+    with _captures_lock:
+        _captures.append(stats)
+    try:
+        yield stats
+    finally:
+        with _captures_lock:
+            _captures.remove(stats)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    if conn.info.get("explaining"):
+        return  # EXPLAINs issued by the slow-query log are not the request's own
+    elapsed = time.perf_counter() - started
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if _captures:
+        with _captures_lock:
+            captures = list(_captures)
+        for capture in captures:
+            capture.record(statement, elapsed)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # after_cursor_execute does not run for failed statements
+    starts = context.connection.info.get("query_start_time") if context.connection is not None else None
+    if starts:
+        starts.pop()
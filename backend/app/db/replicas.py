@@ -0,0 +1,202 @@
+"""
+Read replica routing.
+
+Sessions opened through deps.get_read_db / get_async_read_db send plain
+SELECTs to a replica from DB_REPLICA_URLS. Everything else goes to the
+primary: flushes, DML, raw SQL, reads in a session that has already
+written, and reads for a user who wrote within DB_REPLICA_STICKY_SECONDS.
+That last window is kept in the shared state store, so it holds whichever
+worker served the write.
+Replicas that lag by more than DB_REPLICA_MAX_LAG_SECONDS, or that hit
+DB_REPLICA_ERROR_THRESHOLD consecutive errors, are taken out of rotation.
+While no replica is usable, reads fall back to the primary.
+"""
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import CompoundSelect, Select
+
+from app.core.config import async_driver_url, settings
+from app.core.state_store import get_state_store
+from app.db.pool import engine_options, instrument_engine
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("round_robin", "least_load")
+
+
+def _sticky_key(user_id: Any) -> str:
+    return f"replica:wrote:{user_id}"
+
+
+def record_write(user_id: Any) -> None:
+    """Pin user_id's reads to the primary for DB_REPLICA_STICKY_SECONDS, across workers."""
+    if settings.DB_REPLICA_STICKY_SECONDS > 0:
+        get_state_store().set(_sticky_key(user_id), time.time(), ttl=settings.DB_REPLICA_STICKY_SECONDS)
+
+
+def wrote_recently(user_id: Any) -> bool:
+    return get_state_store().exists(_sticky_key(user_id))
+
+
+class Replica:
+    """One read replica with a sync and an async engine and its health state."""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = instrument_engine(create_engine(url, **engine_options(url)), name)
+        async_url = async_driver_url(url)
+        self.async_engine = instrument_engine(
+            create_async_engine(async_url, **engine_options(async_url, is_async=True)), f"{name}_async"
+        )
+        self.lag_seconds: Optional[float] = None
+        self.consecutive_errors = 0
+        self.unavailable_until = 0.0
+        for engine in (self.engine, self.async_engine.sync_engine):
+            event.listen(engine, "handle_error", self._on_error)
+
+    @property
+    def healthy(self) -> bool:
+        if time.monotonic() < self.unavailable_until:
+            return False
+        return self.lag_seconds is None or self.lag_seconds <= settings.DB_REPLICA_MAX_LAG_SECONDS
+
+    def load(self) -> int:
+        """Connections currently checked out across both engines."""
+        return sum(
+            engine.pool.checkedout() for engine in (self.engine, self.async_engine.sync_engine)
+            if hasattr(engine.pool, "checkedout")
+        )
+
+    def bind_for(self, primary: Engine) -> Engine:
+        """The engine matching the primary's flavour (sync, or the sync facade of the async engine)."""
+        return self.async_engine.sync_engine if primary.dialect.is_async else self.engine
+
+    def record_error(self) -> None:
+        self.consecutive_errors += 1
+        if self.consecutive_errors >= settings.DB_REPLICA_ERROR_THRESHOLD:
+            if time.monotonic() >= self.unavailable_until:
+                logger.warning(
+                    f"Read replica {self.name} failed {self.consecutive_errors} times; "
+                    f"routing reads to the primary for {settings.DB_REPLICA_RETRY_SECONDS}s"
+                )
+            self.unavailable_until = time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS
+
+    def _on_error(self, context) -> None:
+        self.record_error()
+
+    def check_lag(self) -> None:
+        """Measure replication lag; a failed check counts as an error."""
+        try:
+            with self.engine.connect() as conn:
+                if self.engine.dialect.name == "postgresql":
+                    self.lag_seconds = float(conn.execute(text(
+                        "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                    )).scalar())
+                else:
+                    conn.execute(text("SELECT 1"))
+                    self.lag_seconds = 0.0
+            self.consecutive_errors = 0
+        except Exception as e:
+            logger.warning(f"Lag check for read replica {self.name} failed: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "consecutive_errors": self.consecutive_errors,
+            "load": self.load(),
+        }
+
+
+class ReplicaSet:
+    """Picks a healthy replica per read and checks lag in a background thread."""
+
+    def __init__(self, urls: List[str], strategy: Optional[str] = None):
+        self.strategy = strategy or settings.DB_REPLICA_STRATEGY
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"DB_REPLICA_STRATEGY must be one of {', '.join(STRATEGIES)}")
+        self.replicas = [Replica(f"replica-{i}", url) for i, url in enumerate(urls)]
+        self._counter = itertools.count()
+        self._monitor: Optional[threading.Thread] = None
+        self._monitor_lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> Optional[Replica]:
+        """A healthy replica, or None when reads should fall back to the primary."""
+        self._ensure_monitor()
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        if self.strategy == "least_load":
+            return min(healthy, key=Replica.load)
+        return healthy[next(self._counter) % len(healthy)]
+
+    def check_lag(self) -> None:
+        for replica in self.replicas:
+            replica.check_lag()
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {replica.name: replica.status() for replica in self.replicas}
+
+    def _ensure_monitor(self) -> None:
+        if self._monitor is not None or not settings.DB_REPLICA_CHECK_INTERVAL:
+            return
+        with self._monitor_lock:
+            if self._monitor is None:
+                self._monitor = threading.Thread(target=self._monitor_loop, name="replica-lag", daemon=True)
+                self._monitor.start()
+
+    def _monitor_loop(self) -> None:
+        while True:
+            self.check_lag()
+            time.sleep(settings.DB_REPLICA_CHECK_INTERVAL)
+
+
+class RoutingSession(Session):
+    """Session that sends reads to a replica when info["use_replica"] is set."""
+
+    def __init__(self, *args, replicas: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if self.replicas and self._routes_to_replica(clause):
+            replica = self.replicas.choose()
+            if replica is not None:
+                return replica.bind_for(primary)
+        return primary
+
+    def _routes_to_replica(self, clause) -> bool:
+        if not self.info.get("use_replica") or self._flushing or self.info.get("wrote"):
+            return False
+        if not isinstance(clause, (Select, CompoundSelect)):
+            return False
+        user_id = self.info.get("user_id")
+        return user_id is None or not wrote_recently(user_id)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_written(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _record_user_write(session):
+    if session.info.get("wrote") and session.info.get("user_id") is not None:
+        record_write(session.info["user_id"])
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_write(session):
+    session.info.pop("wrote", None)
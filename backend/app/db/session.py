@@ -1,10 +1,27 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.db import batch_decrypt, lazy_decrypt  # noqa: F401  registers the ORM decryption hooks
+from app.db import query_stats, slow_queries  # noqa: F401  registers the statement counters and slow-query log
+from app.db.pool import engine_options, instrument_engine
+from app.db.replicas import ReplicaSet, RoutingSession
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = instrument_engine(create_engine(settings.database_url, **engine_options(settings.database_url)), "primary")
+replicas = ReplicaSet(settings.replica_urls)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession, replicas=replicas)
+
+# Async engine for fully async routes. Attributes are not expired on commit,
+# because an expired attribute would need implicit IO to reload.
+async_engine = instrument_engine(
+    create_async_engine(settings.async_database_url, **engine_options(settings.async_database_url, is_async=True)),
+    "primary_async",
+)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, sync_session_class=RoutingSession, replicas=replicas,
+    autoflush=False, expire_on_commit=False,
+)
 
 
 def get_db():
@@ -13,4 +30,10 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """AsyncSession dependency for async FastAPI routes."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,149 @@
+"""
+Slow-query log with EXPLAIN capture.
+
+Statements slower than SLOW_QUERY_THRESHOLD_MS are kept in an in-memory
+ring buffer together with their normalized SQL, the shapes of their bound
+parameters, the endpoint that ran them and the query plan. Parameter
+values are never stored, and quoted literals are masked in the SQL and the
+plan, so records are safe to expose to admins. Each distinct statement is
+EXPLAINed at most once per SLOW_QUERY_EXPLAIN_INTERVAL seconds.
+"""
+import logging
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.db.query_stats import current_query_stats, normalize_sql
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN_PREFIXES = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN ", "mysql": "EXPLAIN "}
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+_QUOTED = re.compile(r"'(?:[^']|'')*'")
+
+_records: Deque[Dict[str, Any]] = deque(maxlen=settings.SLOW_QUERY_LOG_SIZE)
+_records_lock = threading.Lock()
+_plans: Dict[str, tuple] = {}  # normalized SQL -> (explained at, plan)
+
+
+def mask_literals(text: str) -> str:
+    """Replace quoted string literals, which may carry bound values in plans."""
+    return _QUOTED.sub("'?'", text)
+
+
+def parameter_shapes(parameters, executemany: bool = False) -> Any:
+    """Type names of bound parameters, never their values."""
+    if executemany and isinstance(parameters, (list, tuple)) and parameters:
+        return {"executemany": len(parameters), "row": parameter_shapes(parameters[0])}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _explain(conn, statement: str, parameters, executemany: bool) -> Optional[List[str]]:
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    if executemany:
+        parameters = parameters[0] if parameters else None
+    conn.info["explaining"] = True
+    try:
+        if conn.dialect.name == "postgresql":
+            # A failed EXPLAIN must not abort the caller's transaction
+            with conn.begin_nested():
+                rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+        else:
+            rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+    except Exception as e:
+        return [f"EXPLAIN failed: {type(e).__name__}"]
+    finally:
+        conn.info["explaining"] = False
+    return [mask_literals(str(row[-1] if conn.dialect.name == "sqlite" else row[0])) for row in rows]
+
+
+def _plan_for(conn, sql: str, statement: str, parameters, executemany: bool) -> Optional[List[str]]:
+    if not settings.SLOW_QUERY_EXPLAIN:
+        return None
+    cached = _plans.get(sql)
+    if cached is not None and time.monotonic() - cached[0] < settings.SLOW_QUERY_EXPLAIN_INTERVAL:
+        return cached[1]
+    plan = _explain(conn, statement, parameters, executemany)
+    _plans[sql] = (time.monotonic(), plan)
+    return plan
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["slow_query_start"].pop()
+    if elapsed * 1000 < settings.SLOW_QUERY_THRESHOLD_MS or conn.info.get("explaining"):
+        return
+
+    sql = mask_literals(normalize_sql(statement))
+    stats = current_query_stats()
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(elapsed * 1000, 2),
+        "sql": sql,
+        "parameters": parameter_shapes(parameters, executemany),
+        "endpoint": stats.endpoint if stats is not None else None,
+        "plan": _plan_for(conn, sql, statement, parameters, executemany),
+    }
+    with _records_lock:
+        _records.append(record)
+    logger.warning(f"Slow query ({record['duration_ms']}ms) on {record['endpoint'] or 'background'}: {sql[:200]}")
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    starts = context.connection.info.get("slow_query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def slow_queries(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Most recent slow queries first."""
+    with _records_lock:
+        records = list(reversed(_records))
+    return records[:limit] if limit else records
+
+
+def slow_query_summary() -> List[Dict[str, Any]]:
+    """Slow queries in the buffer grouped by SQL, slowest total first."""
+    groups: Dict[str, Dict[str, Any]] = {}
+    for record in slow_queries():
+        group = groups.setdefault(record["sql"], {
+            "sql": record["sql"], "count": 0, "total_ms": 0.0, "max_ms": 0.0, "endpoints": set(),
+            "plan": record["plan"],
+        })
+        group["count"] += 1
+        group["total_ms"] += record["duration_ms"]
+        group["max_ms"] = max(group["max_ms"], record["duration_ms"])
+        if record["endpoint"]:
+            group["endpoints"].add(record["endpoint"])
+    summary = sorted(groups.values(), key=lambda group: group["total_ms"], reverse=True)
+    for group in summary:
+        group["avg_ms"] = round(group["total_ms"] / group["count"], 2)
+        group["total_ms"] = round(group["total_ms"], 2)
+        group["endpoints"] = sorted(group["endpoints"])
+    return summary
+
+
+def clear_slow_queries() -> None:
+    with _records_lock:
+        _records.clear()
+    _plans.clear()
@@ -0,0 +1,81 @@
+"""
+Unit of work for multi-row writes.
+
+Collects what a request writes and commits it in one transaction: ORM
+instances are flushed through the session, and plain rows are inserted
+per model as a single executemany INSERT. Primary keys and created_at are
+assigned client-side when the write is queued, so callers can use them
+straight away and nothing has to be read back after the commit.
+"""
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, TypeVar
+
+from sqlalchemy import String, insert
+from sqlalchemy.orm import Session
+
+T = TypeVar("T")
+
+
+def new_id() -> str:
+    return str(uuid.uuid4())
+
+
+def _client_defaults(model) -> Dict[str, Any]:
+    """Values generated here instead of by the database for one row of model."""
+    table = model.__table__
+    values: Dict[str, Any] = {}
+    if "id" in table.c and isinstance(table.c.id.type, String):
+        values["id"] = new_id()
+    if "created_at" in table.c:
+        values["created_at"] = datetime.now(timezone.utc)
+    return values
+
+
+class UnitOfWork:
+    """Writes queued by one request, committed together by commit()."""
+
+    def __init__(self):
+        self.instances: List[Any] = []
+        self.rows: Dict[type, List[Dict[str, Any]]] = defaultdict(list)
+
+    def add(self, instance: T) -> T:
+        """Queue an ORM instance, filling in its id and created_at."""
+        for key, value in _client_defaults(type(instance)).items():
+            if getattr(instance, key, None) is None:
+                setattr(instance, key, value)
+        self.instances.append(instance)
+        return instance
+
+    def add_rows(self, model, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Queue rows for a bulk INSERT into model's table; returns them with ids filled in."""
+        queued = [{**_client_defaults(model), **row} for row in rows]
+        self.rows[model].extend(queued)
+        return queued
+
+    def __len__(self) -> int:
+        return len(self.instances) + sum(len(rows) for rows in self.rows.values())
+
+    def commit(self, db: Session) -> None:
+        """
+        Write everything in one transaction. Instances are flushed first, so
+        bulk rows may reference them by foreign key.
+        """
+        expire_on_commit = db.expire_on_commit
+        try:
+            db.add_all(self.instances)
+            db.flush()
+            for model, rows in self.rows.items():
+                if rows:
+                    db.execute(insert(model), rows)
+            # Every value was set here, so there is nothing to reload
+            db.expire_on_commit = False
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.expire_on_commit = expire_on_commit
+        self.instances.clear()
+        self.rows.clear()
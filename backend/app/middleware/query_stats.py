@@ -0,0 +1,50 @@
+"""
+Per-request SQL statement counting middleware.
+"""
+import logging
+import time
+
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.config import settings
+from app.core.monitoring import record_request
+from app.db.query_stats import track_request
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    """Count and time the SQL run by each request and flag N+1 patterns.
+
+    Request durations and server errors are fed to the health monitor and
+    statements are attributed to the endpoint for the slow-query log.
+    Outside production the counts are returned as X-DB-Query-Count,
+    X-DB-Query-Time-Ms and X-DB-Repeated-Queries response headers.
+    """
+    
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.perf_counter()
+        endpoint = f"{request.method} {request.url.path}"
+        with track_request(endpoint) as stats:
+            try:
+                response = await call_next(request)
+            except Exception:
+                record_request(time.perf_counter() - start_time, failed=True)
+                raise
+        record_request(time.perf_counter() - start_time, failed=response.status_code >= 500)
+        
+        repeated = stats.repeated()
+        if repeated:
+            worst_sql, worst_count = max(repeated.items(), key=lambda item: item[1])
+            logger.warning(
+                f"Possible N+1 on {endpoint}: "
+                f"{worst_count}x {worst_sql[:200]} ({stats.count} statements in total)"
+            )
+        
+        if settings.ENVIRONMENT != "production":
+            response.headers["X-DB-Query-Count"] = str(stats.count)
+            response.headers["X-DB-Query-Time-Ms"] = str(stats.total_time_ms)
+            response.headers["X-DB-Repeated-Queries"] = str(len(repeated))
+        
+        return response
@@ -7,9 +7,9 @@ from starlette.responses import Response as StarletteResponse
 import time
 import logging
 import os
-from typing import Dict, Optional
-from collections import defaultdict
-import asyncio
+
+from app.core.executors import run_state_store
+from app.core.rate_limit import client_ip, get_rate_limiter, retry_after_header
 
 logger = logging.getLogger(__name__)
 
@@ -48,90 +48,48 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """Rate limiting middleware to prevent API abuse."""
     
-    def __init__(self, app, requests_per_minute: int = 100, requests_per_hour: int = 1000):
+    def __init__(self, app, requests_per_minute: int = 100, requests_per_hour: int = 1000,
+                 limiter=None):
         super().__init__(app)
         self.requests_per_minute = requests_per_minute
         self.requests_per_hour = requests_per_hour
-        self.request_counts: Dict[str, Dict[str, list]] = defaultdict(lambda: {"minute": [], "hour": []})
-        self.cleanup_task = None
+        self.limits = [(requests_per_minute, 60), (requests_per_hour, 3600)]
+        # GCRA limiter, shared by workers when the state store is
+        self._limiter = limiter
+    
+    @property
+    def limiter(self):
+        return self._limiter or get_rate_limiter()
         
     async def dispatch(self, request: Request, call_next):
         # Get client IP
         client_ip = self._get_client_ip(request)
         
-        # Check rate limits
-        current_time = time.time()
-        if not self._is_allowed(client_ip, current_time):
+        # Check and record the request against every limit at once
+        result = await run_state_store(self.limiter.hit, f"ip:{client_ip}", self.limits)
+        if not result.allowed:
             return StarletteResponse(
                 content="Rate limit exceeded. Try again later.",
                 status_code=429,
                 headers={
-                    "Retry-After": "60",
+                    "Retry-After": retry_after_header(result),
                     "X-RateLimit-Limit": str(self.requests_per_minute),
                     "X-RateLimit-Remaining": "0",
                 }
             )
         
-        # Add request to tracking
-        self._add_request(client_ip, current_time)
-        
         # Process request
         response = await call_next(request)
         
         # Add rate limit headers
-        remaining_requests = self._get_remaining_requests(client_ip, current_time)
         response.headers["X-RateLimit-Limit"] = str(self.requests_per_minute)
-        response.headers["X-RateLimit-Remaining"] = str(remaining_requests)
+        response.headers["X-RateLimit-Remaining"] = str(result.remaining)
         
         return response
     
     def _get_client_ip(self, request: Request) -> str:
         """Get client IP address from request."""
-        # Check for forwarded headers (when behind proxy/load balancer)
-        if forwarded_for := request.headers.get("X-Forwarded-For"):
-            return forwarded_for.split(",")[0].strip()
-        if real_ip := request.headers.get("X-Real-IP"):
-            return real_ip
-        return request.client.host if request.client else "unknown"
-    
-    def _is_allowed(self, client_ip: str, current_time: float) -> bool:
-        """Check if request is allowed based on rate limits."""
-        client_requests = self.request_counts[client_ip]
-        
-        # Clean old requests
-        self._clean_old_requests(client_requests, current_time)
-        
-        # Check minute limit
-        if len(client_requests["minute"]) >= self.requests_per_minute:
-            return False
-            
-        # Check hour limit
-        if len(client_requests["hour"]) >= self.requests_per_hour:
-            return False
-            
-        return True
-    
-    def _add_request(self, client_ip: str, current_time: float):
-        """Add request to tracking."""
-        client_requests = self.request_counts[client_ip]
-        client_requests["minute"].append(current_time)
-        client_requests["hour"].append(current_time)
-    
-    def _clean_old_requests(self, client_requests: Dict[str, list], current_time: float):
-        """Remove old requests from tracking."""
-        # Remove requests older than 1 minute
-        minute_cutoff = current_time - 60
-        client_requests["minute"] = [t for t in client_requests["minute"] if t > minute_cutoff]
-        
-        # Remove requests older than 1 hour
-        hour_cutoff = current_time - 3600
-        client_requests["hour"] = [t for t in client_requests["hour"] if t > hour_cutoff]
-    
-    def _get_remaining_requests(self, client_ip: str, current_time: float) -> int:
-        """Get remaining requests for client."""
-        client_requests = self.request_counts[client_ip]
-        self._clean_old_requests(client_requests, current_time)
-        return max(0, self.requests_per_minute - len(client_requests["minute"]))
+        return client_ip(request)
 
 
 class AuditLogMiddleware(BaseHTTPMiddleware):
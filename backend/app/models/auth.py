@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+
+
+class RefreshToken(Base):
+    """An issued refresh token (see app.core.refresh_tokens); usable once, then replaced."""
+    __tablename__ = "refresh_tokens"
+
+    id = Column(String(36), primary_key=True)  # The token's jti claim
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    family_id = Column(String(36), nullable=False, index=True)  # Shared by every rotation of one login
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True))
+    replaced_by = Column(String(36))  # jti of the token this one was rotated into
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
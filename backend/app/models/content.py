@@ -2,7 +2,7 @@
 Content management models for blog posts and articles
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Boolean, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Boolean, ForeignKey, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -12,6 +12,10 @@ from app.db.base_class import Base
 class BlogPost(Base):
     """Blog post model for content management"""
     __tablename__ = "blog_posts"
+    __table_args__ = (
+        Index("ix_blog_posts_author_id_created_at_id", "author_id", "created_at", "id"),
+        Index("ix_blog_posts_author_id_status_created_at_id", "author_id", "status", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False, index=True)
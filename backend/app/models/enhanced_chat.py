@@ -1,15 +1,18 @@
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer, JSON, Boolean, Float
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer, JSON, Boolean, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 from app.db.base_class import Base
-from app.models.user import EncryptedString
+from app.models.user import EncryptedBinary, EncryptedString
 
 
 class ChatSession(Base):
     """Enhanced chat session with memory and personalization capabilities."""
     __tablename__ = "chat_sessions"
+    __table_args__ = (
+        Index("ix_chat_sessions_user_id_last_activity_id", "user_id", "last_activity", "id"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -53,13 +56,16 @@ class ChatSession(Base):
 class ChatMessage(Base):
     """Enhanced message model with rich metadata and personalization."""
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("ix_chat_messages_session_id_created_at", "session_id", "created_at"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     session_id = Column(String, ForeignKey("chat_sessions.id"), nullable=False)
     
     # Message content (encrypted for HIPAA compliance)
     role = Column(String(20), nullable=False)  # user, assistant, system
-    content = Column(EncryptedString(10000))  # Main message content
+    content = Column(EncryptedBinary(compress=True))  # Main message content
     content_type = Column(String(20), default="text")  # text, audio, image, file
     
     # Rich metadata
@@ -110,8 +116,8 @@ class PersonalizedRemedy(Base):
     # Remedy details (encrypted for HIPAA compliance)
     remedy_type = Column(String(50))  # modern_medicine, ayurvedic, home_remedy, lifestyle
     title = Column(EncryptedString(255))
-    description = Column(EncryptedString(2000))
-    instructions = Column(EncryptedString(3000))
+    description = Column(EncryptedBinary(compress=True))
+    instructions = Column(EncryptedBinary(compress=True))
     
     # Personalization factors
     personalization_factors = Column(JSON)  # Age, gender, medical history, allergies, etc.
@@ -237,6 +243,9 @@ class UserPreferences(Base):
 class DataExport(Base):
     """Track data export requests for GDPR compliance."""
     __tablename__ = "data_exports"
+    __table_args__ = (
+        Index("ix_data_exports_user_id_status", "user_id", "status"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -290,6 +299,9 @@ class DataDeletion(Base):
 class ConversationMemory(Base):
     """Enhanced memory system for ChatGPT-like conversations."""
     __tablename__ = "conversation_memory"
+    __table_args__ = (
+        Index("ix_conversation_memory_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
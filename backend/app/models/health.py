@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -41,6 +41,9 @@ class HealthProfile(Base):
 
 class Consultation(Base):
     __tablename__ = "consultations"
+    __table_args__ = (
+        Index("ix_consultations_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -65,6 +68,10 @@ class Consultation(Base):
 
 class HealthMetric(Base):
     __tablename__ = "health_metrics"
+    __table_args__ = (
+        Index("ix_health_metrics_user_id_recorded_at_id", "user_id", "recorded_at", "id"),
+        Index("ix_health_metrics_user_id_metric_type_recorded_at_id", "user_id", "metric_type", "recorded_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -85,6 +92,9 @@ class HealthMetric(Base):
 class AuditLog(Base):
     """HIPAA-compliant audit logging for all data access."""
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("ix_audit_logs_user_id_timestamp", "user_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
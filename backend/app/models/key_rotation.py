@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+
+
+class ReencryptionCheckpoint(Base):
+    """Progress of the background re-encryption of one table (see app.services.reencryption)."""
+    __tablename__ = "reencryption_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    table_name = Column(String(100), unique=True, nullable=False)
+    target_key_id = Column(Integer, nullable=False)  # Key version values are moved to
+    last_id = Column(String(100))  # Primary key of the last processed row
+    rows_scanned = Column(Integer, default=0)
+    rows_reencrypted = Column(Integer, default=0)
+    completed_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
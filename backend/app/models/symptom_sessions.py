@@ -1,13 +1,13 @@
 """
 Symptom tracking and triage models for CareBow.
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Boolean, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Boolean, Enum, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
 
 from app.db.base_class import Base
-from app.models.user import EncryptedString
+from app.models.user import EncryptedString, BlindIndex, normalize_email, normalize_phone, sync_blind_index
 
 
 class SessionStatus(str, enum.Enum):
@@ -32,6 +32,9 @@ class RiskLevel(str, enum.Enum):
 class SymptomSession(Base):
     """Track symptom analysis sessions."""
     __tablename__ = "symptom_sessions"
+    __table_args__ = (
+        Index("ix_symptom_sessions_user_id_started_at_id", "user_id", "started_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -60,6 +63,9 @@ class SymptomSession(Base):
 class SymptomAnswer(Base):
     """Store individual Q&A responses in symptom sessions."""
     __tablename__ = "symptom_answers"
+    __table_args__ = (
+        Index("ix_symptom_answers_session_id_created_at", "session_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("symptom_sessions.id"), nullable=False)
@@ -125,7 +131,9 @@ class Provider(Base):
     
     # Contact info (encrypted for HIPAA)
     email = Column(EncryptedString(255))
+    email_index = Column(BlindIndex("email", normalizer=normalize_email), index=True)
     phone = Column(EncryptedString(50))
+    phone_index = Column(BlindIndex("phone", normalizer=normalize_phone), index=True)
     
     # Location (encrypted for HIPAA)
     address = Column(EncryptedString(500))
@@ -165,7 +173,9 @@ class Caregiver(Base):
     
     # Contact info (encrypted for HIPAA)
     email = Column(EncryptedString(255))
+    email_index = Column(BlindIndex("email", normalizer=normalize_email), index=True)
     phone = Column(EncryptedString(50))
+    phone_index = Column(BlindIndex("phone", normalizer=normalize_phone), index=True)
     
     # Location (encrypted for HIPAA)
     address = Column(EncryptedString(500))
@@ -279,33 +289,6 @@ class Consent(Base):
     user = relationship("User")
 
 
-class AuditLog(Base):
-    """Comprehensive audit logging for HIPAA compliance."""
-    __tablename__ = "audit_logs"
-
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))  # Nullable for system actions
-    
-    # Action details
-    action = Column(String(100), nullable=False)  # login, logout, create, read, update, delete
-    resource = Column(String(100), nullable=False)  # user, consultation, health_profile
-    resource_id = Column(String(100))  # ID of the affected resource
-    
-    # Request details
-    ip_address = Column(String(45))
-    user_agent = Column(String(500))
-    request_id = Column(String(100))  # Correlation ID
-    
-    # Additional metadata
-    metadata = Column(JSON)  # Additional context
-    
-    # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    
-    # Relationships
-    user = relationship("User")
-
-
 class Notification(Base):
     """Notification system for users."""
     __tablename__ = "notifications"
@@ -337,3 +320,9 @@ class Notification(Base):
     
     # Relationships
     user = relationship("User")
+
+
+sync_blind_index(Provider.email, Provider.email_index)
+sync_blind_index(Provider.phone, Provider.phone_index)
+sync_blind_index(Caregiver.email, Caregiver.email_index)
+sync_blind_index(Caregiver.phone, Caregiver.phone_index)
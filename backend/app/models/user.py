@@ -1,32 +1,133 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, Enum, TypeDecorator
+import re
+
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, Enum, LargeBinary, TypeDecorator, event
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
 
 from app.db.base_class import Base
-from app.core.encryption import get_encryption
+from app.core.encryption import get_encryption, defer_to_batch, LazyDecrypted, BLIND_INDEX_LENGTH
 
 
 class EncryptedString(TypeDecorator):
-    """Custom SQLAlchemy type for encrypted string fields."""
+    """
+    Custom SQLAlchemy type for encrypted string fields.
+    Inside a batch_decrypt query the raw ciphertext is returned and
+    app.db.batch_decrypt decrypts the whole result set in one call.
+    With lazy=True the value is only decrypted when the attribute is read
+    (see app.db.lazy_decrypt).
+    """
     impl = String
     cache_ok = True
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, lazy: bool = False, **kwargs):
         self.encryption = get_encryption()
+        self.lazy = lazy
         super().__init__(*args, **kwargs)
 
     def process_bind_param(self, value, dialect):
+        if isinstance(value, LazyDecrypted) and not value.is_decrypted:
+            # Unread value written back as-is: no decrypt/encrypt round-trip
+            return value.encrypted_value
         if value is not None:
-            return self.encryption.encrypt(value)
+            return self.encryption.encrypt(str(value))
         return value
 
     def process_result_value(self, value, dialect):
+        if value is None:
+            return value
+        if self.lazy:
+            return LazyDecrypted(value, self.encryption)
+        if not defer_to_batch(value):
+            return self.encryption.decrypt(value)
+        return value
+
+
+class EncryptedBinary(TypeDecorator):
+    """
+    Encrypted text stored as a raw binary envelope instead of base64, so
+    there is no size overhead and no String length ceiling. compress=True
+    compresses long values before encryption. Works with batch_decrypt
+    queries the same way as EncryptedString.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, *args, compress: bool = False, **kwargs):
+        self.encryption = get_encryption()
+        self.compress = compress
+        super().__init__(*args, **kwargs)
+
+    def process_bind_param(self, value, dialect):
         if value is not None:
+            return self.encryption.encrypt_bytes(str(value), compress=self.compress)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and not defer_to_batch(value):
             return self.encryption.decrypt(value)
         return value
 
 
+def normalize_email(value: str) -> str:
+    return value.strip().lower()
+
+
+def normalize_phone(value: str) -> str:
+    return re.sub(r"\D", "", value)
+
+
+class BlindDigest(str):
+    """A value that is already a blind index tag and must not be hashed again."""
+
+
+class BlindIndex(TypeDecorator):
+    """
+    Searchable companion column for an EncryptedString.
+    Stores a keyed HMAC of the normalized plaintext, so equality lookups can
+    use a regular index. Plaintext bound in queries is hashed automatically:
+    db.query(User).filter(User.phone_index == "555-123-4567").
+    Keep the column in step with its source with sync_blind_index().
+    """
+    impl = String(BLIND_INDEX_LENGTH)
+    cache_ok = True
+
+    def __init__(self, scope: str, normalizer=None):
+        self.scope = scope
+        self.normalizer = normalizer
+        super().__init__()
+
+    def digest(self, value: str) -> BlindDigest:
+        if self.normalizer is not None:
+            value = self.normalizer(value)
+        return BlindDigest(get_encryption().blind_index(value, self.scope))
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, BlindDigest):
+            return value
+        return self.digest(str(value))
+
+    def process_result_value(self, value, dialect):
+        if value is not None:
+            return BlindDigest(value)
+        return value
+
+
+def sync_blind_index(source, index) -> None:
+    """Recompute a BlindIndex column whenever its encrypted source attribute is set."""
+    index_key = index.key
+    index_type = index.property.columns[0].type
+
+    @event.listens_for(source, "set")
+    def _update_index(target, value, oldvalue, initiator):
+        setattr(target, index_key, index_type.digest(str(value)) if value is not None else None)
+
+
+def blind_index_match(index, value: str):
+    """Filter clause matching rows whose encrypted source equals value."""
+    return index == index.property.columns[0].type.digest(value)
+
+
 class SubscriptionTier(str, enum.Enum):
     FREE = "free"
     BASIC = "basic"
@@ -46,10 +147,11 @@ class User(Base):
     is_verified = Column(Boolean, default=False)
     
     # Profile information (encrypted for HIPAA compliance)
-    phone = Column(EncryptedString(255))
+    phone = Column(EncryptedString(255, lazy=True))
+    phone_index = Column(BlindIndex("phone", normalizer=normalize_phone), index=True)
     date_of_birth = Column(DateTime)  # Keep as datetime for queries
-    gender = Column(EncryptedString(50))
-    emergency_contact = Column(EncryptedString(500))
+    gender = Column(EncryptedString(50, lazy=True))
+    emergency_contact = Column(EncryptedString(500, lazy=True))
     
     # Subscription
     subscription_tier = Column(Enum(SubscriptionTier), default=SubscriptionTier.FREE)
@@ -62,8 +164,8 @@ class User(Base):
     
     # Multi-Factor Authentication
     mfa_enabled = Column(Boolean, default=False)
-    mfa_secret = Column(EncryptedString(255))  # TOTP secret (encrypted)
-    backup_codes = Column(EncryptedString(2000))  # JSON array of hashed backup codes (encrypted)
+    mfa_secret = Column(EncryptedString(255, lazy=True))  # TOTP secret (encrypted)
+    backup_codes = Column(EncryptedString(2000, lazy=True))  # JSON array of hashed backup codes (encrypted)
     last_mfa_used = Column(DateTime(timezone=True))
     
     # Security & Compliance
@@ -81,4 +183,8 @@ class User(Base):
     health_profiles = relationship("HealthProfile", back_populates="user")
     consultations = relationship("Consultation", back_populates="user")
     conversations = relationship("Conversation", back_populates="user")
-    blog_posts = relationship("BlogPost", back_populates="author")
\ No newline at end of file
+    blog_posts = relationship("BlogPost", back_populates="author")
+    symptom_sessions = relationship("SymptomSession", back_populates="user")
+
+
+sync_blind_index(User.phone, User.phone_index)
@@ -25,4 +25,15 @@ class UserResponse(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
-    user: UserResponse
\ No newline at end of file
+    user: UserResponse
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class TokenRefresh(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str
\ No newline at end of file
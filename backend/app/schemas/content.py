@@ -210,6 +210,7 @@ class BlogPostListResponse(BaseModel):
     page: int
     per_page: int
     total_pages: int
+    next_cursor: Optional[str] = None
 
 
 class ContentDashboardStats(BaseModel):
@@ -8,7 +8,7 @@ class ConversationCreate(BaseModel):
 
 class ConversationResponse(BaseModel):
     id: str
-    user_id: str
+    user_id: int
     profile_id: str
     channel: str
     started_at: datetime
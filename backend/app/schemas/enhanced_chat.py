@@ -0,0 +1,91 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+class ChatSessionCreate(BaseModel):
+    title: Optional[str] = "New Health Conversation"
+    is_continuous: bool = True
+    memory_enabled: bool = True
+    empathy_level: str = "high"  # 'high', 'medium', 'low'
+    comfort_mode: bool = True
+    data_retention_policy: str = "lifetime"  # 'lifetime', '1year', '6months', 'custom'
+
+class ChatSessionResponse(BaseModel):
+    id: str
+    user_id: int
+    title: Optional[str] = None
+    status: Optional[str] = None
+    is_continuous: Optional[bool] = None
+    memory_enabled: Optional[bool] = None
+    empathy_level: Optional[str] = None
+    comfort_mode: Optional[bool] = None
+    data_retention_policy: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ChatMessageCreate(BaseModel):
+    content: str
+    message_sequence: Optional[int] = None
+    parent_message_id: Optional[str] = None
+    is_edited: bool = False
+    edit_history: Optional[List[Dict[str, Any]]] = None
+    user_feedback: Optional[Dict[str, Any]] = None
+    empathy_indicators: Optional[Dict[str, Any]] = None
+    context_used: Optional[Dict[str, Any]] = None
+    follow_up_required: bool = False
+    follow_up_scheduled: Optional[datetime] = None
+
+class ChatMessageResponse(BaseModel):
+    id: str
+    session_id: str
+    role: str
+    content: Optional[str] = None
+    message_sequence: Optional[int] = None
+    parent_message_id: Optional[str] = None
+    empathy_indicators: Optional[Dict[str, Any]] = None
+    context_used: Optional[Dict[str, Any]] = None
+    follow_up_required: Optional[bool] = None
+    follow_up_scheduled: Optional[datetime] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class DataExportResponse(BaseModel):
+    id: str
+    user_id: int
+    export_type: str
+    status: str
+    requested_at: datetime
+    expires_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class DataDeletionResponse(BaseModel):
+    id: str
+    user_id: int
+    deletion_type: str
+    status: str
+    reason: Optional[str] = None
+    requested_at: datetime
+    grace_period_ends: Optional[datetime] = None
+    can_cancel: Optional[bool] = None
+
+    class Config:
+        from_attributes = True
+
+class ConversationMemoryResponse(BaseModel):
+    id: str
+    memory_type: Optional[str] = None
+    title: Optional[str] = None
+    content: Optional[str] = None
+    importance_score: Optional[float] = None
+    confidence_score: Optional[float] = None
+    tags: Optional[List[str]] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -3,12 +3,14 @@ Enhanced AI Service for CareBow
 Implements dynamic symptom dialogue and urgency classification
 """
 
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from enum import Enum
 from dataclasses import dataclass
 import json
 import logging
 
+from app.core.executors import run_io
+
 logger = logging.getLogger(__name__)
 
 class UrgencyLevel(Enum):
@@ -91,6 +93,74 @@ class EnhancedAIService:
         else:
             return self._generate_fallback_analysis(context, urgency_level, urgency_reason)
     
+    def generate_reply(self, message_content: str, history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """
+        Reply to one chat message. history holds earlier turns as
+        {"role", "content"} dicts, oldest first. Blocking: the OpenAI client
+        is synchronous, so async endpoints use process_message instead.
+        """
+        urgency_level, urgency_reason = self.assess_urgency(SymptomContext(primary_symptom=message_content))
+        reply = None
+        
+        if self.openai_client:
+            try:
+                response = self.openai_client.chat.completions.create(
+                    model="gpt-4",
+                    messages=[
+                        {"role": "system", "content": self._create_chat_prompt(urgency_level)},
+                        *(history or []),
+                        {"role": "user", "content": message_content}
+                    ],
+                    max_tokens=800,
+                    temperature=0.6
+                )
+                reply = response.choices[0].message.content
+            except Exception as e:
+                logger.error(f"OpenAI API error: {e}")
+        
+        if not reply:
+            reply = self._generate_fallback_reply(urgency_level, urgency_reason)
+        
+        return {
+            "response": reply,
+            "analysis": {
+                "urgency_level": urgency_level.value,
+                "urgency_reason": urgency_reason,
+                "urgency_emoji": self.get_urgency_emoji(urgency_level)
+            },
+            "remedies": [],
+            "follow_up_required": urgency_level != UrgencyLevel.GREEN
+        }
+    
+    async def process_message(self, message_content: str, history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """generate_reply on the I/O pool, so the OpenAI request stalls neither the event loop nor DB work."""
+        return await run_io(self.generate_reply, message_content, history)
+    
+    def _create_chat_prompt(self, urgency_level: UrgencyLevel) -> str:
+        return f"""
+You are CareBow, a caring AI health assistant combining modern medicine with Ayurvedic wisdom.
+Answer the user's latest message in the context of the conversation so far.
+
+ASSESSED URGENCY: {urgency_level.value.upper()} ({self.get_urgency_description(urgency_level)})
+
+Guidelines:
+1. Be empathetic and reassuring
+2. Give practical, actionable advice
+3. If the urgency is EMERGENCY, tell the user to seek help now before anything else
+4. Always recommend consulting healthcare professionals for serious concerns
+"""
+    
+    def _generate_fallback_reply(self, urgency_level: UrgencyLevel, urgency_reason: str) -> str:
+        actions = self._generate_fallback_analysis(
+            SymptomContext(primary_symptom=""), urgency_level, urgency_reason
+        ).immediate_actions
+        return (
+            f"{self.get_urgency_emoji(urgency_level)} {self.get_urgency_description(urgency_level)}. "
+            f"{urgency_reason}.\n\n"
+            + "\n".join(f"- {action}" for action in actions)
+            + "\n\nPlease consult a healthcare professional if you are concerned."
+        )
+    
     def _create_analysis_prompt(self, context: SymptomContext, urgency_level: UrgencyLevel) -> str:
         return f"""
 You are CareBow, an advanced medical AI assistant specializing in integrative medicine.
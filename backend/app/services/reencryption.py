@@ -0,0 +1,202 @@
+"""
+Background re-encryption of HIPAA-encrypted columns after a key rotation.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+import sqlalchemy as sa
+from sqlalchemy import bindparam, inspect, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.encryption import HIPAAEncryption, get_encryption
+from app.models.key_rotation import ReencryptionCheckpoint
+
+logger = logging.getLogger(__name__)
+
+
+def _encrypted_table(name: str, *columns: str, key_type=sa.Integer, binary=()) -> sa.TableClause:
+    # Columns are declared as plain String/LargeBinary so values are read and
+    # written as raw ciphertext, bypassing EncryptedString/EncryptedBinary.
+    return sa.table(
+        name,
+        sa.column("id", key_type),
+        *(sa.column(c, sa.String) for c in columns),
+        *(sa.column(c, sa.LargeBinary) for c in binary)
+    )
+
+
+# Every table with encrypted columns. Kept as a static registry rather
+# than walking Base.metadata so that models which cannot be imported side by
+# side (app.models.symptom_sessions) are still covered.
+ENCRYPTED_TABLES: Dict[str, sa.TableClause] = {
+    table.name: table for table in (
+        _encrypted_table("users", "phone", "gender", "emergency_contact", "mfa_secret", "backup_codes"),
+        _encrypted_table(
+            "health_profiles", "height", "weight", "blood_type", "allergies", "medications", "medical_conditions"
+        ),
+        _encrypted_table("consultations", "symptoms", "ai_analysis"),
+        _encrypted_table("health_metrics", "value", "notes"),
+        _encrypted_table("chat_messages", key_type=sa.String, binary=("content",)),
+        _encrypted_table(
+            "personalized_remedies", "title", "effectiveness_notes",
+            key_type=sa.String, binary=("description", "instructions")
+        ),
+        _encrypted_table("health_memory", "title", "content", key_type=sa.String),
+        _encrypted_table("conversation_insights", "title", "description", key_type=sa.String),
+        _encrypted_table("conversation_memory", "title", "content", key_type=sa.String),
+        _encrypted_table("symptom_sessions", "primary_complaint"),
+        _encrypted_table("symptom_answers", "answer_text"),
+        _encrypted_table(
+            "triage_results", "possible_conditions", "modern_recommendations", "ayurvedic_recommendations"
+        ),
+        _encrypted_table("providers", "email", "phone", "address"),
+        _encrypted_table("caregivers", "email", "phone", "address"),
+        _encrypted_table("appointments", "notes", "symptoms"),
+        _encrypted_table("notifications", "content"),
+    )
+}
+
+
+class ReencryptionEngine:
+    """
+    Moves every encrypted value to a target key version.
+
+    Tables are walked in primary-key order with keyset pagination. Each page
+    is re-encrypted in one batch, written back with executemany UPDATEs and
+    committed together with the table's checkpoint, so an interrupted run
+    resumes where it stopped. Updates only apply while the column still holds
+    the ciphertext that was read, so values written concurrently by live
+    traffic are never overwritten. Throughput is capped at rows_per_second.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        encryption: Optional[HIPAAEncryption] = None,
+        batch_size: Optional[int] = None,
+        rows_per_second: Optional[int] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.db = db
+        self.encryption = encryption or get_encryption()
+        self.batch_size = batch_size or settings.REENCRYPTION_BATCH_SIZE
+        self.rows_per_second = (
+            settings.REENCRYPTION_ROWS_PER_SECOND if rows_per_second is None else rows_per_second
+        )
+        self._sleep = sleep
+        self._started = time.monotonic()
+        self._rows = 0
+
+    def run(self, target_key_id: Optional[int] = None, tables: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """Re-encrypt all registered tables; returns re-encrypted value counts per table."""
+        target_key_id = target_key_id or self.encryption.active_key_id
+        existing = set(inspect(self.db.get_bind()).get_table_names())
+        results = {}
+        for name in tables or ENCRYPTED_TABLES:
+            if name not in existing:
+                continue
+            results[name] = self.reencrypt_table(name, target_key_id)
+        return results
+
+    def reencrypt_table(self, table_name: str, target_key_id: int) -> int:
+        """Re-encrypt one table from its checkpoint to the end."""
+        table = ENCRYPTED_TABLES[table_name]
+        checkpoint = self._checkpoint(table_name, target_key_id)
+        if checkpoint.completed_at is not None:
+            return 0
+
+        key = table.c.id
+        columns = [c for c in table.c if c is not key]
+        reencrypted = 0
+        while True:
+            query = select(key, *columns).order_by(key).limit(self.batch_size)
+            if checkpoint.last_id is not None:
+                query = query.where(key > key.type.python_type(checkpoint.last_id))
+            rows = self.db.execute(query).all()
+            if not rows:
+                break
+
+            changed = self._reencrypt_rows(table, columns, rows, target_key_id)
+            checkpoint.last_id = str(rows[-1][0])
+            checkpoint.rows_scanned = (checkpoint.rows_scanned or 0) + len(rows)
+            checkpoint.rows_reencrypted = (checkpoint.rows_reencrypted or 0) + changed
+            self.db.commit()
+            reencrypted += changed
+            self._throttle(len(rows))
+
+        checkpoint.completed_at = datetime.now(timezone.utc)
+        self.db.commit()
+        logger.info(f"Re-encrypted {reencrypted} values in {table_name} under key version {target_key_id}")
+        return reencrypted
+
+    def _reencrypt_rows(self, table, columns, rows, target_key_id: int) -> int:
+        stale = [
+            (row[0], column.name, value)
+            for row in rows
+            for column, value in zip(columns, row[1:])
+            if value is not None and self.encryption.key_id_of(value) != target_key_id
+        ]
+        if not stale:
+            return 0
+
+        fresh = self.encryption.reencrypt_many([value for _, _, value in stale], target_key_id)
+        updates: Dict[str, List[dict]] = {}
+        for (row_id, column, old), new in zip(stale, fresh):
+            updates.setdefault(column, []).append({"_id": row_id, "_old": old, "_new": new})
+
+        for column, params in updates.items():
+            statement = (
+                update(table)
+                .where(table.c.id == bindparam("_id"), table.c[column] == bindparam("_old"))
+                .values({column: bindparam("_new")})
+            )
+            self.db.execute(statement, params)
+        return len(stale)
+
+    def _checkpoint(self, table_name: str, target_key_id: int) -> ReencryptionCheckpoint:
+        checkpoint = self.db.query(ReencryptionCheckpoint).filter(
+            ReencryptionCheckpoint.table_name == table_name
+        ).first()
+        if checkpoint is None:
+            checkpoint = ReencryptionCheckpoint(table_name=table_name, target_key_id=target_key_id)
+            self.db.add(checkpoint)
+        elif checkpoint.target_key_id != target_key_id:
+            # A newer rotation restarts the walk from the beginning
+            checkpoint.target_key_id = target_key_id
+            checkpoint.last_id = None
+            checkpoint.rows_scanned = 0
+            checkpoint.rows_reencrypted = 0
+            checkpoint.completed_at = None
+        self.db.commit()
+        return checkpoint
+
+    def _throttle(self, rows: int) -> None:
+        """Sleep until the overall rate is back under rows_per_second."""
+        self._rows += rows
+        if not self.rows_per_second:
+            return
+        delay = self._rows / self.rows_per_second - (time.monotonic() - self._started)
+        if delay > 0:
+            self._sleep(delay)
+
+
+def start_background_reencryption(target_key_id: int) -> threading.Thread:
+    """Run a ReencryptionEngine in a daemon thread with its own session."""
+    from app.db.session import SessionLocal
+
+    def _run():
+        db = SessionLocal()
+        try:
+            ReencryptionEngine(db).run(target_key_id)
+        except Exception as e:
+            logger.error(f"Background re-encryption to key version {target_key_id} failed: {e}")
+        finally:
+            db.close()
+
+    thread = threading.Thread(target=_run, name=f"reencrypt-v{target_key_id}", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,5 @@
+"""
+Performance benchmarks for the CareBow backend.
+
+Run from the backend directory, e.g. ``python -m benchmarks.batch_decrypt``.
+"""
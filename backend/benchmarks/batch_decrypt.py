@@ -0,0 +1,82 @@
+"""
+Benchmark: per-row vs batched decryption of EncryptedString result sets.
+
+Loads 10/100/1000 chat messages from an in-memory SQLite database, once
+with the default per-value decryption and once with
+``execution_options(batch_decrypt=True)``.
+
+    python -m benchmarks.batch_decrypt [--legacy]
+
+--legacy writes rows in the per-salt PBKDF2 format, where the thread pool
+matters most.
+"""
+import argparse
+import os
+import time
+import uuid
+
+os.environ.setdefault("HIPAA_ENCRYPTION_KEY", "BENCHMARK_HIPAA_KEY_32_CHARS_NOT_FOR_PRODUCTION")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.encryption import get_encryption
+from app.db.base import Base
+from app.db import batch_decrypt  # noqa: F401
+from app.models import content  # noqa: F401  (User.blog_posts)
+from app.models.user import User
+from app.models.enhanced_chat import ChatSession, ChatMessage
+
+ROW_COUNTS = (10, 100, 1000)
+MESSAGE = "I've had a dull headache behind my eyes for three days, worse in the evening. " * 3
+
+
+def _seed(session_factory, rows: int) -> str:
+    db = session_factory()
+    session_id = str(uuid.uuid4())
+    db.add(ChatSession(id=session_id, user_id=1, title="Benchmark"))
+    db.add_all([
+        ChatMessage(id=str(uuid.uuid4()), session_id=session_id, role="user", content=MESSAGE)
+        for _ in range(rows)
+    ])
+    db.commit()
+    db.close()
+    return session_id
+
+
+def _load(session_factory, session_id: str, batch: bool) -> float:
+    get_encryption()._legacy_keys.clear()  # measure cold legacy reads
+    db = session_factory()
+    start = time.perf_counter()
+    query = db.query(ChatMessage).filter(ChatMessage.session_id == session_id)
+    if batch:
+        query = query.execution_options(batch_decrypt=True)
+    messages = query.all()
+    assert all(message.content == MESSAGE for message in messages)
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--legacy", action="store_true", help="write legacy per-salt ciphertexts")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    get_encryption()._envelope = not args.legacy
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__, ChatSession.__table__, ChatMessage.__table__])
+    session_factory = sessionmaker(bind=engine)
+    
+    print(f"mode={'legacy' if args.legacy else 'envelope'}")
+    print(f"{'rows':>6} {'per-row ms':>12} {'batched ms':>12} {'speedup':>8}")
+    for rows in ROW_COUNTS:
+        session_id = _seed(session_factory, rows)
+        per_row = min(_load(session_factory, session_id, batch=False) for _ in range(args.repeat))
+        batched = min(_load(session_factory, session_id, batch=True) for _ in range(args.repeat))
+        print(f"{rows:>6} {per_row * 1000:>12.2f} {batched * 1000:>12.2f} {per_row / batched:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
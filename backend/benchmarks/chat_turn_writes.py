@@ -0,0 +1,116 @@
+"""
+Benchmark: per-row commits vs one unit of work for a chat turn's writes.
+
+A turn writes the user message, the AI message, its remedies and extracted
+memories. The per-row path adds, commits and refreshes each of them as
+RequestExecutor.save did; the batched path queues them on a UnitOfWork
+and commits once, with remedies and memories as bulk INSERTs. Runs on a
+file-backed SQLite database so each commit pays for its journal sync.
+
+    python -m benchmarks.chat_turn_writes [--turns N]
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+
+os.environ.setdefault("HIPAA_ENCRYPTION_KEY", "BENCHMARK_HIPAA_KEY_32_CHARS_NOT_FOR_PRODUCTION")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.query_stats import capture_queries
+from app.db.unit_of_work import UnitOfWork
+from app.models.enhanced_chat import ChatMessage, ChatSession, ConversationMemory, PersonalizedRemedy
+from app.models.user import User
+
+REMEDY_COUNTS = (0, 3, 10)
+MEMORIES_PER_TURN = 2
+
+
+def _remedy(session_id: str, message_id: str, i: int) -> dict:
+    return {
+        "session_id": session_id, "message_id": message_id, "user_id": 1, "remedy_type": "home_remedy",
+        "title": f"Remedy {i}", "description": "Warm ginger tea with honey.", "instructions": "Twice daily.",
+        "confidence_score": 0.8, "personalization_factors": {"age": 34},
+    }
+
+
+def _memory(i: int) -> dict:
+    return {"user_id": 1, "memory_type": "health_pattern", "title": f"Memory {i}",
+            "content": "Headaches are worse in the evening.", "importance_score": 0.7}
+
+
+def _per_row_turn(db, session_id: str, remedies: int) -> None:
+    def save(instance):
+        db.add(instance)
+        db.commit()
+        db.refresh(instance)
+
+    user_message = ChatMessage(id=str(uuid.uuid4()), session_id=session_id, role="user", content="I have a headache")
+    save(user_message)
+    ai_message = ChatMessage(id=str(uuid.uuid4()), session_id=session_id, role="assistant", content="Try resting.",
+                             parent_message_id=user_message.id)
+    save(ai_message)
+    for i in range(remedies):
+        save(PersonalizedRemedy(id=str(uuid.uuid4()), **_remedy(session_id, ai_message.id, i)))
+    for i in range(MEMORIES_PER_TURN):
+        save(ConversationMemory(id=str(uuid.uuid4()), **_memory(i)))
+
+
+def _batched_turn(db, session_id: str, remedies: int) -> None:
+    unit = UnitOfWork()
+    user_message = unit.add(ChatMessage(session_id=session_id, role="user", content="I have a headache"))
+    ai_message = unit.add(ChatMessage(session_id=session_id, role="assistant", content="Try resting.",
+                                      parent_message_id=user_message.id))
+    unit.add_rows(PersonalizedRemedy, [_remedy(session_id, ai_message.id, i) for i in range(remedies)])
+    unit.add_rows(ConversationMemory, [_memory(i) for i in range(MEMORIES_PER_TURN)])
+    unit.commit(db)
+
+
+def _run(session_factory, engine, turn, remedies: int, turns: int):
+    commits = []
+    listener = lambda conn: commits.append(1)  # noqa: E731
+    event.listen(engine, "commit", listener)
+    db = session_factory()
+    session_id = str(uuid.uuid4())
+    db.add(ChatSession(id=session_id, user_id=1, title="Benchmark"))
+    db.commit()
+    commits.clear()
+    try:
+        with capture_queries() as stats:
+            start = time.perf_counter()
+            for _ in range(turns):
+                turn(db, session_id, remedies)
+            elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+        event.remove(engine, "commit", listener)
+    return len(commits) / turns, stats.count / turns, elapsed / turns
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(engine, tables=[
+            User.__table__, ChatSession.__table__, ChatMessage.__table__,
+            PersonalizedRemedy.__table__, ConversationMemory.__table__,
+        ])
+        session_factory = sessionmaker(bind=engine)
+
+        print(f"{'remedies':>8} {'path':>9} {'commits':>8} {'stmts':>7} {'ms/turn':>9}")
+        for remedies in REMEDY_COUNTS:
+            for name, turn in (("per-row", _per_row_turn), ("batched", _batched_turn)):
+                commits, statements, seconds = _run(session_factory, engine, turn, remedies, args.turns)
+                print(f"{remedies:>8} {name:>9} {commits:>8.1f} {statements:>7.1f} {seconds * 1000:>9.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Benchmark: throughput and latency of HIPAA field encryption.
+
+Covers encrypt/decrypt at payload sizes from 16 B to 10 KB, key derivation,
+round-trips through the EncryptedString TypeDecorator and full ORM loads of
+ChatMessage and HealthProfile rows from an in-memory SQLite database.
+Results are written as JSON (ops/sec, p50, p99) so runs before and after an
+encryption change can be compared.
+
+    python -m benchmarks.encryption [--iterations N] [--output results.json] [--legacy]
+
+--legacy also measures the per-salt PBKDF2 format (slow; uses fewer iterations).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault("HIPAA_ENCRYPTION_KEY", "BENCHMARK_HIPAA_KEY_32_CHARS_NOT_FOR_PRODUCTION")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.encryption import HIPAAEncryption, KEK_SALT, get_encryption
+from app.db.base import Base
+from app.db import batch_decrypt  # noqa: F401
+from app.models import content  # noqa: F401  (User.blog_posts)
+from app.models.user import User, EncryptedString
+from app.models.health import HealthProfile
+from app.models.enhanced_chat import ChatSession, ChatMessage
+
+PAYLOAD_SIZES = (16, 256, 1024, 4096, 10240)
+ORM_ROWS = 100
+LEGACY_ITERATIONS = 20
+
+
+def _measure(name: str, fn: Callable[[], object], iterations: int, **labels) -> Dict:
+    """Time fn() individually iterations times; report ops/sec and percentiles."""
+    fn()  # warm-up: key derivation, statement caches
+    samples: List[int] = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append(time.perf_counter_ns() - start)
+    samples.sort()
+    total = sum(samples)
+    return {
+        "name": name,
+        **labels,
+        "iterations": iterations,
+        "ops_per_sec": round(iterations / (total / 1e9), 2),
+        "mean_us": round(total / iterations / 1000, 2),
+        "p50_us": round(samples[len(samples) // 2] / 1000, 2),
+        "p99_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1000, 2),
+    }
+
+
+def bench_payloads(encryption: HIPAAEncryption, iterations: int, legacy: bool) -> List[Dict]:
+    results = []
+    for size in PAYLOAD_SIZES:
+        payload = "x" * size
+        ciphertext = encryption.encrypt(payload)
+        blob = encryption.encrypt_bytes(payload)
+        results.append(_measure("encrypt", lambda: encryption.encrypt(payload), iterations, size=size))
+        results.append(_measure("decrypt", lambda: encryption.decrypt(ciphertext), iterations, size=size))
+        results.append(_measure("encrypt_bytes", lambda: encryption.encrypt_bytes(payload), iterations, size=size))
+        results.append(_measure("decrypt_bytes", lambda: encryption.decrypt(blob), iterations, size=size))
+
+        if legacy:
+            legacy_encryption = HIPAAEncryption(envelope=False)
+            legacy_ciphertext = legacy_encryption.encrypt(payload)
+
+            def cold_legacy_decrypt():
+                legacy_encryption._legacy_keys.clear()
+                legacy_encryption.decrypt(legacy_ciphertext)
+
+            results.append(_measure(
+                "encrypt_legacy", lambda: legacy_encryption.encrypt(payload), LEGACY_ITERATIONS, size=size
+            ))
+            results.append(_measure("decrypt_legacy", cold_legacy_decrypt, LEGACY_ITERATIONS, size=size))
+    return results
+
+
+def bench_kdf(encryption: HIPAAEncryption, iterations: int) -> List[Dict]:
+    return [
+        _measure("kdf_pbkdf2", lambda: encryption._derive_key(KEK_SALT), max(5, iterations // 100)),
+        _measure("kdf_hkdf_data_key", lambda: encryption._expand_key("carebow-hipaa-dek:1"), iterations),
+    ]
+
+
+def bench_type_decorator(iterations: int) -> List[Dict]:
+    column_type = EncryptedString(255)
+
+    def round_trip():
+        stored = column_type.process_bind_param("555-123-4567", None)
+        return column_type.process_result_value(stored, None)
+
+    return [_measure("encrypted_string_round_trip", round_trip, iterations)]
+
+
+def bench_orm(iterations: int) -> List[Dict]:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, HealthProfile.__table__, ChatSession.__table__, ChatMessage.__table__
+    ])
+    session_factory = sessionmaker(bind=engine)
+
+    db = session_factory()
+    user = User(email="benchmark@carebow.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    session_id = str(uuid.uuid4())
+    db.add(ChatSession(id=session_id, user_id=user.id, title="Benchmark"))
+    db.add_all([
+        ChatMessage(
+            id=str(uuid.uuid4()), session_id=session_id, role="user",
+            content="I've had a dull headache behind my eyes for three days. " * 3
+        )
+        for _ in range(ORM_ROWS)
+    ])
+    db.add_all([
+        HealthProfile(
+            user_id=user.id, height="5'8\"", weight="150 lbs", blood_type="O+",
+            allergies="penicillin", medications="none", medical_conditions="migraine"
+        )
+        for _ in range(ORM_ROWS)
+    ])
+    db.commit()
+    db.close()
+
+    def load(model, batch: bool):
+        def run():
+            db = session_factory()
+            query = db.query(model)
+            if batch:
+                query = query.execution_options(batch_decrypt=True)
+            rows = query.all()
+            db.close()
+            return rows
+        return run
+
+    orm_iterations = max(5, iterations // 20)
+    results = []
+    for model in (ChatMessage, HealthProfile):
+        for batch in (False, True):
+            results.append(_measure(
+                "orm_load", load(model, batch), orm_iterations,
+                model=model.__name__, rows=ORM_ROWS, batch_decrypt=batch
+            ))
+    return results
+
+
+def run(iterations: int, legacy: bool) -> Dict:
+    encryption = get_encryption()
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "iterations": iterations,
+            "active_key_id": encryption.active_key_id,
+            "plaintext_cache": encryption.plaintext_cache is not None,
+        },
+        "results": (
+            bench_payloads(encryption, iterations, legacy)
+            + bench_kdf(encryption, iterations)
+            + bench_type_decorator(iterations)
+            + bench_orm(iterations)
+        ),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    parser.add_argument("--legacy", action="store_true", help="also measure legacy per-salt ciphertexts")
+    args = parser.parse_args(argv)
+
+    report = json.dumps(run(args.iterations, args.legacy), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
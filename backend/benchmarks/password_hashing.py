@@ -0,0 +1,56 @@
+"""
+Benchmark: password verifications (logins) per second per core.
+
+Verifies bcrypt hashes through the bounded password pool at several work
+factors and worker counts, concurrently from one event loop as login
+requests would. bcrypt releases the GIL, so throughput should grow with
+workers up to the number of cores; logins/s/core shows how close it gets.
+
+    python -m benchmarks.password_hashing [--logins N] [--rounds 10 12]
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("HIPAA_ENCRYPTION_KEY", "BENCHMARK_HIPAA_KEY_32_CHARS_NOT_FOR_PRODUCTION")
+
+from passlib.context import CryptContext
+
+from app.core.executors import BoundedExecutor
+
+PASSWORD = "correct horse battery staple"
+
+
+async def _logins(context: CryptContext, hashed: str, workers: int, logins: int) -> float:
+    pool = BoundedExecutor(ThreadPoolExecutor(max_workers=workers), limit=logins)
+    start = time.perf_counter()
+    await asyncio.gather(*(pool.run(context.verify, PASSWORD, hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    pool.executor.shutdown()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, max(1, cores // 2), cores})
+    print(f"{cores} cores")
+    print(f"{'rounds':>6} {'workers':>7} {'logins/s':>9} {'/core':>7} {'ms/login':>9}")
+    for rounds in args.rounds:
+        context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+        hashed = context.hash(PASSWORD)
+        for workers in worker_counts:
+            elapsed = asyncio.run(_logins(context, hashed, workers, args.logins))
+            rate = args.logins / elapsed
+            print(f"{rounds:>6} {workers:>7} {rate:>9.1f} {rate / min(workers, cores):>7.1f} "
+                  f"{elapsed / args.logins * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
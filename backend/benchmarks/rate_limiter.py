@@ -0,0 +1,102 @@
+"""
+Benchmark: rate-limit checks per second and memory at 10k distinct clients.
+
+Compares the previous middleware algorithm (per-client timestamp lists,
+filtered on every check) with the GCRA limiter, in memory and, with
+--shm, on the shared-memory backend (a SQLite transaction per check).
+Clients send requests round-robin, so by the end each one has --requests
+timestamps in the hour window; the list version slows down as that
+history grows, while GCRA keeps one float per client and limit.
+
+    python -m benchmarks.rate_limiter [--clients N] [--requests N ...] [--shm]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Callable, Dict
+
+os.environ.setdefault("HIPAA_ENCRYPTION_KEY", "BENCHMARK_HIPAA_KEY_32_CHARS_NOT_FOR_PRODUCTION")
+
+from app.core.rate_limit import MemoryRateLimiter, SharedMemoryRateLimiter
+from app.core.state_store import SharedMemoryStateStore
+
+PER_MINUTE = 100
+PER_HOUR = 1000
+LIMITS = [(PER_MINUTE, 60), (PER_HOUR, 3600)]
+
+
+class ListRateLimiter:
+    """The timestamp-list algorithm RateLimitMiddleware used before GCRA."""
+
+    def __init__(self):
+        self.request_counts: Dict[str, Dict[str, list]] = defaultdict(lambda: {"minute": [], "hour": []})
+
+    def hit(self, client: str) -> bool:
+        now = time.time()
+        requests = self.request_counts[client]
+        self._clean(requests, now)
+        if len(requests["minute"]) >= PER_MINUTE or len(requests["hour"]) >= PER_HOUR:
+            return False
+        requests["minute"].append(now)
+        requests["hour"].append(now)
+        self._clean(requests, now)  # _get_remaining_requests cleaned again
+        return True
+
+    @staticmethod
+    def _clean(requests: Dict[str, list], now: float) -> None:
+        requests["minute"] = [t for t in requests["minute"] if t > now - 60]
+        requests["hour"] = [t for t in requests["hour"] if t > now - 3600]
+
+
+def _gcra_hit(limiter) -> Callable[[str], object]:
+    return lambda client: limiter.hit(client, LIMITS)
+
+
+def _run(hit: Callable[[str], object], clients: int, requests: int) -> float:
+    names = [f"ip:10.{i // 65536}.{i // 256 % 256}.{i % 256}" for i in range(clients)]
+    start = time.perf_counter()
+    for _ in range(requests):
+        for name in names:
+            hit(name)
+    return time.perf_counter() - start
+
+
+def _measure(label: str, factory: Callable[[], Callable[[str], object]], clients: int, requests: int) -> None:
+    elapsed = _run(factory(), clients, requests)
+    # Memory on a second run; tracing would distort the timings
+    tracemalloc.start()
+    hit = factory()
+    _run(hit, clients, requests)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    checks = clients * requests
+    print(f"{label:>10} {requests:>8} {checks / elapsed:>10.0f} {elapsed / checks * 1e6:>8.2f} "
+          f"{retained / 1024 / 1024:>9.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--requests", type=int, nargs="+", default=[10, 50, 200],
+                        help="requests per client (history length for the list algorithm)")
+    parser.add_argument("--shm", action="store_true", help="also run the shared-memory backend")
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients, limits {PER_MINUTE}/min and {PER_HOUR}/h")
+    print(f"{'limiter':>10} {'requests':>8} {'checks/s':>10} {'us/check':>8} {'memory MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for requests in args.requests:
+            _measure("list", lambda: ListRateLimiter().hit, args.clients, requests)
+            _measure("gcra", lambda: _gcra_hit(MemoryRateLimiter()), args.clients, requests)
+            if not args.shm:
+                continue
+            path = os.path.join(tmp, f"state-{requests}.db")
+            _measure("gcra-shm", lambda: _gcra_hit(SharedMemoryRateLimiter(SharedMemoryStateStore(path))),
+                     args.clients, requests)
+
+
+if __name__ == "__main__":
+    main()
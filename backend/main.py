@@ -5,9 +5,12 @@ from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import logging
 import os
+import time
 from dotenv import load_dotenv
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
+_import_started = time.perf_counter()
+
 # Load environment variables - prioritize test env when running tests
 env_file = os.getenv("ENV_FILE", ".env.test" if "pytest" in os.environ.get("_", "") else ".env")
 load_dotenv(env_file)
@@ -22,6 +25,7 @@ from app.middleware.security import (
     AuditLogMiddleware,
     InputValidationMiddleware
 )
+from app.middleware.query_stats import QueryStatsMiddleware
 
 # Initialize Sentry before creating the FastAPI app
 init_sentry()
@@ -33,8 +37,14 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting CareBow API...")
-    init_db()
-    logger.info("CareBow API startup complete")
+    lifespan_started = time.perf_counter()
+    phases = {"imports": round((lifespan_started - _import_started) * 1000, 2)}
+    phases.update({f"db.{phase}": ms for phase, ms in init_db().items()})
+    total_ms = round((time.perf_counter() - _import_started) * 1000, 2)
+    logger.info(
+        f"CareBow API startup complete in {total_ms}ms "
+        f"({', '.join(f'{phase}={ms}ms' for phase, ms in phases.items())})"
+    )
     yield
     # Shutdown
     logger.info("CareBow API shutting down...")
@@ -52,7 +62,7 @@ app = FastAPI(
 # HTTP Exception handler for consistent JSON responses
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
-    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=exc.headers)
 
 # Global exception handler
 @app.exception_handler(Exception)
@@ -143,6 +153,9 @@ ALLOWED_ORIGINS = [
     "https://dcqajf07bdpek.cloudfront.net"    # Staging CloudFront
 ]
 
+# Per-request SQL counters (innermost, so only the endpoint's own queries count)
+app.add_middleware(QueryStatsMiddleware)
+
 # Add security middleware
 app.add_middleware(SecurityHeadersMiddleware)
 app.add_middleware(AuditLogMiddleware)
@@ -159,6 +172,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=settings.allowed_hosts_list)
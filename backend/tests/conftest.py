@@ -2,10 +2,14 @@ import pytest
 import os
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from dotenv import load_dotenv
 from unittest.mock import Mock
 
+pytest_plugins = ["tests.query_budget"]
+
 # Load test environment
 load_dotenv(".env.test")
 
@@ -17,6 +21,10 @@ os.environ["HIPAA_ENCRYPTION_KEY"] = "TEST_HIPAA_KEY_32_CHARS_FOR_TESTING_ONLY_1
 from main import app
 from app.db.base import Base
 from app.db.session import get_db
+from app.api.deps import get_async_db
+from app.db.principal_cache import principal_cache
+from app.core.rate_limit import get_rate_limiter
+from app.core.state_store import get_state_store
 
 # Create test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_carebow.db"
@@ -30,7 +38,19 @@ def override_get_db():
     finally:
         db.close()
 
+# Async routes use a separate engine on the same file. NullPool because each
+# TestClient request runs on its own event loop.
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_carebow.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
 
 @pytest.fixture
 def client():
@@ -61,6 +81,10 @@ def setup_test_db():
     # Drop and recreate all tables before each test
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    # User ids restart with the tables, so cached principals and budgets are stale
+    principal_cache.clear()
+    get_rate_limiter().clear()
+    get_state_store().clear()
     
     yield  # Run the test
     
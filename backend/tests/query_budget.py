@@ -0,0 +1,59 @@
+"""
+Pytest plugin for SQL query budgets.
+
+    @pytest.mark.query_budget(5)
+    def test_list(client, auth_headers): ...
+
+fails the test when its body runs more than 5 statements. The
+query_budget fixture gives the same check around a single block:
+
+    with query_budget(5, max_repeats=2):
+        client.get("/api/v1/admin/user-analytics", headers=auth_headers)
+
+max_repeats caps how often any one statement may run, which catches N+1
+loops even under a generous total budget.
+"""
+from contextlib import contextmanager
+from typing import Optional
+
+import pytest
+
+from app.db.query_stats import QueryStats, capture_queries
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "query_budget(max_queries, max_repeats=None): fail when the test runs more SQL statements"
+    )
+
+
+def check_budget(stats: QueryStats, max_queries: Optional[int], max_repeats: Optional[int] = None) -> None:
+    if max_queries is not None and stats.count > max_queries:
+        pytest.fail(f"Query budget exceeded: {stats.count} > {max_queries}\n{stats.summary()}", pytrace=False)
+    if max_repeats is not None:
+        repeated = {sql: count for sql, count in stats.statements.items() if count > max_repeats}
+        if repeated:
+            worst = "\n".join(f"  {count}x {sql[:200]}" for sql, count in repeated.items())
+            pytest.fail(f"Statements repeated more than {max_repeats} times (N+1?):\n{worst}", pytrace=False)
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker("query_budget")
+    if marker is None:
+        return (yield)
+    with capture_queries() as stats:
+        result = yield
+    check_budget(stats, *marker.args, **marker.kwargs)
+    return result
+
+
+@pytest.fixture
+def query_budget():
+    """Context manager factory asserting a query budget for the enclosed block."""
+    @contextmanager
+    def budget(max_queries: Optional[int] = None, max_repeats: Optional[int] = None):
+        with capture_queries() as stats:
+            yield stats
+        check_budget(stats, max_queries, max_repeats)
+    return budget
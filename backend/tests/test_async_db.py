@@ -0,0 +1,95 @@
+"""
+Async database session tests.
+"""
+import asyncio
+
+import pytest
+
+from app.core.config import Settings
+from app.core.encryption import get_encryption
+
+
+class TestAsyncDatabase:
+    """Test the async engine and the routes served from AsyncSession."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("url, expected", [
+        ("sqlite:///./carebow.db", "sqlite+aiosqlite:///./carebow.db"),
+        ("postgresql://carebow:s3cret@db:5432/carebow", "postgresql+asyncpg://carebow:s3cret@db:5432/carebow"),
+        ("postgresql+psycopg2://carebow:s3cret@db/carebow", "postgresql+asyncpg://carebow:s3cret@db/carebow"),
+    ])
+    def test_async_database_url(self, url, expected):
+        """The sync URL is mapped onto its asyncio driver."""
+        settings = Settings(DATABASE_URL=url, DB_HOST="")
+        assert settings.async_database_url == expected
+
+    @pytest.mark.integration
+    def test_health_profile_round_trip(self, client, auth_headers):
+        """Profiles are written and read back through the async session."""
+        response = client.get("/api/v1/health/profile", headers=auth_headers)
+        assert response.status_code == 404
+
+        response = client.post(
+            "/api/v1/health/profile",
+            json={"height": "5'8\"", "allergies": "penicillin"},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+
+        response = client.post(
+            "/api/v1/health/profile", json={"blood_type": "O+"}, headers=auth_headers
+        )
+        assert response.status_code == 200
+
+        response = client.get("/api/v1/health/profile", headers=auth_headers)
+        assert response.status_code == 200
+        profile = response.json()
+        assert profile["allergies"] == "penicillin"
+        assert profile["blood_type"] == "O+"
+
+    @pytest.mark.integration
+    def test_health_metrics_filtering(self, client, auth_headers):
+        """Metrics are listed per type through the async session."""
+        for metric_type, value in (("weight", "150"), ("heart_rate", "72"), ("weight", "149")):
+            response = client.post(
+                "/api/v1/health/metrics",
+                json={"metric_type": metric_type, "value": value},
+                headers=auth_headers,
+            )
+            assert response.status_code == 200
+
+        response = client.get("/api/v1/health/metrics?metric_type=weight", headers=auth_headers)
+        assert response.status_code == 200
+        assert sorted(m["value"] for m in response.json()) == ["149", "150"]
+
+    @pytest.mark.integration
+    def test_decryption_stays_off_the_event_loop(self, client, auth_headers, monkeypatch):
+        """Async routes decrypt on worker threads, never on the loop serving requests."""
+        client.post("/api/v1/health/profile", json={"allergies": "penicillin"}, headers=auth_headers)
+        client.post("/api/v1/health/metrics", json={"metric_type": "weight", "value": "150"}, headers=auth_headers)
+        
+        encryption = get_encryption()
+        decrypt = encryption.decrypt
+        on_loop = []
+        
+        def tracking_decrypt(value):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(value)
+            except RuntimeError:
+                pass
+            return decrypt(value)
+        
+        monkeypatch.setattr(encryption, "decrypt", tracking_decrypt)
+        
+        updated = client.post("/api/v1/health/profile", json={"blood_type": "O+"}, headers=auth_headers)
+        assert updated.json()["allergies"] == "penicillin"
+        assert client.get("/api/v1/health/profile", headers=auth_headers).json()["blood_type"] == "O+"
+        assert client.get("/api/v1/health/metrics", headers=auth_headers).json()[0]["value"] == "150"
+        assert on_loop == []
+
+    @pytest.mark.unit
+    def test_async_routes_require_auth(self, client):
+        """The async user dependency rejects missing credentials."""
+        response = client.get("/api/v1/health/profile")
+        assert response.status_code == 401
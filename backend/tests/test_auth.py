@@ -255,4 +255,39 @@ class TestAuthenticationIntegration:
         data = response.json()
         assert data["user"]["subscription_tier"] == "premium"
         assert data["user"]["consultations_limit"] == 100
-        assert data["user"]["consultations_used"] == 5
\ No newline at end of file
+        assert data["user"]["consultations_used"] == 5
+
+class TestPasswordHashing:
+    """Test the bounded password pool and rehashing at login."""
+    
+    @pytest.mark.unit
+    @pytest.mark.auth
+    def test_login_rehashes_weak_hash(self, client: TestClient, db_session: Session):
+        """A hash below the configured work factor is replaced on successful login."""
+        from passlib.context import CryptContext
+        
+        weak_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("password")
+        db_session.add(User(email="legacy@carebow.com", hashed_password=weak_hash, is_active=True))
+        db_session.commit()
+        
+        response = client.post("/api/v1/auth/login", data={"username": "legacy@carebow.com", "password": "password"})
+        assert response.status_code == 200
+        
+        db_session.expire_all()
+        new_hash = db_session.query(User).filter(User.email == "legacy@carebow.com").one().hashed_password
+        assert new_hash != weak_hash
+        assert new_hash.startswith("$2b$12$")
+    
+    @pytest.mark.unit
+    @pytest.mark.auth
+    def test_saturated_pool_returns_503(self, client: TestClient, test_user, test_user_data, monkeypatch):
+        from app.core import executors
+        
+        monkeypatch.setattr(executors.get_password_executor(), "limit", 0)
+        
+        response = client.post(
+            "/api/v1/auth/login", data={"username": test_user_data["email"], "password": test_user_data["password"]}
+        )
+        
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
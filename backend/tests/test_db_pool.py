@@ -0,0 +1,97 @@
+"""
+Connection pool configuration and metrics tests.
+"""
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.core.config import settings
+from app.db.pool import engine_options, instrument_engine, pool_stats
+
+
+@pytest.fixture
+def pool_settings(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 1)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 0.2)
+    return settings
+
+
+class TestConnectionPool:
+    """Test pool options, SQLite pragmas and pool metrics."""
+    
+    @pytest.mark.unit
+    def test_postgres_engine_options(self, pool_settings, monkeypatch):
+        """Pool sizes and statement timeout come from settings."""
+        monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 15000)
+        options = engine_options("postgresql://carebow@db/carebow")
+        assert options["pool_size"] == 1 and options["max_overflow"] == 1
+        assert options["connect_args"] == {"options": "-c statement_timeout=15000"}
+        
+        options = engine_options("postgresql+asyncpg://carebow@db/carebow", is_async=True)
+        assert options["connect_args"] == {"server_settings": {"statement_timeout": "15000"}}
+        assert options["poolclass"].__name__ == "InstrumentedAsyncQueuePool"
+    
+    @pytest.mark.unit
+    def test_invalid_pre_ping_strategy(self, monkeypatch):
+        """Unknown pre-ping strategies are rejected."""
+        monkeypatch.setattr(settings, "DB_POOL_PRE_PING", "sometimes")
+        with pytest.raises(ValueError):
+            engine_options("sqlite:///./carebow.db")
+    
+    @pytest.mark.unit
+    def test_sqlite_pragmas(self, tmp_path):
+        """File-backed SQLite engines run in WAL mode with a busy timeout."""
+        url = f"sqlite:///{tmp_path / 'pool.db'}"
+        engine = instrument_engine(create_engine(url, **engine_options(url)), "test_pragmas")
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == settings.DB_SQLITE_BUSY_TIMEOUT_MS
+        engine.dispose()
+    
+    @pytest.mark.unit
+    def test_pool_stats_track_checkouts_and_timeouts(self, pool_settings, tmp_path):
+        """Checked-out connections, overflow and timeouts are reported."""
+        url = f"sqlite:///{tmp_path / 'pool.db'}"
+        engine = instrument_engine(create_engine(url, **engine_options(url)), "test_stats")
+        
+        first, second = engine.connect(), engine.connect()
+        stats = pool_stats("test_stats")["test_stats"]
+        assert stats["checked_out"] == 2
+        assert stats["overflow"] == 1
+        
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        
+        first.close()
+        second.close()
+        stats = pool_stats("test_stats")["test_stats"]
+        assert stats["checked_out"] == 0
+        assert stats["checkouts"] == 2
+        assert stats["timeouts"] == 1
+        assert stats["wait_max_ms"] >= 150
+        engine.dispose()
+    
+    @pytest.mark.unit
+    def test_idle_pre_ping_replaces_dead_connections(self, tmp_path, monkeypatch):
+        """With the idle strategy a broken idle connection is swapped for a new one."""
+        monkeypatch.setattr(settings, "DB_POOL_PRE_PING", "idle")
+        monkeypatch.setattr(settings, "DB_POOL_PRE_PING_IDLE_SECONDS", 0)
+        url = f"sqlite:///{tmp_path / 'pool.db'}"
+        engine = instrument_engine(create_engine(url, **engine_options(url)), "test_ping")
+        
+        with engine.connect() as conn:
+            dbapi_connection = conn.connection.dbapi_connection
+        dbapi_connection.close()
+        
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+        assert pool_stats("test_ping")["test_ping"]["invalidations"] == 1
+        engine.dispose()
+    
+    @pytest.mark.unit
+    def test_pool_stats_endpoint(self, client, auth_headers):
+        """Admins can read pool stats for the application engines."""
+        response = client.get("/api/v1/admin/pool-stats", headers=auth_headers)
+        assert response.status_code == 200
+        assert "primary" in response.json()
@@ -0,0 +1,414 @@
+"""
+HIPAA encryption tests for CareBow backend.
+"""
+import base64
+import time
+
+import pytest
+
+from app.core.encryption import HIPAAEncryption, ENVELOPE_PREFIX
+
+MASTER_KEY = "TEST_HIPAA_KEY_32_CHARS_FOR_TESTING_ONLY_123456789"
+
+
+@pytest.fixture
+def encryption():
+    return HIPAAEncryption(master_key=MASTER_KEY, active_key_id=1, envelope=True)
+
+
+class TestEnvelopeEncryption:
+    """Test versioned envelope encryption."""
+    
+    @pytest.mark.unit
+    def test_round_trip(self, encryption):
+        """Envelope ciphertexts decrypt back to the original value."""
+        encrypted = encryption.encrypt("555-123-4567")
+        
+        assert encrypted.startswith(f"{ENVELOPE_PREFIX}1:")
+        assert encryption.decrypt(encrypted) == "555-123-4567"
+    
+    @pytest.mark.unit
+    def test_unique_nonce_per_value(self, encryption):
+        """Encrypting the same value twice yields different ciphertexts."""
+        assert encryption.encrypt("same") != encryption.encrypt("same")
+    
+    @pytest.mark.unit
+    def test_key_id_header(self, encryption):
+        """The key id header tracks the active key version."""
+        first = encryption.encrypt("value")
+        encryption.set_active_key_id(2)
+        second = encryption.encrypt("value")
+        
+        assert HIPAAEncryption.key_id_of(first) == 1
+        assert HIPAAEncryption.key_id_of(second) == 2
+        assert encryption.decrypt(first) == "value"
+        assert encryption.decrypt(second) == "value"
+    
+    @pytest.mark.unit
+    def test_tampered_header_rejected(self, encryption):
+        """The key id is authenticated, so rewriting it fails decryption."""
+        encrypted = encryption.encrypt("value")
+        tampered = encrypted.replace(f"{ENVELOPE_PREFIX}1:", f"{ENVELOPE_PREFIX}2:", 1)
+        
+        with pytest.raises(ValueError):
+            encryption.decrypt(tampered)
+    
+    @pytest.mark.unit
+    def test_wrong_master_key_rejected(self, encryption):
+        """Data keys are bound to the master key."""
+        other = HIPAAEncryption(master_key="X" * 40, envelope=True)
+        
+        with pytest.raises(ValueError):
+            other.decrypt(encryption.encrypt("value"))
+    
+    @pytest.mark.unit
+    def test_legacy_ciphertext_still_decrypts(self, encryption):
+        """Values written in the per-salt format remain readable."""
+        legacy = HIPAAEncryption(master_key=MASTER_KEY, envelope=False)
+        encrypted = legacy.encrypt("legacy value")
+        
+        assert HIPAAEncryption.key_id_of(encrypted) is None
+        base64.b64decode(encrypted)  # plain base64, no envelope header
+        assert encryption.decrypt(encrypted) == "legacy value"
+    
+    @pytest.mark.unit
+    def test_per_field_cost(self, encryption):
+        """Once the data key is cached, a field costs no key derivation."""
+        encryption.decrypt(encryption.encrypt("warm up"))
+        
+        start = time.perf_counter()
+        for _ in range(200):
+            encryption.decrypt(encryption.encrypt("Patient reports mild headache"))
+        elapsed = time.perf_counter() - start
+        
+        # A single PBKDF2 run alone takes tens of milliseconds.
+        assert elapsed < 0.5
+
+
+class TestBatchEncryption:
+    """Test batched encrypt/decrypt and the batch_decrypt ORM hook."""
+    
+    @pytest.mark.unit
+    def test_encrypt_decrypt_many_preserve_order(self, encryption):
+        """Batches keep input order and pass None through."""
+        values = [f"value-{i}" for i in range(150)] + [None]
+        
+        encrypted = encryption.encrypt_many(values)
+        
+        assert encrypted[-1] is None
+        assert encryption.decrypt_many(encrypted) == values
+    
+    @pytest.mark.unit
+    def test_parallel_batch(self, encryption, monkeypatch):
+        """Large batches are spread over the crypto thread pool."""
+        monkeypatch.setenv("HIPAA_CRYPTO_WORKERS", "4")
+        values = [f"value-{i}" for i in range(200)]
+        
+        assert encryption.decrypt_many(encryption.encrypt_many(values)) == values
+    
+    @pytest.mark.unit
+    def test_batch_decrypt_query(self, db_session):
+        """A batch_decrypt query decrypts the whole result set in one call."""
+        from unittest.mock import patch
+        from app.core.encryption import get_encryption
+        from app.models.health import HealthMetric
+        from app.models.user import User
+        
+        user = User(email="batch@carebow.com", hashed_password="x")
+        db_session.add(user)
+        db_session.flush()
+        db_session.add_all([
+            HealthMetric(user_id=user.id, metric_type="weight", value=f"{150 + i}", notes=f"note {i}")
+            for i in range(5)
+        ])
+        db_session.commit()
+        db_session.expunge_all()
+        
+        encryption = get_encryption()
+        with patch.object(encryption, "decrypt_many", wraps=encryption.decrypt_many) as batch:
+            metrics = db_session.query(HealthMetric).order_by(HealthMetric.id).execution_options(
+                batch_decrypt=True
+            ).all()
+            values = db_session.query(HealthMetric.value).order_by(HealthMetric.id).execution_options(
+                batch_decrypt=True
+            ).all()
+        
+        assert [m.value for m in metrics] == [f"{150 + i}" for i in range(5)]
+        assert [m.notes for m in metrics] == [f"note {i}" for i in range(5)]
+        assert [row[0] for row in values] == [f"{150 + i}" for i in range(5)]
+        # One call per query: 5 values + 5 notes, then 5 values
+        assert [len(call.args[0]) for call in batch.call_args_list] == [10, 5]
+
+
+class TestLazyDecryption:
+    """Test lazy decryption of EncryptedString(lazy=True) columns."""
+    
+    @pytest.mark.unit
+    def test_proxy_decrypts_once(self, encryption):
+        """LazyDecrypted decrypts on first access and memoizes the plaintext."""
+        from unittest.mock import patch
+        from app.core.encryption import LazyDecrypted
+        
+        proxy = LazyDecrypted(encryption.encrypt("555-123-4567"), encryption)
+        with patch.object(encryption, "decrypt", wraps=encryption.decrypt) as decrypt:
+            assert not proxy.is_decrypted
+            assert "4567" not in repr(proxy)
+            assert proxy == "555-123-4567"
+            assert hash(proxy) == hash("555-123-4567")
+            assert proxy.endswith("4567")
+        
+        assert proxy.is_decrypted
+        assert decrypt.call_count == 1
+    
+    @pytest.mark.unit
+    def test_derived_strings_are_plain(self, encryption):
+        """Slicing, str methods and concatenation return str, not proxies."""
+        from app.core.encryption import LazyDecrypted
+        
+        proxy = LazyDecrypted(encryption.encrypt(" Female "), encryption)
+        derived = [proxy.strip(), proxy.upper(), proxy[1:3], proxy + "!", "?" + proxy, proxy * 2]
+        assert derived == ["Female", " FEMALE ", "Fe", " Female !", "? Female ", " Female  Female "]
+        assert all(type(value) is str for value in derived)
+    
+    @pytest.mark.unit
+    def test_lazy_column_serializes(self, db_session):
+        """Lazy columns serialize as JSON and validate as pydantic str fields."""
+        import json
+        from pydantic import BaseModel
+        from app.models.user import User
+        
+        class Profile(BaseModel):
+            phone: str
+            gender: str
+        
+        db_session.add(User(email="json@carebow.com", hashed_password="x", phone="555-123-4567", gender="male"))
+        db_session.commit()
+        db_session.expunge_all()
+        
+        user = db_session.query(User).filter(User.email == "json@carebow.com").one()
+        assert json.loads(json.dumps({"phone": user.phone})) == {"phone": "555-123-4567"}
+        assert Profile(phone=user.phone, gender=user.gender).gender == "male"
+        
+        # Column-only selects have no instance to defer to and return str
+        phone, gender = db_session.query(User.phone, User.gender).filter(User.email == "json@carebow.com").one()
+        assert (type(phone), type(gender)) == (str, str)
+        assert Profile(phone=phone, gender=gender).model_dump_json() == '{"phone":"555-123-4567","gender":"male"}'
+    
+    @pytest.mark.unit
+    def test_lazy_column_decrypted_on_access(self, db_session):
+        """Lazy User columns are not decrypted until the attribute is read."""
+        from unittest.mock import patch
+        from app.core.encryption import get_encryption
+        from app.models.user import User
+        
+        user = User(email="lazy@carebow.com", hashed_password="x", phone="555-123-4567", gender="female")
+        db_session.add(user)
+        db_session.commit()
+        db_session.expunge_all()
+        
+        encryption = get_encryption()
+        with patch.object(encryption, "decrypt", wraps=encryption.decrypt) as decrypt:
+            user = db_session.query(User).filter(User.email == "lazy@carebow.com").one()
+            assert decrypt.call_count == 0
+            
+            phone = user.phone
+            assert type(phone) is str
+            assert phone == "555-123-4567"
+            assert user.phone is phone
+            assert decrypt.call_count == 1
+        
+        # Unread lazy values are not rewritten on flush
+        user.full_name = "Lazy User"
+        db_session.commit()
+        db_session.expunge_all()
+        assert db_session.query(User).filter(User.email == "lazy@carebow.com").one().gender == "female"
+
+
+class TestPlaintextCache:
+    """Test the opt-in plaintext cache."""
+    
+    @pytest.fixture
+    def cached_encryption(self):
+        from app.core.encryption import PlaintextCache
+        return HIPAAEncryption(
+            master_key=MASTER_KEY,
+            active_key_id=1,
+            envelope=True,
+            plaintext_cache=PlaintextCache(max_bytes=64, max_entry_bytes=32, ttl_seconds=60),
+        )
+    
+    @pytest.mark.unit
+    def test_disabled_by_default(self, monkeypatch):
+        """The cache is opt-in."""
+        monkeypatch.delenv("HIPAA_PLAINTEXT_CACHE", raising=False)
+        
+        assert HIPAAEncryption(master_key=MASTER_KEY).plaintext_cache is None
+    
+    @pytest.mark.unit
+    def test_repeated_decrypt_hits_cache(self, cached_encryption):
+        """A second decrypt of the same ciphertext skips AES."""
+        from unittest.mock import patch
+        
+        encrypted = cached_encryption.encrypt("555-123-4567")
+        with patch.object(cached_encryption, "_decrypt_uncached", wraps=cached_encryption._decrypt_uncached) as aes:
+            assert cached_encryption.decrypt(encrypted) == "555-123-4567"
+            assert cached_encryption.decrypt(encrypted) == "555-123-4567"
+        
+        assert aes.call_count == 1
+        stats = cached_encryption.plaintext_cache.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+    
+    @pytest.mark.unit
+    def test_byte_limits(self, cached_encryption):
+        """Oversized entries are skipped and the total size stays bounded."""
+        cache = cached_encryption.plaintext_cache
+        cached_encryption.decrypt(cached_encryption.encrypt("x" * 33))
+        assert cache.stats()["entries"] == 0
+        
+        for i in range(5):
+            cached_encryption.decrypt(cached_encryption.encrypt(f"{i}" * 20))
+        
+        stats = cache.stats()
+        assert stats["bytes"] <= 64
+        assert stats["entries"] == 3
+        assert stats["evictions"] == 2
+    
+    @pytest.mark.unit
+    def test_expired_entries_are_overwritten(self, monkeypatch):
+        """Expired entries are evicted and their buffers zeroed."""
+        from app.core import encryption as encryption_module
+        from app.core.encryption import PlaintextCache
+        
+        cache = PlaintextCache(ttl_seconds=10)
+        cache.put("ciphertext", "secret")
+        buffer, _ = next(iter(cache._entries.values()))
+        
+        now = time.monotonic()
+        monkeypatch.setattr(encryption_module.time, "monotonic", lambda: now + 11)
+        
+        assert cache.get("ciphertext") is None
+        assert buffer == bytearray(6)
+        assert cache.stats()["entries"] == 0
+
+
+class TestBlindIndex:
+    """Test blind index lookups on encrypted columns."""
+    
+    @pytest.mark.unit
+    def test_blind_index_is_deterministic_per_scope(self, encryption):
+        """The same value always yields the same tag, but scopes use separate keys."""
+        tag = encryption.blind_index("5551234567", "phone")
+        
+        assert tag == encryption.blind_index("5551234567", "phone")
+        assert tag != encryption.blind_index("5551234567", "email")
+        assert len(tag) == 32
+        assert "5551234567" not in tag
+    
+    @pytest.mark.unit
+    def test_lookup_by_encrypted_phone(self, db_session):
+        """Users can be found by phone through the indexed blind index column."""
+        from app.models.user import User, blind_index_match
+        
+        user = User(email="bidx@carebow.com", hashed_password="x", phone="(555) 123-4567")
+        db_session.add(user)
+        db_session.commit()
+        
+        assert db_session.query(User).filter(User.phone_index == "555-123-4567").one().id == user.id
+        assert db_session.query(User).filter(blind_index_match(User.phone_index, "5551234567")).one().id == user.id
+        
+        user.phone = "555-000-0000"
+        db_session.commit()
+        assert db_session.query(User).filter(User.phone_index == "555-123-4567").first() is None
+        assert db_session.query(User).filter(User.phone_index == "5550000000").one().id == user.id
+        
+        user.phone = None
+        db_session.commit()
+        assert user.phone_index is None
+    
+    @pytest.mark.unit
+    def test_lookup_providers_and_caregivers(self, db_session):
+        """Providers and caregivers can be found by encrypted email and phone."""
+        from app.models.symptom_sessions import Caregiver, Provider
+        
+        provider = Provider(name="Dr. Bidx", specialty="Family medicine", license_number="BIDX-1",
+                            email="Dr.Bidx@Clinic.com", phone="(555) 222-3333")
+        caregiver = Caregiver(name="Bidx Care", email="care@bidx.com", phone="555.444.5555")
+        db_session.add_all([provider, caregiver])
+        db_session.commit()
+        
+        assert db_session.query(Provider).filter(Provider.email_index == "dr.bidx@clinic.com").one().id == provider.id
+        assert db_session.query(Provider).filter(Provider.phone_index == "5552223333").one().id == provider.id
+        assert db_session.query(Caregiver).filter(Caregiver.email_index == " CARE@bidx.com").one().id == caregiver.id
+        assert db_session.query(Caregiver).filter(Caregiver.phone_index == "555-444-5555").one().id == caregiver.id
+        
+        caregiver.phone = "555-666-7777"
+        db_session.commit()
+        assert db_session.query(Caregiver).filter(Caregiver.phone_index == "5554445555").first() is None
+
+
+class TestBinaryEncryption:
+    """Test binary envelopes for EncryptedBinary columns."""
+    
+    @pytest.mark.unit
+    def test_binary_round_trip(self, encryption):
+        """Binary envelopes decrypt back and carry the key id in their header."""
+        encrypted = encryption.encrypt_bytes("short message")
+        
+        assert isinstance(encrypted, bytes)
+        assert encryption.key_id_of(encrypted) == 1
+        assert encryption.decrypt(encrypted) == "short message"
+        # 6-byte header + 12-byte nonce + 16-byte tag, no base64 inflation
+        assert len(encrypted) == len("short message") + 34
+    
+    @pytest.mark.unit
+    def test_long_values_are_compressed(self, encryption):
+        """Compression shrinks long repetitive plaintexts before encryption."""
+        message = "Drink warm ginger tea twice a day. " * 50
+        
+        compressed = encryption.encrypt_bytes(message, compress=True)
+        plain = encryption.encrypt_bytes(message)
+        
+        assert len(compressed) < len(plain) / 4
+        assert encryption.decrypt(compressed) == message
+        assert encryption.decrypt(encryption.reencrypt(compressed, 2)) == message
+    
+    @pytest.mark.unit
+    def test_tampered_binary_header_rejected(self, encryption):
+        """Flipping the flags byte breaks authentication."""
+        encrypted = bytearray(encryption.encrypt_bytes("value"))
+        encrypted[5] ^= 0x01
+        
+        with pytest.raises(ValueError):
+            encryption.decrypt(bytes(encrypted))
+    
+    @pytest.mark.unit
+    def test_chat_message_content_stored_as_binary(self):
+        """ChatMessage.content is stored as bytes and decrypts in batch queries."""
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.orm import Session
+        from app.db.base_class import Base
+        from app.models.enhanced_chat import ChatMessage, ChatSession
+        from app.models.user import User
+        
+        # The enhanced chat tables are not part of the shared test database
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[User.__table__, ChatSession.__table__, ChatMessage.__table__])
+        db_session = Session(engine)
+        
+        user = User(email="binary@carebow.com", hashed_password="x")
+        db_session.add(user)
+        db_session.flush()
+        db_session.add(ChatSession(id="s1", user_id=user.id))
+        db_session.add_all([
+            ChatMessage(id=f"m{i}", session_id="s1", role="user", content="How do I sleep better? " * 40)
+            for i in range(3)
+        ])
+        db_session.commit()
+        db_session.expunge_all()
+        
+        raw = db_session.execute(text("SELECT content FROM chat_messages")).scalars().all()
+        assert all(isinstance(value, bytes) and len(value) < 200 for value in raw)
+        
+        messages = db_session.query(ChatMessage).execution_options(batch_decrypt=True).all()
+        assert [m.content for m in messages] == ["How do I sleep better? " * 40] * 3
+        db_session.close()
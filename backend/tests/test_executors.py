@@ -0,0 +1,138 @@
+"""
+Executor tests for blocking work in async endpoints.
+"""
+import asyncio
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+
+import pytest
+
+from app.core import executors
+from app.core.executors import BoundedExecutor, ExecutorBusy, RequestExecutor, run_blocking, run_crypto, run_io, run_state_store
+from app.core.state_store import MemoryStateStore, SharedMemoryStateStore
+from app.services.enhanced_ai_service import EnhancedAIService
+
+request_id: ContextVar[str] = ContextVar("request_id", default="")
+
+
+class TestExecutors:
+    """Test the crypto and DB thread pools."""
+    
+    @pytest.mark.unit
+    def test_blocking_calls_leave_the_event_loop(self):
+        """Blocking and crypto calls run on their own pools with the caller's context."""
+        async def main():
+            request_id.set("req-1")
+            loop_thread = threading.current_thread().name
+            db_thread = await run_blocking(lambda: (threading.current_thread().name, request_id.get()))
+            crypto_thread = await run_crypto(lambda: threading.current_thread().name)
+            return loop_thread, db_thread, crypto_thread
+        
+        loop_thread, (db_thread, seen_id), crypto_thread = asyncio.run(main())
+        
+        assert db_thread.startswith("db-blocking") and db_thread != loop_thread
+        assert crypto_thread.startswith("hipaa-crypto")
+        assert seen_id == "req-1"
+    
+    @pytest.mark.unit
+    def test_event_loop_stays_responsive(self):
+        """Other coroutines keep running while a blocking call is in flight."""
+        async def main():
+            ticks = []
+            
+            async def ticker():
+                for _ in range(5):
+                    ticks.append(time.monotonic())
+                    await asyncio.sleep(0.01)
+            
+            await asyncio.gather(run_blocking(time.sleep, 0.1), ticker())
+            return ticks
+        
+        ticks = asyncio.run(main())
+        assert len(ticks) == 5
+        assert ticks[-1] - ticks[0] < 0.1
+    
+    @pytest.mark.unit
+    def test_shared_state_store_calls_leave_the_event_loop(self, monkeypatch, tmp_path):
+        """Only the in-process store is called on the event loop."""
+        current_thread = lambda: threading.current_thread().name
+        loop_thread = threading.current_thread().name
+        
+        monkeypatch.setattr(executors, "get_state_store", MemoryStateStore)
+        assert asyncio.run(run_state_store(current_thread)) == loop_thread
+        
+        monkeypatch.setattr(executors, "get_state_store", lambda: SharedMemoryStateStore(str(tmp_path / "state.db")))
+        assert asyncio.run(run_state_store(current_thread)).startswith("db-blocking")
+    
+    @pytest.mark.unit
+    def test_session_calls_are_serialized(self, db_session):
+        """Concurrent run_db calls on one request never overlap."""
+        active = []
+        overlaps = []
+        
+        def work(db):
+            active.append(1)
+            overlaps.append(len(active))
+            time.sleep(0.01)
+            active.pop()
+        
+        async def main():
+            executor = RequestExecutor(db_session)
+            await asyncio.gather(*(executor.run_db(work) for _ in range(5)))
+        
+        asyncio.run(main())
+        assert overlaps == [1] * 5
+    
+    @pytest.mark.unit
+    def test_bounded_executor_sheds_excess_work(self):
+        """Calls beyond the limit fail fast instead of queueing."""
+        bounded = BoundedExecutor(ThreadPoolExecutor(max_workers=1), limit=2)
+        
+        async def main():
+            return await asyncio.gather(
+                *(bounded.run(time.sleep, 0.05) for _ in range(3)), return_exceptions=True
+            )
+        
+        results = asyncio.run(main())
+        assert [type(r) for r in results].count(ExecutorBusy) == 1
+        assert bounded.pending == 0
+    
+    @pytest.mark.unit
+    def test_ai_replies_leave_the_event_loop(self):
+        """process_message makes the synchronous OpenAI call on the I/O pool."""
+        calls = []
+        
+        def create(**kwargs):
+            calls.append((threading.current_thread().name, kwargs["messages"]))
+            message = types.SimpleNamespace(content="Rest and drink water.")
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+        
+        client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+        history = [{"role": "user", "content": "I have a headache"}, {"role": "assistant", "content": "Since when?"}]
+        
+        result = asyncio.run(EnhancedAIService(client).process_message("Since this morning", history=history))
+        
+        (thread, messages), = calls
+        assert thread.startswith("network-io")
+        assert messages[1:] == history + [{"role": "user", "content": "Since this morning"}]
+        assert result["response"] == "Rest and drink water."
+        assert result["analysis"]["urgency_level"] == "self_care"
+    
+    @pytest.mark.unit
+    def test_network_calls_do_not_occupy_db_threads(self, monkeypatch):
+        """Slow network calls run on the I/O pool and leave every DB thread free."""
+        monkeypatch.setattr(executors, "_db_executor", ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-blocking"))
+        release = threading.Event()
+        
+        async def scenario():
+            slow = [asyncio.ensure_future(run_io(release.wait, 5)) for _ in range(4)]
+            db_thread = await asyncio.wait_for(run_blocking(lambda: threading.current_thread().name), 1)
+            release.set()
+            await asyncio.gather(*slow)
+            return db_thread
+        
+        assert asyncio.run(scenario()).startswith("db-blocking")
+        assert executors.io_worker_count() >= executors.settings.LLM_MAX_CONCURRENCY
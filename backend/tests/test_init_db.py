@@ -0,0 +1,116 @@
+"""
+Startup migration check tests.
+"""
+import threading
+
+import pytest
+from alembic import command
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+
+from app.db import init_db as init_db_module
+from app.db.init_db import _alembic_config, _current_revisions, init_db, migration_lock
+
+
+@pytest.fixture
+def fresh_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'boot.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _heads():
+    return set(ScriptDirectory.from_config(_alembic_config()).get_heads())
+
+
+class TestInitDb:
+    """Test the in-process revision check, fresh databases and locking."""
+
+    @pytest.mark.unit
+    def test_fresh_database_is_created_and_stamped(self, fresh_engine):
+        timings = init_db(fresh_engine)
+
+        assert {"revision_check", "lock_wait", "create_all", "stamp"} <= set(timings)
+        with fresh_engine.connect() as conn:
+            assert _current_revisions(conn) == _heads()
+            assert {"users", "chat_sessions", "reencryption_checkpoints"} <= set(inspect(conn).get_table_names())
+
+    @pytest.mark.unit
+    def test_up_to_date_database_skips_migrations(self, fresh_engine, monkeypatch):
+        """A database at head costs one revision check and never touches Alembic commands."""
+        init_db(fresh_engine)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("migration run on an up-to-date database")
+        monkeypatch.setattr(command, "upgrade", fail)
+        monkeypatch.setattr(command, "stamp", fail)
+
+        assert list(init_db(fresh_engine)) == ["revision_check"]
+
+    @pytest.mark.unit
+    def test_outdated_database_is_upgraded(self, fresh_engine, monkeypatch):
+        init_db(fresh_engine)
+        with fresh_engine.begin() as conn:
+            conn.execute(text("UPDATE alembic_version SET version_num = 'binary_ciphertext_001'"))
+        upgrades = []
+        monkeypatch.setattr(command, "upgrade", lambda config, revision: upgrades.append(revision))
+
+        timings = init_db(fresh_engine)
+
+        assert upgrades == ["head"]
+        assert "upgrade" in timings
+
+    @pytest.mark.unit
+    def test_failed_upgrade_raises_in_production(self, fresh_engine, monkeypatch):
+        init_db(fresh_engine)
+        with fresh_engine.begin() as conn:
+            conn.execute(text("UPDATE alembic_version SET version_num = 'binary_ciphertext_001'"))
+
+        def broken(config, revision):
+            raise RuntimeError("migration failed")
+        monkeypatch.setattr(command, "upgrade", broken)
+        monkeypatch.setattr(init_db_module.settings, "ENVIRONMENT", "production")
+
+        with pytest.raises(RuntimeError):
+            init_db(fresh_engine)
+
+    @pytest.mark.unit
+    def test_concurrent_workers_migrate_once(self, fresh_engine, monkeypatch):
+        """Workers booting together serialize on the lock file; only the first builds the schema."""
+        stamps = []
+        real_stamp = command.stamp
+
+        def counting_stamp(config, revision):
+            stamps.append(revision)
+            real_stamp(config, revision)
+        monkeypatch.setattr(command, "stamp", counting_stamp)
+
+        errors = []
+
+        def boot():
+            try:
+                init_db(fresh_engine)
+            except Exception as e:
+                errors.append(e)
+
+        workers = [threading.Thread(target=boot) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert errors == []
+        assert stamps == ["head"]
+
+    @pytest.mark.unit
+    def test_lock_file_blocks_second_holder(self, fresh_engine):
+        acquired = threading.Event()
+        with fresh_engine.connect() as conn, migration_lock(conn):
+            def contender():
+                with fresh_engine.connect() as other, migration_lock(other):
+                    acquired.set()
+            thread = threading.Thread(target=contender)
+            thread.start()
+            assert not acquired.wait(0.2)
+        thread.join(2)
+        assert acquired.is_set()
@@ -0,0 +1,114 @@
+"""
+Key rotation and re-encryption tests for CareBow backend.
+"""
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import text
+
+from app.core.encryption import get_encryption
+from app.models.health import HealthMetric
+from app.models.key_rotation import ReencryptionCheckpoint
+from app.models.user import User
+from app.services.reencryption import ReencryptionEngine
+
+
+@pytest.fixture
+def encrypted_rows(db_session):
+    """A user and five health metrics encrypted under key version 1."""
+    user = User(email="rotate@carebow.com", hashed_password="x", phone="555-123-4567")
+    db_session.add(user)
+    db_session.flush()
+    db_session.add_all([
+        HealthMetric(user_id=user.id, metric_type="weight", value=f"{150 + i}", notes=None)
+        for i in range(5)
+    ])
+    db_session.commit()
+    return user
+
+
+def raw_values(db_session, table, column):
+    return [row[0] for row in db_session.execute(text(f"SELECT {column} FROM {table} ORDER BY id"))]
+
+
+class TestReencryptionEngine:
+    """Test the background re-encryption engine."""
+    
+    @pytest.mark.unit
+    def test_reencrypts_to_target_key(self, db_session, encrypted_rows):
+        """All encrypted values move to the target key version and still decrypt."""
+        encryption = get_encryption()
+        
+        results = ReencryptionEngine(db_session, rows_per_second=0).run(
+            target_key_id=2, tables=["users", "health_metrics"]
+        )
+        
+        assert results == {"users": 1, "health_metrics": 5}
+        values = raw_values(db_session, "health_metrics", "value")
+        assert {encryption.key_id_of(v) for v in values} == {2}
+        assert [encryption.decrypt(v) for v in values] == [f"{150 + i}" for i in range(5)]
+        assert raw_values(db_session, "health_metrics", "notes") == [None] * 5
+        assert encryption.key_id_of(raw_values(db_session, "users", "phone")[0]) == 2
+        
+        checkpoint = db_session.query(ReencryptionCheckpoint).filter_by(table_name="health_metrics").one()
+        assert checkpoint.completed_at is not None
+        assert (checkpoint.rows_scanned, checkpoint.rows_reencrypted) == (5, 5)
+    
+    @pytest.mark.unit
+    def test_resumes_from_checkpoint(self, db_session, encrypted_rows):
+        """An interrupted run resumes after the last committed batch."""
+        encryption = get_encryption()
+        engine = ReencryptionEngine(db_session, batch_size=2, rows_per_second=0)
+        original = encryption.reencrypt_many
+        calls = []
+        
+        def fail_on_second_batch(values, key_id=None):
+            calls.append(len(values))
+            if len(calls) == 2:
+                raise RuntimeError("interrupted")
+            return original(values, key_id)
+        
+        with patch.object(encryption, "reencrypt_many", side_effect=fail_on_second_batch):
+            with pytest.raises(RuntimeError):
+                engine.run(target_key_id=2, tables=["health_metrics"])
+        db_session.rollback()
+        
+        checkpoint = db_session.query(ReencryptionCheckpoint).filter_by(table_name="health_metrics").one()
+        assert checkpoint.rows_scanned == 2
+        
+        with patch.object(encryption, "reencrypt_many", wraps=original) as batches:
+            ReencryptionEngine(db_session, batch_size=2, rows_per_second=0).run(
+                target_key_id=2, tables=["health_metrics"]
+            )
+        
+        assert [len(call.args[0]) for call in batches.call_args_list] == [2, 1]
+        assert {encryption.key_id_of(v) for v in raw_values(db_session, "health_metrics", "value")} == {2}
+    
+    @pytest.mark.unit
+    def test_concurrent_write_is_not_overwritten(self, db_session, encrypted_rows):
+        """A value rewritten while its batch is in flight keeps the new value."""
+        encryption = get_encryption()
+        original = encryption.reencrypt_many
+        
+        def write_during_batch(values, key_id=None):
+            metric = db_session.query(HealthMetric).order_by(HealthMetric.id).first()
+            metric.value = "999"
+            db_session.flush()
+            return original(values, key_id)
+        
+        with patch.object(encryption, "reencrypt_many", side_effect=write_during_batch):
+            ReencryptionEngine(db_session, rows_per_second=0).run(target_key_id=2, tables=["health_metrics"])
+        
+        first = raw_values(db_session, "health_metrics", "value")[0]
+        assert encryption.decrypt(first) == "999"
+    
+    @pytest.mark.unit
+    def test_throttles_to_rows_per_second(self, db_session, encrypted_rows):
+        """Batches are spaced out to respect rows_per_second."""
+        sleeps = []
+        ReencryptionEngine(db_session, batch_size=5, rows_per_second=10, sleep=sleeps.append).run(
+            target_key_id=2, tables=["health_metrics"]
+        )
+        
+        assert len(sleeps) == 1
+        assert 0.3 < sleeps[0] <= 0.5
@@ -0,0 +1,59 @@
+"""
+MFA backup-code tests.
+"""
+import hashlib
+
+import pytest
+
+from app.core import mfa
+from app.core.mfa import hash_mfa_backup_codes, mfa_manager, verify_mfa_backup_code
+
+
+@pytest.fixture
+def kdf_calls(monkeypatch):
+    """Count PBKDF2 runs, at a low iteration count to keep the tests fast."""
+    monkeypatch.setattr(mfa, "BACKUP_CODE_KDF_ITERATIONS", 1000)
+    calls = []
+    pbkdf2_hmac = hashlib.pbkdf2_hmac
+
+    def counting(*args, **kwargs):
+        calls.append(1)
+        return pbkdf2_hmac(*args, **kwargs)
+
+    monkeypatch.setattr(hashlib, "pbkdf2_hmac", counting)
+    return calls
+
+
+class TestBackupCodes:
+    """Test salted backup-code storage and single-KDF verification."""
+
+    @pytest.mark.unit
+    def test_codes_have_distinct_lookups_and_salts(self, kdf_calls):
+        codes = mfa_manager.generate_backup_codes()
+        stored = hash_mfa_backup_codes(codes)
+
+        assert len({mfa_manager.backup_code_lookup(code) for code in codes}) == len(codes)
+        assert len({h.split("$")[1] for h in stored}) == len(codes)
+        assert mfa_manager.hash_backup_code(codes[0]) != stored[0]
+
+    @pytest.mark.unit
+    def test_verification_costs_one_kdf(self, kdf_calls):
+        codes = mfa_manager.generate_backup_codes()
+        stored = hash_mfa_backup_codes(codes)
+
+        kdf_calls.clear()
+        assert mfa_manager.find_backup_code(codes[5], stored) == 5
+        assert len(kdf_calls) == 1
+
+        kdf_calls.clear()
+        assert not verify_mfa_backup_code("00000000", stored)
+        assert len(kdf_calls) == 1
+
+    @pytest.mark.unit
+    def test_code_format_is_forgiving(self, kdf_calls):
+        stored = hash_mfa_backup_codes(["ABCD1234"])
+        assert verify_mfa_backup_code(" abcd-1234 ", stored)
+
+    @pytest.mark.unit
+    def test_unreadable_hashes_never_match(self, kdf_calls):
+        assert not verify_mfa_backup_code("ABCD1234", ["legacy-unsalted-hash", "a$zz$00"])
@@ -0,0 +1,90 @@
+"""
+Keyset (cursor) pagination tests.
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+from app.db.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+def _walk(client, url, headers, limit):
+    """Follow X-Next-Cursor from the first page to the last."""
+    items, cursor = [], None
+    while True:
+        separator = "&" if "?" in url else "?"
+        page_url = f"{url}{separator}limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(page_url, headers=headers)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= limit
+        items += page
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return items
+
+
+class TestPagination:
+    """Test cursor encoding and cursor-paged list endpoints."""
+
+    @pytest.mark.unit
+    def test_cursor_round_trip(self):
+        naive = datetime(2026, 10, 18, 12, 30, 0, 123456)
+        aware = naive.replace(tzinfo=timezone.utc)
+        assert decode_cursor(encode_cursor(naive, 42)) == (naive, 42)
+        assert decode_cursor(encode_cursor(aware, "a-b")) == (aware, "a-b")
+        assert "=" not in encode_cursor(naive, 1)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("cursor", ["not-base64!", "bnVsbA", encode_cursor(None, 1)[:-2], "WyJ4IiwgMV0"])
+    def test_malformed_cursor_is_rejected(self, cursor):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(cursor)
+
+    @pytest.mark.integration
+    def test_invalid_cursor_returns_400(self, client, auth_headers):
+        response = client.get("/api/v1/health/metrics?cursor=garbage", headers=auth_headers)
+        assert response.status_code == 400
+
+    @pytest.mark.integration
+    def test_health_metrics_cursor_pages(self, client, auth_headers):
+        """Metrics recorded in the same second are neither skipped nor repeated across pages."""
+        for i in range(7):
+            response = client.post(
+                "/api/v1/health/metrics", json={"metric_type": "weight", "value": str(150 + i)}, headers=auth_headers
+            )
+            assert response.status_code == 200
+
+        paged = _walk(client, "/api/v1/health/metrics", auth_headers, limit=3)
+        everything = client.get("/api/v1/health/metrics?limit=50", headers=auth_headers).json()
+
+        assert [m["id"] for m in paged] == [m["id"] for m in everything]
+        assert len({m["id"] for m in paged}) == 7
+
+    @pytest.mark.integration
+    def test_offset_still_supported(self, client, auth_headers):
+        for i in range(4):
+            client.post("/api/v1/health/metrics", json={"metric_type": "pulse", "value": str(i)}, headers=auth_headers)
+
+        everything = client.get("/api/v1/health/metrics", headers=auth_headers).json()
+        response = client.get("/api/v1/health/metrics?skip=1&limit=2", headers=auth_headers)
+
+        assert [m["id"] for m in response.json()] == [m["id"] for m in everything[1:3]]
+        assert response.headers["X-Next-Cursor"]
+
+    @pytest.mark.integration
+    def test_conversation_messages_cursor_pages(self, client, auth_headers):
+        """Messages page oldest first."""
+        conversation = client.post(
+            "/api/v1/conversations/", json={"profile_id": "self"}, headers=auth_headers
+        ).json()
+        url = f"/api/v1/conversations/{conversation['id']}/messages"
+        for i in range(5):
+            response = client.post(
+                url, json={"role": "user", "modality": "text", "content_text": f"message {i}"}, headers=auth_headers
+            )
+            assert response.status_code == 200
+
+        paged = _walk(client, url, auth_headers, limit=2)
+
+        assert [m["content_text"] for m in paged] == [f"message {i}" for i in range(5)]
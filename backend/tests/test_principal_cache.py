@@ -0,0 +1,146 @@
+"""
+Authenticated-principal cache tests.
+"""
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.api.api_v1.endpoints import ai
+from app.db.principal_cache import (
+    MemoryPrincipalCache, Principal, RedisPrincipalCache, get_principal, principal_cache,
+)
+from app.models.user import SubscriptionTier, User
+
+
+def _principal(user_id: int = 1, **changes) -> Principal:
+    fields = dict(id=user_id, is_active=True, subscription_tier="free", subscription_active=False,
+                  consultations_used=0, consultations_limit=3)
+    return Principal(**{**fields, **changes})
+
+
+@pytest.fixture
+def user_selects():
+    """Statements against the users table, from any engine."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(Engine, "before_cursor_execute", record)
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+
+class _DownRedis:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError("redis is down")
+        return fail
+
+
+class TestPrincipalCache:
+    """Test the cache backends and the zero-query authenticated path."""
+
+    @pytest.mark.unit
+    def test_memory_cache_expires_and_evicts(self, monkeypatch):
+        cache = MemoryPrincipalCache(ttl=30, size=2)
+        for user_id in (1, 2, 3):
+            cache.set(_principal(user_id))
+
+        assert cache.get(1) is None  # least recently used
+        assert cache.get(3).id == 3
+
+        monkeypatch.setattr("app.db.principal_cache.time.monotonic", lambda: float("inf"))
+        assert cache.get(3) is None
+
+    @pytest.mark.unit
+    def test_redis_cache_round_trip_and_outage(self):
+        cache = RedisPrincipalCache(ttl=30, client=_FakeRedis())
+        cache.set(_principal(7, subscription_tier="premium"))
+        assert cache.get(7) == _principal(7, subscription_tier="premium")
+        cache.invalidate([7])
+        assert cache.get(7) is None
+
+        down = RedisPrincipalCache(ttl=30, client=_DownRedis())
+        down.set(_principal(7))
+        assert down.get(7) is None
+
+    @pytest.mark.integration
+    def test_cached_user_needs_no_query(self, client, auth_headers, user_selects):
+        client.get("/api/v1/conversations/", headers=auth_headers)
+        client.get("/api/v1/health/metrics", headers=auth_headers)
+        user_selects.clear()
+
+        assert client.get("/api/v1/conversations/", headers=auth_headers).status_code == 200
+        assert client.get("/api/v1/health/metrics", headers=auth_headers).status_code == 200
+        assert user_selects == []
+
+        # Attributes outside the principal still load on demand
+        response = client.get("/api/v1/users/me", headers=auth_headers)
+        assert response.json()["email"].startswith("testuser+")
+        assert len(user_selects) == 1
+
+    @pytest.mark.integration
+    def test_committed_user_writes_invalidate(self, client, auth_headers, db_session):
+        """Webhook-style tier changes and deactivation apply to the next request."""
+        assert client.get("/api/v1/users/me", headers=auth_headers).json()["subscription_tier"] == "free"
+
+        user = db_session.query(User).one()
+        user.subscription_tier = SubscriptionTier.PREMIUM
+        user.consultations_limit = 100
+        db_session.commit()
+
+        me = client.get("/api/v1/users/me", headers=auth_headers).json()
+        assert (me["subscription_tier"], me["consultations_limit"]) == ("premium", 100)
+
+        user.is_active = False
+        db_session.commit()
+
+        assert client.get("/api/v1/users/me", headers=auth_headers).status_code == 401
+
+    @pytest.mark.integration
+    def test_bulk_user_updates_invalidate(self, client, auth_headers, db_session):
+        user_id = client.get("/api/v1/users/me", headers=auth_headers).json()["id"]
+
+        db_session.query(User).filter(User.id == user_id).update({User.consultations_limit: 50})
+        db_session.commit()
+        assert client.get("/api/v1/users/me", headers=auth_headers).json()["consultations_limit"] == 50
+
+        # Without an id in the WHERE clause every entry goes
+        db_session.query(User).update({User.consultations_limit: 60})
+        db_session.commit()
+        assert client.get("/api/v1/users/me", headers=auth_headers).json()["consultations_limit"] == 60
+
+    @pytest.mark.integration
+    def test_consultation_quota_ignores_stale_cache(self, client, auth_headers, db_session, monkeypatch):
+        """A worker whose cached counters lag the row still enforces the quota."""
+        monkeypatch.setattr(ai, "client", None)
+        consultation = {"symptoms": "headache", "consultation_type": "general_health"}
+        user_id = client.get("/api/v1/users/me", headers=auth_headers).json()["id"]
+
+        # Another worker used up the quota; this one still caches the old counters
+        stale = get_principal(user_id)
+        db_session.query(User).filter(User.id == user_id).update({User.consultations_used: 3})
+        db_session.commit()
+        principal_cache.set(stale)
+
+        response = client.post("/api/v1/ai/consultation", json=consultation, headers=auth_headers)
+        assert response.status_code == 403
+        assert "(3/3 used)" in response.json()["detail"]
+        assert db_session.query(User.consultations_used).scalar() == 3
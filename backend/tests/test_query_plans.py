@@ -0,0 +1,151 @@
+"""
+Query plan regression tests for hot queries.
+
+Each query mirrors an endpoint's filter/sort and must be served by an
+index. SQLite always runs; Postgres runs when TEST_POSTGRES_URL is set.
+"""
+import os
+import re
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, desc, select, text
+
+from app.db.base import Base
+from app.db.pagination import paginate
+from app.models.content import BlogPost
+from app.models.conversations import Conversation, Message
+from app.models.enhanced_chat import ChatMessage, ChatSession, ConversationMemory, DataExport
+from app.models.health import AuditLog, Consultation, HealthMetric
+from app.models.user import User
+
+
+CURSOR = (datetime(2026, 1, 1), 100)
+
+# name -> (table, statement factory, ORDER BY served by the index).
+# symptom_answers is left out: importing app.models.symptom_sessions fails
+# part-way (duplicate audit_logs) and leaves broken mappers behind.
+HOT_QUERIES = {
+    "chat_messages_by_session": ("chat_messages", lambda: (
+        select(ChatMessage).where(ChatMessage.session_id == "s1").order_by(ChatMessage.created_at.asc())
+    ), True),
+    "chat_sessions_by_user": ("chat_sessions", lambda: (
+        select(ChatSession).where(ChatSession.user_id == 1).order_by(ChatSession.last_activity.desc()).limit(20)
+    ), True),
+    "health_metrics_by_user": ("health_metrics", lambda: (
+        select(HealthMetric).where(HealthMetric.user_id == 1).order_by(HealthMetric.recorded_at.desc()).limit(50)
+    ), True),
+    "health_metrics_by_user_and_type": ("health_metrics", lambda: (
+        select(HealthMetric).where(HealthMetric.user_id == 1, HealthMetric.metric_type == "weight")
+        .order_by(HealthMetric.recorded_at.desc()).limit(50)
+    ), True),
+    "consultations_by_user": ("consultations", lambda: (
+        select(Consultation).where(Consultation.user_id == 1).order_by(Consultation.created_at.desc()).limit(10)
+    ), True),
+    "blog_posts_by_author": ("blog_posts", lambda: (
+        select(BlogPost).where(BlogPost.author_id == 1).order_by(desc(BlogPost.created_at)).limit(10)
+    ), True),
+    "blog_posts_by_author_and_status": ("blog_posts", lambda: (
+        select(BlogPost).where(BlogPost.author_id == 1, BlogPost.status == "published")
+        .order_by(desc(BlogPost.created_at)).limit(10)
+    ), True),
+    "data_exports_by_user_and_status": ("data_exports", lambda: (
+        select(DataExport).where(DataExport.user_id == 1, DataExport.status == "pending")
+    ), False),
+    "audit_logs_by_user": ("audit_logs", lambda: (
+        select(AuditLog).where(AuditLog.user_id == 1).order_by(AuditLog.timestamp.desc()).limit(100)
+    ), True),
+    # Keyset pages: the cursor seek and the (timestamp, id) sort must both use the index
+    "chat_sessions_page": ("chat_sessions", lambda: paginate(
+        select(ChatSession).where(ChatSession.user_id == 1),
+        ChatSession.last_activity, ChatSession.id, cursor=(CURSOR[0], "s1"), limit=20
+    ), True),
+    "health_metrics_page": ("health_metrics", lambda: paginate(
+        select(HealthMetric).where(HealthMetric.user_id == 1),
+        HealthMetric.recorded_at, HealthMetric.id, cursor=CURSOR
+    ), True),
+    "health_metrics_by_type_page": ("health_metrics", lambda: paginate(
+        select(HealthMetric).where(HealthMetric.user_id == 1, HealthMetric.metric_type == "weight"),
+        HealthMetric.recorded_at, HealthMetric.id, cursor=CURSOR
+    ), True),
+    "consultations_page": ("consultations", lambda: paginate(
+        select(Consultation).where(Consultation.user_id == 1),
+        Consultation.created_at, Consultation.id, cursor=CURSOR, limit=10
+    ), True),
+    "blog_posts_page": ("blog_posts", lambda: paginate(
+        select(BlogPost).where(BlogPost.author_id == 1),
+        BlogPost.created_at, BlogPost.id, cursor=CURSOR, limit=10
+    ), True),
+    "conversations_page": ("conversations", lambda: paginate(
+        select(Conversation).where(Conversation.user_id == 1),
+        Conversation.started_at, Conversation.id, cursor=(CURSOR[0], "c1")
+    ), True),
+    "messages_page": ("messages", lambda: paginate(
+        select(Message).where(Message.conversation_id == "c1"),
+        Message.created_at, Message.id, cursor=(CURSOR[0], "m1"), descending=False
+    ), True),
+    "conversation_memory_page": ("conversation_memory", lambda: paginate(
+        select(ConversationMemory).where(ConversationMemory.user_id == 1),
+        ConversationMemory.created_at, ConversationMemory.id, cursor=(CURSOR[0], "m1")
+    ), True),
+}
+
+TABLES = [
+    User.__table__, BlogPost.__table__, ChatSession.__table__, ChatMessage.__table__, DataExport.__table__,
+    Consultation.__table__, HealthMetric.__table__, AuditLog.__table__, Conversation.__table__, Message.__table__,
+    ConversationMemory.__table__,
+]
+
+
+def _compile(engine, statement) -> str:
+    return str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+
+
+@pytest.fixture(scope="module")
+def sqlite_engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=TABLES)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def postgres_engine():
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL not set")
+    engine = create_engine(url)
+    Base.metadata.create_all(engine, tables=TABLES)
+    yield engine
+    Base.metadata.drop_all(engine, tables=TABLES)
+    engine.dispose()
+
+
+class TestQueryPlans:
+    """Hot queries must use an index, never a full table scan."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("name", list(HOT_QUERIES))
+    def test_sqlite_plan_uses_index(self, sqlite_engine, name):
+        table, statement, index_ordered = HOT_QUERIES[name]
+        with sqlite_engine.connect() as conn:
+            plan = [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + _compile(sqlite_engine, statement())))]
+
+        assert not [step for step in plan if re.match(rf"SCAN {table}\b", step)], f"full scan of {table}: {plan}"
+        assert any(re.match(rf"SEARCH {table} USING (COVERING )?INDEX", step) for step in plan), plan
+        if index_ordered:
+            assert not any("TEMP B-TREE FOR ORDER BY" in step for step in plan), f"sort not served by index: {plan}"
+
+    @pytest.mark.integration
+    @pytest.mark.parametrize("name", list(HOT_QUERIES))
+    def test_postgres_plan_uses_index(self, postgres_engine, name):
+        table, statement, _ = HOT_QUERIES[name]
+        with postgres_engine.connect() as conn:
+            # Tiny test tables always favour a sequential scan; forbid it so the
+            # planner has to show whether a usable index exists.
+            conn.execute(text("SET enable_seqscan = off"))
+            plan = "\n".join(
+                row[0] for row in conn.execute(text("EXPLAIN " + _compile(postgres_engine, statement())))
+            )
+
+        assert f"Seq Scan on {table}" not in plan, plan
@@ -0,0 +1,72 @@
+"""
+Per-request SQL counter and N+1 detection tests.
+"""
+import pytest
+from sqlalchemy import create_engine, select, text
+
+from app.db.query_stats import normalize_sql, track_request
+from app.models.user import User
+
+
+class TestQueryStats:
+    """Test statement counting, normalization and the query budget plugin."""
+    
+    @pytest.mark.unit
+    def test_normalize_collapses_parameters(self):
+        """Statements differing only in parameters normalize to the same text."""
+        assert normalize_sql("SELECT * FROM users WHERE id IN (?, ?, ?)") == "SELECT * FROM users WHERE id IN (?)"
+        assert normalize_sql("SELECT *\n  FROM users WHERE id = %(id_1)s") == "SELECT * FROM users WHERE id = ?"
+        assert normalize_sql("SELECT * FROM users WHERE id IN ($1, $2)") == "SELECT * FROM users WHERE id IN (?)"
+    
+    @pytest.mark.unit
+    def test_repeated_statements_are_flagged(self):
+        """The same statement run with different parameters counts as a repeat."""
+        engine = create_engine("sqlite://")
+        with track_request() as stats, engine.connect() as conn:
+            for i in range(6):
+                conn.execute(text("SELECT :value"), {"value": i})
+            conn.execute(text("SELECT 1, 2"))
+        
+        assert stats.count == 7
+        assert stats.repeated(threshold=5) == {"SELECT ?": 6}
+        assert stats.total_time > 0
+    
+    @pytest.mark.unit
+    def test_statements_outside_a_request_are_not_counted(self):
+        engine = create_engine("sqlite://")
+        with track_request() as stats:
+            pass
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        assert stats.count == 0
+    
+    @pytest.mark.integration
+    def test_response_headers(self, client, auth_headers):
+        """Non-production responses report the request's statement count."""
+        response = client.get("/api/v1/users/me", headers=auth_headers)
+        assert response.status_code == 200
+        assert int(response.headers["X-DB-Query-Count"]) >= 1
+        assert float(response.headers["X-DB-Query-Time-Ms"]) >= 0
+        assert response.headers["X-DB-Repeated-Queries"] == "0"
+    
+    @pytest.mark.integration
+    def test_user_analytics_query_budget(self, client, auth_headers, query_budget):
+        """Analytics runs a fixed number of queries instead of one per day and tier."""
+        with query_budget(5, max_repeats=1):
+            response = client.get("/api/v1/admin/user-analytics", headers=auth_headers)
+        assert response.status_code == 200
+        assert len(response.json()["dailyRegistrations"]) == 30
+    
+    @pytest.mark.integration
+    def test_query_budget_fixture_reports_overruns(self, db, query_budget):
+        """Exceeding the budget fails with a summary of the statements."""
+        with pytest.raises(pytest.fail.Exception, match="Query budget exceeded: 3 > 2"):
+            with query_budget(2):
+                for user_id in range(3):
+                    db.execute(select(User).where(User.id == user_id)).all()
+    
+    @pytest.mark.integration
+    @pytest.mark.query_budget(2)
+    def test_query_budget_marker(self, db):
+        """The marker counts only statements run by the test body."""
+        db.execute(select(User)).all()
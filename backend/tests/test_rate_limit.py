@@ -0,0 +1,189 @@
+"""
+GCRA rate limiter tests.
+"""
+import types
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.api_v1.endpoints import ai
+from app.core import rate_limit, security
+from app.core.config import settings
+from app.core.rate_limit import ConcurrencyLimiter, MemoryRateLimiter, RedisRateLimiter, SharedMemoryRateLimiter
+from app.core.state_store import MemoryStateStore, RedisStateStore, SharedMemoryStateStore
+from app.middleware.security import RateLimitMiddleware
+
+PER_MINUTE = [(10, 60)]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Freeze the limiter's clock; advance it by assigning clock.now."""
+    clock = types.SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(rate_limit, "time", types.SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture(params=["memory", "shm"])
+def limiter(request, tmp_path):
+    if request.param == "memory":
+        return MemoryRateLimiter()
+    return SharedMemoryRateLimiter(SharedMemoryStateStore(str(tmp_path / "state.db")))
+
+
+class TestRateLimiter:
+    """Test bursts, refill, costs and combined limits."""
+
+    @pytest.mark.unit
+    def test_burst_then_deny(self, limiter, clock):
+        results = [limiter.hit("client", PER_MINUTE) for _ in range(11)]
+
+        assert all(r.allowed for r in results[:10])
+        assert [r.remaining for r in results[:3]] == [9, 8, 7]
+        assert not results[10].allowed
+        assert results[10].retry_after == pytest.approx(6)
+
+    @pytest.mark.unit
+    def test_budget_refills_smoothly(self, limiter, clock):
+        for _ in range(10):
+            limiter.hit("client", PER_MINUTE)
+
+        clock.now += 6
+        assert limiter.hit("client", PER_MINUTE).allowed
+        assert not limiter.hit("client", PER_MINUTE).allowed
+        assert limiter.hit("other", PER_MINUTE).allowed
+
+        clock.now += 60
+        assert limiter.hit("client", PER_MINUTE).remaining == 9
+
+    @pytest.mark.unit
+    def test_cost_consumes_budget(self, limiter, clock):
+        assert limiter.hit("client", PER_MINUTE, cost=5).remaining == 5
+        denied = limiter.hit("client", PER_MINUTE, cost=6)
+        assert not denied.allowed
+        # A denied request consumes nothing
+        assert limiter.hit("client", PER_MINUTE, cost=5).allowed
+
+    @pytest.mark.unit
+    def test_limits_apply_together(self, limiter, clock):
+        limits = [(3, 60), (5, 3600)]
+        assert [limiter.hit("client", limits).remaining for _ in range(3)] == [2, 1, 0]
+        assert not limiter.hit("client", limits).allowed
+
+        # The minute limit refilled; the denial did not spend the hour budget
+        clock.now += 60
+        assert [limiter.hit("client", limits).remaining for _ in range(2)] == [1, 0]
+        assert not limiter.hit("client", limits).allowed
+
+    @pytest.mark.unit
+    def test_idle_and_excess_keys_are_evicted(self, clock):
+        limiter = MemoryRateLimiter(max_keys=100)
+        for i in range(1000):
+            limiter.hit(f"client{i}", PER_MINUTE)
+        assert len(limiter) == 100
+
+        clock.now += 61
+        limiter.hit("fresh", PER_MINUTE)
+        assert len(limiter) == 1
+
+    @pytest.mark.unit
+    def test_redis_limiter(self):
+        store = RedisStateStore(prefix="test-state:")
+        try:
+            store.client.ping()
+        except Exception:
+            pytest.skip("Redis is not available")
+        limiter = RedisRateLimiter(store)
+        limiter.clear()
+        try:
+            results = [limiter.hit("client", [(10, 60), (20, 3600)]) for _ in range(11)]
+            assert [r.remaining for r in results[:2]] == [9, 8]
+            assert not results[10].allowed and results[10].retry_after > 0
+        finally:
+            limiter.clear()
+
+
+class TestRateLimitMiddleware:
+    """Test the limiter behind the middleware."""
+
+    @pytest.mark.integration
+    def test_denied_requests_get_retry_after(self):
+        app = FastAPI()
+        app.add_middleware(
+            RateLimitMiddleware, requests_per_minute=2, requests_per_hour=100, limiter=MemoryRateLimiter()
+        )
+
+        @app.get("/ping")
+        def ping():
+            return {}
+
+        client = TestClient(app)
+        first, second, third = (client.get("/ping") for _ in range(3))
+
+        assert (first.status_code, first.headers["X-RateLimit-Remaining"]) == (200, "1")
+        assert (second.status_code, second.headers["X-RateLimit-Remaining"]) == (200, "0")
+        assert third.status_code == 429
+        assert third.headers["Retry-After"] == "30"
+
+
+class TestRoutePolicies:
+    """Test route costs, tier budgets and LLM concurrency caps."""
+
+    @pytest.fixture(autouse=True)
+    def small_budgets(self, monkeypatch):
+        monkeypatch.setattr(settings, "RATE_LIMIT_TIER_PER_MINUTE", {"free": 15, "premium": 30})
+        monkeypatch.setattr(ai, "client", None)  # Fallback replies instead of OpenAI calls
+
+    @pytest.mark.integration
+    def test_llm_routes_cost_more(self, client):
+        assert client.post("/api/v1/ai/chat", json={"message": "hello"}).status_code == 200
+        assert rate_limit.llm_concurrency.in_flight == 0  # Slot released when the endpoint returned
+        denied = client.post("/api/v1/ai/chat", json={"message": "hello"})
+        assert denied.status_code == 429
+        assert int(denied.headers["Retry-After"]) > 0
+
+        # Cheap routes still fit in what is left
+        assert client.get("/api/v1/enhanced-ai/urgency-levels").status_code == 200
+
+    @pytest.mark.integration
+    def test_budgets_follow_user_and_tier(self, client):
+        token = security.create_access_token(1, claims=security.principal_claims(True, "premium"))
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for _ in range(3):
+            assert client.post("/api/v1/ai/chat", json={"message": "hello"}, headers=headers).status_code == 200
+        assert client.post("/api/v1/ai/chat", json={"message": "hello"}, headers=headers).status_code == 429
+        # Anonymous callers from the same IP have their own budget
+        assert client.post("/api/v1/ai/chat", json={"message": "hello"}).status_code == 200
+
+    @pytest.mark.integration
+    def test_tier_change_keeps_spent_budget(self, client):
+        def chat(tier):
+            token = security.create_access_token(2, claims=security.principal_claims(True, tier))
+            return client.post(
+                "/api/v1/ai/chat", json={"message": "hello"}, headers={"Authorization": f"Bearer {token}"}
+            ).status_code
+
+        assert [chat("free"), chat("free")] == [200, 429]
+        # 40s of the minute were spent as free (10 of 15); premium only has 20s (10 of 30) left
+        assert [chat("premium"), chat("premium")] == [200, 429]
+
+    @pytest.mark.unit
+    def test_llm_concurrency_caps(self, monkeypatch):
+        monkeypatch.setattr(settings, "LLM_CONCURRENCY_PER_USER", {"free": 1, "premium": 2})
+        limiter = ConcurrencyLimiter(max_in_flight=4, store=MemoryStateStore())
+
+        assert limiter.acquire_caller_slot("user:1", "free")
+        assert not limiter.acquire_caller_slot("user:1", "free")
+        limiter.release_caller_slot("user:1")
+        assert limiter.acquire_caller_slot("user:1", "free")
+        assert limiter.acquire_caller_slot("user:2", "premium") and limiter.acquire_caller_slot("user:2", "premium")
+
+        # Free callers may fill half the worker's slots; paying tiers the rest
+        assert limiter.acquire_worker_slot("free") and limiter.acquire_worker_slot(None)
+        assert not limiter.acquire_worker_slot("free")
+        assert limiter.acquire_worker_slot("premium") and limiter.acquire_worker_slot("premium")
+        assert not limiter.acquire_worker_slot("enterprise")
+        limiter.release_worker_slot()
+        assert limiter.acquire_worker_slot("enterprise")
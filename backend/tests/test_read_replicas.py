@@ -0,0 +1,152 @@
+"""
+Read replica routing tests.
+"""
+import time
+
+import pytest
+from sqlalchemy import create_engine, text, update
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.state_store import SharedMemoryStateStore
+from app.db import replicas as replica_module
+from app.db.base import Base
+from app.db.replicas import ReplicaSet, RoutingSession
+from app.models.user import User
+
+
+@pytest.fixture
+def databases(tmp_path, monkeypatch):
+    """A primary and two replicas, each a separate SQLite file with its own marker user."""
+    monkeypatch.setattr(settings, "DB_REPLICA_CHECK_INTERVAL", 0)
+    urls = {name: f"sqlite:///{tmp_path / name}.db" for name in ("primary", "replica-0", "replica-1")}
+    for name, url in urls.items():
+        engine = create_engine(url)
+        Base.metadata.create_all(engine, tables=[User.__table__])
+        with engine.begin() as conn:
+            conn.execute(User.__table__.insert().values(id=1, email="patient@carebow.com", hashed_password="x", full_name=name))
+        engine.dispose()
+    
+    replicas = ReplicaSet([urls["replica-0"], urls["replica-1"]], strategy="round_robin")
+    factory = sessionmaker(bind=create_engine(urls["primary"]), class_=RoutingSession, replicas=replicas)
+    yield factory, replicas
+
+
+def served_by(db) -> str:
+    return db.query(User.full_name).filter(User.id == 1).scalar()
+
+
+class TestReadReplicas:
+    """Test replica routing, stickiness and fallback."""
+    
+    @pytest.mark.unit
+    def test_sessions_use_the_primary_by_default(self, databases):
+        factory, _ = databases
+        db = factory()
+        assert served_by(db) == "primary"
+        db.close()
+    
+    @pytest.mark.unit
+    def test_reads_round_robin_across_replicas(self, databases):
+        factory, _ = databases
+        db = factory()
+        db.info["use_replica"] = True
+        assert [served_by(db) for _ in range(4)] == ["replica-0", "replica-1", "replica-0", "replica-1"]
+        db.close()
+    
+    @pytest.mark.unit
+    def test_least_load_prefers_idle_replica(self, databases):
+        factory, replicas = databases
+        replicas.strategy = "least_load"
+        busy = replicas.replicas[0].engine.connect()
+        db = factory()
+        db.info["use_replica"] = True
+        assert served_by(db) == "replica-1"
+        busy.close()
+        db.close()
+    
+    @pytest.mark.unit
+    def test_writes_and_later_reads_go_to_the_primary(self, databases):
+        factory, _ = databases
+        db = factory()
+        db.info.update(use_replica=True, user_id=1)
+        db.execute(update(User).where(User.id == 1).values(full_name="primary (updated)"))
+        db.query(User).filter(User.id == 1).first().is_active = True
+        db.commit()
+        assert served_by(db) == "primary (updated)"
+        db.close()
+        
+        # A fresh session for the same user stays on the primary during the sticky window
+        db = factory()
+        db.info.update(use_replica=True, user_id=1)
+        assert served_by(db) == "primary (updated)"
+        db.close()
+        
+        db = factory()
+        db.info.update(use_replica=True, user_id=2)
+        assert served_by(db).startswith("replica")
+        db.close()
+    
+    @pytest.mark.unit
+    def test_sticky_window_expires(self, databases, monkeypatch):
+        factory, _ = databases
+        monkeypatch.setattr(settings, "DB_REPLICA_STICKY_SECONDS", 0)
+        replica_module.record_write(1)
+        db = factory()
+        db.info.update(use_replica=True, user_id=1)
+        assert served_by(db).startswith("replica")
+        db.close()
+    
+    @pytest.mark.unit
+    def test_stickiness_is_shared_between_workers(self, databases, monkeypatch, tmp_path):
+        """A write recorded by one worker keeps another worker's reads on the primary."""
+        factory, _ = databases
+        path = str(tmp_path / "state.db")
+        monkeypatch.setattr(replica_module, "get_state_store", lambda: SharedMemoryStateStore(path))
+        replica_module.record_write(1)
+        
+        worker = SharedMemoryStateStore(path)
+        monkeypatch.setattr(replica_module, "get_state_store", lambda: worker)
+        db = factory()
+        db.info.update(use_replica=True, user_id=1)
+        assert served_by(db) == "primary"
+        db.close()
+        
+        worker.clear()
+        db = factory()
+        db.info.update(use_replica=True, user_id=1)
+        assert served_by(db).startswith("replica")
+        db.close()
+    
+    @pytest.mark.unit
+    def test_lagging_replica_is_skipped(self, databases):
+        factory, replicas = databases
+        replicas.replicas[0].lag_seconds = settings.DB_REPLICA_MAX_LAG_SECONDS + 1
+        db = factory()
+        db.info["use_replica"] = True
+        assert {served_by(db) for _ in range(3)} == {"replica-1"}
+        
+        replicas.replicas[1].lag_seconds = settings.DB_REPLICA_MAX_LAG_SECONDS + 1
+        assert served_by(db) == "primary"
+        db.close()
+    
+    @pytest.mark.unit
+    def test_failing_replica_falls_back_to_primary(self, databases, monkeypatch):
+        factory, replicas = databases
+        monkeypatch.setattr(settings, "DB_REPLICA_ERROR_THRESHOLD", 2)
+        for replica in replicas.replicas:
+            for _ in range(2):
+                with replica.engine.connect() as conn, pytest.raises(Exception):
+                    conn.execute(text("SELECT * FROM missing_table"))
+        
+        assert not any(replica.healthy for replica in replicas.replicas)
+        db = factory()
+        db.info["use_replica"] = True
+        assert served_by(db) == "primary"
+        db.close()
+        
+        # After the retry window a successful lag check puts replicas back in rotation
+        for replica in replicas.replicas:
+            replica.unavailable_until = time.monotonic()
+        replicas.check_lag()
+        assert all(replica.healthy and replica.consecutive_errors == 0 for replica in replicas.replicas)
@@ -0,0 +1,125 @@
+"""
+Refresh-token rotation and claim-based principal tests.
+"""
+import pytest
+from jose import jwt
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core import security
+from app.core.config import settings
+from app.db.principal_cache import Principal, claims_changed_at, principal_cache
+from app.models.user import User
+
+
+@pytest.fixture
+def login(client, test_user, test_user_data):
+    response = client.post(
+        "/api/v1/auth/login",
+        data={"username": test_user_data["email"], "password": test_user_data["password"]},
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def _refresh(client, token):
+    return client.post("/api/v1/auth/refresh", json={"refresh_token": token})
+
+
+class TestRefreshTokens:
+    """Test rotation, reuse detection, logout and access-token claims."""
+
+    @pytest.mark.unit
+    @pytest.mark.auth
+    def test_access_token_carries_principal_claims(self, login):
+        claims = jwt.decode(login["access_token"], settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        assert (claims["type"], claims["active"], claims["tier"]) == ("access", True, "free")
+        assert login["refresh_token"]
+
+    @pytest.mark.integration
+    @pytest.mark.auth
+    def test_refresh_rotates_tokens(self, client, login):
+        response = _refresh(client, login["refresh_token"])
+        assert response.status_code == 200
+        renewed = response.json()
+        assert renewed["refresh_token"] != login["refresh_token"]
+
+        headers = {"Authorization": f"Bearer {renewed['access_token']}"}
+        assert client.get("/api/v1/health/metrics", headers=headers).status_code == 200
+
+    @pytest.mark.integration
+    @pytest.mark.auth
+    def test_reused_refresh_token_revokes_family(self, client, login):
+        renewed = _refresh(client, login["refresh_token"]).json()
+
+        assert _refresh(client, login["refresh_token"]).status_code == 401
+        # The legitimate successor is revoked too
+        assert _refresh(client, renewed["refresh_token"]).status_code == 401
+
+    @pytest.mark.integration
+    @pytest.mark.auth
+    def test_logout_revokes_refresh_token(self, client, login):
+        assert client.post("/api/v1/auth/logout", json={"refresh_token": login["refresh_token"]}).status_code == 200
+        assert _refresh(client, login["refresh_token"]).status_code == 401
+
+    @pytest.mark.integration
+    @pytest.mark.auth
+    def test_deactivated_user_cannot_refresh(self, client, login, db_session):
+        db_session.query(User).update({User.is_active: False})
+        db_session.commit()
+
+        assert _refresh(client, login["refresh_token"]).status_code == 401
+
+    @pytest.mark.integration
+    @pytest.mark.auth
+    def test_refresh_reads_claims_from_the_row(self, client, login):
+        user_id = login["user"]["id"]
+        principal_cache.set(Principal(user_id, True, "premium", True, 0, -1))
+
+        renewed = _refresh(client, login["refresh_token"]).json()
+        claims = jwt.decode(renewed["access_token"], settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        assert claims["tier"] == "free"
+
+    @pytest.mark.integration
+    @pytest.mark.auth
+    def test_deactivation_outranks_token_claims(self, client, login, db_session):
+        headers = {"Authorization": f"Bearer {login['access_token']}"}
+        user_id = login["user"]["id"]
+
+        # Writes to other columns leave the claims trusted
+        db_session.query(User).filter(User.id == user_id).update({User.consultations_used: 1})
+        db_session.commit()
+        assert claims_changed_at(user_id) is None
+        assert client.get("/api/v1/health/metrics", headers=headers).status_code == 200
+
+        db_session.query(User).filter(User.id == user_id).update({User.is_active: False})
+        db_session.commit()
+        assert client.get("/api/v1/health/metrics", headers=headers).status_code == 401
+
+    @pytest.mark.unit
+    @pytest.mark.auth
+    def test_token_types_are_not_interchangeable(self, client, login):
+        refresh_as_access = {"Authorization": f"Bearer {login['refresh_token']}"}
+        assert client.get("/api/v1/health/metrics", headers=refresh_as_access).status_code == 401
+        assert _refresh(client, login["access_token"]).status_code == 401
+
+    @pytest.mark.integration
+    def test_claim_principal_skips_user_lookup(self, client, login):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if "FROM users" in statement:
+                statements.append(statement)
+
+        headers = {"Authorization": f"Bearer {login['access_token']}"}
+        event.listen(Engine, "before_cursor_execute", record)
+        try:
+            assert client.get("/api/v1/health/metrics", headers=headers).status_code == 200
+        finally:
+            event.remove(Engine, "before_cursor_execute", record)
+        assert statements == []
+
+        inactive = security.create_access_token(login["user"]["id"], claims=security.principal_claims(False, "free"))
+        assert client.get(
+            "/api/v1/health/metrics", headers={"Authorization": f"Bearer {inactive}"}
+        ).status_code == 401
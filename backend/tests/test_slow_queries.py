@@ -0,0 +1,92 @@
+"""
+Slow-query log tests.
+"""
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.db.query_stats import capture_queries, track_request
+from app.db.slow_queries import clear_slow_queries, mask_literals, parameter_shapes, slow_queries
+
+
+@pytest.fixture
+def log_every_query(monkeypatch):
+    """Record every statement as slow and start from an empty log."""
+    monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 0)
+    clear_slow_queries()
+    yield
+    clear_slow_queries()
+
+
+class TestSlowQueries:
+    """Test slow-query capture, PHI masking and the admin endpoint."""
+
+    @pytest.mark.unit
+    def test_fast_queries_are_not_recorded(self):
+        clear_slow_queries()
+        engine = create_engine("sqlite://")
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        assert slow_queries() == []
+
+    @pytest.mark.unit
+    def test_parameter_values_are_never_recorded(self, log_every_query):
+        """Only parameter types are kept; values and quoted literals are masked."""
+        engine = create_engine("sqlite://")
+        with engine.connect() as conn:
+            conn.execute(text("SELECT :name, 'diabetes' AS condition"), {"name": "Jane Doe"})
+
+        record = slow_queries()[0]
+        assert record["parameters"] == ["str"]
+        assert "Jane Doe" not in str(record)
+        assert "diabetes" not in str(record)
+        assert record["sql"] == "SELECT ?, '?' AS condition"
+
+    @pytest.mark.unit
+    def test_parameter_shapes(self):
+        assert parameter_shapes({"id": 1, "email": "a@b.c"}) == {"id": "int", "email": "str"}
+        assert parameter_shapes([(1, None), (2, None)], executemany=True) == {
+            "executemany": 2, "row": ["int", "NoneType"]
+        }
+        assert mask_literals("SEARCH users USING INDEX (email='a@b.c')") == "SEARCH users USING INDEX (email='?')"
+
+    @pytest.mark.unit
+    def test_plan_is_captured_once_per_statement(self, log_every_query):
+        """Slow SELECTs get their plan; EXPLAINs are neither logged nor counted."""
+        engine = create_engine("sqlite://")
+        with engine.connect() as conn:
+            conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+            with capture_queries() as stats:
+                conn.execute(text("SELECT name FROM items WHERE id = :id"), {"id": 1})
+                conn.execute(text("SELECT name FROM items WHERE id = :id"), {"id": 2})
+
+        records = [r for r in slow_queries() if r["sql"].startswith("SELECT name")]
+        assert len(records) == 2
+        assert any("items" in step for step in records[0]["plan"])
+        assert records[0]["plan"] == records[1]["plan"]
+        assert stats.count == 2
+        assert not any(r["sql"].startswith("EXPLAIN") for r in slow_queries())
+
+    @pytest.mark.unit
+    def test_endpoint_is_attributed(self, log_every_query):
+        engine = create_engine("sqlite://")
+        with track_request("GET /api/v1/users/me"), engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 2"))
+
+        endpoints = {r["sql"]: r["endpoint"] for r in slow_queries()}
+        assert endpoints["SELECT 1"] == "GET /api/v1/users/me"
+        assert endpoints["SELECT 2"] is None
+
+    @pytest.mark.integration
+    def test_admin_endpoint(self, client, auth_headers, log_every_query):
+        """Queries run by a request show up with their endpoint in the admin log."""
+        assert client.get("/api/v1/users/me", headers=auth_headers).status_code == 200
+
+        response = client.get("/api/v1/admin/slow-queries?limit=500", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["thresholdMs"] == 0
+        assert any(r["endpoint"] == "GET /api/v1/users/me" for r in data["recent"])
+        assert any("GET /api/v1/users/me" in group["endpoints"] for group in data["summary"])
@@ -0,0 +1,141 @@
+"""
+Shared state store tests.
+"""
+import multiprocessing
+import time
+
+import pytest
+
+from app.core.mfa import MFASession
+from app.core.security_advanced import SessionSecurity, ThreatDetection
+from app.core.state_store import MemoryStateStore, RedisStateStore, SharedMemoryStateStore
+
+
+def _redis_store():
+    store = RedisStateStore(prefix="test-state:")
+    try:
+        store.client.ping()
+    except Exception:
+        pytest.skip("Redis is not available")
+    store.clear()
+    return store
+
+
+@pytest.fixture(params=["memory", "shm", "redis"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryStateStore()
+    elif request.param == "shm":
+        yield SharedMemoryStateStore(str(tmp_path / "state.db"))
+    else:
+        store = _redis_store()
+        yield store
+        store.clear()
+
+
+def _increment(path: str, times: int) -> None:
+    store = SharedMemoryStateStore(path)
+    for _ in range(times):
+        store.incr("hits", ttl=60)
+
+
+class TestStateStore:
+    """Test TTLs, counters and secondary indexes on every backend."""
+
+    @pytest.mark.unit
+    def test_values_expire(self, store):
+        store.set("short", {"a": 1}, ttl=0.05)
+        store.set("forever", [1, 2])
+        assert store.get("short") == {"a": 1}
+
+        time.sleep(0.1)
+        assert store.get("short") is None
+        assert store.get("forever") == [1, 2]
+
+        store.delete("forever")
+        assert not store.exists("forever")
+
+    @pytest.mark.unit
+    def test_counters_are_fixed_windows(self, store):
+        assert store.incr("count", ttl=0.1) == 1
+        assert store.incr("count", 2, ttl=0.1) == 3
+        time.sleep(0.15)
+        assert store.incr("count", ttl=0.1) == 1
+
+    @pytest.mark.unit
+    def test_index_lists_live_members(self, store):
+        store.set("s1", {}, ttl=60, index="user:1")
+        store.set("s2", {}, ttl=0.05, index="user:1")
+        store.set("s3", {}, ttl=60, index="user:2")
+        time.sleep(0.1)
+
+        assert store.index_keys("user:1") == ["s1"]
+        store.delete(*store.index_keys("user:2"))
+        assert store.get("s3") is None
+
+    @pytest.mark.unit
+    def test_memory_store_sweeps_expired_entries(self):
+        store = MemoryStateStore()
+        store.sweep_every = 10
+        for i in range(25):
+            store.set(f"k{i}", i, ttl=0.01, index="owner")
+            time.sleep(0.001)
+        time.sleep(0.02)
+        store.set("fresh", 1)
+        for i in range(9):
+            store.set(f"fresh{i}", i)
+        assert len(store) == 10
+
+    @pytest.mark.unit
+    def test_shm_counters_are_atomic_across_processes(self, tmp_path):
+        path = str(tmp_path / "state.db")
+        SharedMemoryStateStore(path)
+        workers = [multiprocessing.Process(target=_increment, args=(path, 100)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert SharedMemoryStateStore(path).get("hits") == 400
+
+
+class TestSecurityStateOnStore:
+    """Test the modules that keep their state in the store."""
+
+    @pytest.mark.unit
+    def test_sessions_per_user_are_capped_and_invalidated(self):
+        sessions = SessionSecurity(store=MemoryStateStore())
+        ids = [sessions.create_secure_session(1, "10.0.0.1", "ua") for _ in range(7)]
+        other = sessions.create_secure_session(2, "10.0.0.2", "ua")
+
+        assert len(sessions.store.index_keys("session:user:1")) == sessions.max_sessions_per_user
+        assert sessions.validate_session(ids[-1], "10.0.0.1")["user_id"] == 1
+        assert sessions.validate_session(ids[-1], "10.9.9.9") is None  # IP changed
+
+        sessions.invalidate_user_sessions(1)
+        assert sessions.store.index_keys("session:user:1") == []
+        assert sessions.validate_session(other, "10.0.0.2") is not None
+
+    @pytest.mark.unit
+    def test_mfa_session_verification(self):
+        mfa_sessions = MFASession(store=MemoryStateStore())
+        token = mfa_sessions.create_mfa_session(user_id=9)
+
+        assert mfa_sessions.verify_mfa_session(token) is None
+        mfa_sessions.mark_session_verified(token)
+        assert mfa_sessions.verify_mfa_session(token) == 9
+        assert mfa_sessions.verify_mfa_session("unknown") is None
+
+    @pytest.mark.unit
+    def test_failed_logins_mark_ip_suspicious(self):
+        threats = ThreatDetection(store=MemoryStateStore())
+        for _ in range(threats.max_failed_attempts):
+            threats.record_failed_login("203.0.113.5", "someone")
+
+        assert threats.is_suspicious_ip("203.0.113.5")
+        threats.block_ip("203.0.113.5", "test")
+        assert threats.analyze_request("203.0.113.5", "ua", "/")["action"] == "block"
+
+        threats.unblock_ip("203.0.113.5")
+        assert not threats.is_suspicious_ip("203.0.113.5")
+        assert not threats.is_blocked_ip("203.0.113.5")
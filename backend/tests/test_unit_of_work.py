@@ -0,0 +1,145 @@
+"""
+Unit of work tests for batched multi-row writes.
+"""
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.api_v1.endpoints import aws_native_chat
+from app.core.executors import RequestExecutor
+from app.db.base import Base
+from app.db.query_stats import capture_queries
+from app.db.unit_of_work import UnitOfWork
+from app.models.enhanced_chat import ChatMessage, ChatSession, ConversationMemory, PersonalizedRemedy
+from app.models.user import User
+
+
+@pytest.fixture
+def chat_db(tmp_path):
+    # File-backed so the executor's worker thread sees the same database
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}")
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, ChatSession.__table__, ChatMessage.__table__,
+        PersonalizedRemedy.__table__, ConversationMemory.__table__,
+    ])
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    db = sessionmaker(bind=engine)()
+    db.add(ChatSession(id="s1", user_id=1, title="Turn"))
+    db.commit()
+    commits.clear()
+    yield db, commits
+    db.close()
+    engine.dispose()
+
+
+def _queue_turn(unit: UnitOfWork, remedies: int = 3):
+    user_message = unit.add(ChatMessage(session_id="s1", role="user", content="I feel dizzy"))
+    ai_message = unit.add(ChatMessage(session_id="s1", role="assistant", content="Sit down and drink water.",
+                                      parent_message_id=user_message.id))
+    unit.add_rows(PersonalizedRemedy, [
+        {"session_id": "s1", "message_id": ai_message.id, "user_id": 1, "title": f"Remedy {i}",
+         "description": "Rest", "instructions": "Lie down"}
+        for i in range(remedies)
+    ])
+    return user_message, ai_message
+
+
+class TestUnitOfWork:
+    """Test client-side ids, single-commit turns and rollback."""
+
+    @pytest.mark.unit
+    def test_ids_and_timestamps_are_assigned_when_queued(self):
+        unit = UnitOfWork()
+        message = unit.add(ChatMessage(session_id="s1", role="user", content="hi"))
+        explicit = unit.add(ChatMessage(id="fixed", session_id="s1", role="user", content="hi"))
+        rows = unit.add_rows(PersonalizedRemedy, [{"title": "Tea"}])
+
+        assert message.id and message.created_at is not None
+        assert explicit.id == "fixed"
+        assert rows[0]["id"] and rows[0]["created_at"] is not None
+        assert len(unit) == 3
+
+    @pytest.mark.unit
+    def test_turn_commits_once_with_bulk_inserts(self, chat_db):
+        """Messages and remedies go out as one INSERT per table and one commit."""
+        db, commits = chat_db
+        unit = UnitOfWork()
+        _, ai_message = _queue_turn(unit, remedies=5)
+
+        with capture_queries() as stats:
+            unit.commit(db)
+            assert ai_message.content == "Sit down and drink water."  # no reload after commit
+
+        assert commits == [1]
+        assert stats.count == 2
+        assert db.scalar(select(func.count()).select_from(PersonalizedRemedy)) == 5
+        assert db.scalar(select(PersonalizedRemedy.title).limit(1)).startswith("Remedy")
+
+    @pytest.mark.unit
+    def test_failed_turn_writes_nothing(self, chat_db):
+        db, commits = chat_db
+        unit = UnitOfWork()
+        _queue_turn(unit)
+        unit.add_rows(PersonalizedRemedy, [{"session_id": "s1", "user_id": 1, "title": "missing message_id"}])
+
+        with pytest.raises(Exception):
+            unit.commit(db)
+
+        assert commits == []
+        assert db.scalar(select(func.count()).select_from(ChatMessage)) == 0
+
+    @pytest.mark.unit
+    def test_executor_commit(self, chat_db):
+        db, commits = chat_db
+        unit = UnitOfWork()
+        _queue_turn(unit, remedies=2)
+
+        asyncio.run(RequestExecutor(db).commit(unit))
+
+        assert commits == [1]
+        assert len(unit) == 0
+        assert db.scalar(select(func.count()).select_from(ChatMessage)) == 2
+
+    @pytest.mark.integration
+    def test_chat_turn_endpoint_commits_once(self, client, auth_headers, db_session, monkeypatch):
+        """A turn with remedies and memories is one commit through the mounted endpoint."""
+        aws = MagicMock()
+        monkeypatch.setattr(aws_native_chat, "get_aws_client", lambda service: aws)
+        
+        async def reply(message_content, history=None):
+            return {
+                "response": "Sit down and drink water.",
+                "remedies": [
+                    {"type": "home_remedy", "title": f"Remedy {i}", "description": "Rest", "instructions": "Lie down"}
+                    for i in range(3)
+                ],
+                "memories": [{"type": "health_pattern", "content": "Gets dizzy after running"}],
+            }
+        
+        monkeypatch.setattr(aws_native_chat.ai_service, "process_message", reply)
+        session = client.post("/api/v1/aws-chat/sessions", json={"title": "Turn"}, headers=auth_headers)
+        assert session.status_code == 200
+        
+        commits = []
+        record = lambda conn: commits.append(1)
+        event.listen(Engine, "commit", record)
+        try:
+            response = client.post(
+                f"/api/v1/aws-chat/sessions/{session.json()['id']}/messages",
+                json={"content": "I feel dizzy"},
+                headers=auth_headers,
+            )
+        finally:
+            event.remove(Engine, "commit", record)
+        
+        assert response.status_code == 200
+        assert response.json()["content"] == "Sit down and drink water."
+        assert commits == [1]
+        assert db_session.scalar(select(func.count()).select_from(ChatMessage)) == 2
+        assert db_session.scalar(select(func.count()).select_from(PersonalizedRemedy)) == 3
+        assert db_session.scalar(select(func.count()).select_from(ConversationMemory)) == 1